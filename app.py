@@ -2,7 +2,6 @@
 
 # This file (app.py) is the entry point
 import streamlit as st
-from PIL import Image
 
 # --- General Config ---
 st.set_page_config(
@@ -0,0 +1,142 @@
+"""
+Cold-start import report for the dashboard and serving entry points
+
+Runs each target in a fresh interpreter under `python -X importtime`, reports
+the cumulative import time and fails when:
+- a heavy ML backend (TensorFlow, Keras, XGBoost, scikit-learn, PIL) is imported
+  at module level by a target that must stay lightweight (for the Streamlit scripts,
+  backends Streamlit itself imports, such as PIL, don't count)
+- the import time regresses more than --tolerance over the stored baseline
+
+Usage (from the project root):
+    python benchmarks/import_time.py                    # check
+    python benchmarks/import_time.py --update-baseline  # record current timings
+"""
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'import_time_baseline.json')
+
+HEAVY_MODULES = ['tensorflow', 'keras', 'xgboost', 'sklearn', 'PIL']
+
+# Modules whose import must never pull in a model backend
+LIGHT_TARGETS = [
+    'src.model_registry',
+    'src.forecasting',
+    'src.storage',
+    'src.feature_store',
+    'src.forecast_cache',
+    'src.upload_scoring',
+    'src.nutrient_catalog',
+    'src.transforms',
+    'src.feature_kernel',
+    'src.memory',
+    'src.tree_export',
+    'src.inference_server',
+]
+
+DASHBOARD_SCRIPTS = ['app.py', 'pages/home.py', 'pages/predict.py', 'pages/Upload.py', 'pages/visualize.py']
+# Every dashboard script imports this; what it loads on its own is not the scripts' doing
+DASHBOARD_FRAMEWORK = 'streamlit'
+
+
+def top_level_imports(script):
+    """Module-level imports of a Streamlit script (the script itself can't be imported outside streamlit)"""
+    with open(os.path.join(ROOT, script)) as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+            modules.append(node.module)
+    return modules
+
+
+def measure(modules, repeat=3):
+    """
+    Import the modules in a fresh interpreter under -X importtime
+    Returns (best total seconds over the repeats, set of top-level packages imported)
+    """
+    code = '; '.join(f'import {m}' for m in modules) or 'pass'
+    best = None
+    imported = set()
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT,
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"Import failed for {modules}:\n{result.stderr[-2000:]}")
+        total_us = 0
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            self_us, _, name = [part.strip() for part in line[len('import time:'):].split('|')]
+            total_us += int(self_us)
+            imported.add(name.strip().split('.')[0])
+        seconds = total_us / 1e6
+        best = seconds if best is None else min(best, seconds)
+    return best, imported
+
+
+def collect_targets():
+    targets = {module: [module] for module in LIGHT_TARGETS}
+    for script in DASHBOARD_SCRIPTS:
+        if os.path.exists(os.path.join(ROOT, script)):
+            targets[script] = top_level_imports(script)
+    return targets
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time (cold start) regression check")
+    parser.add_argument('--update-baseline', action='store_true', help="Store current timings as the baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed relative slowdown (default 0.25)")
+    parser.add_argument('--repeat', type=int, default=3, help="Fresh interpreters per target (best is kept)")
+    parser.add_argument('--json', default=None, help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH) and not args.update_baseline:
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+
+    report = {}
+    failures = []
+    _, framework_imports = measure([DASHBOARD_FRAMEWORK], 1)
+    for name, modules in collect_targets().items():
+        seconds, imported = measure(modules, args.repeat)
+        if name in DASHBOARD_SCRIPTS:
+            imported = imported - framework_imports
+        heavy = sorted(set(HEAVY_MODULES) & imported)
+        report[name] = {'seconds': round(seconds, 4), 'heavy_modules': heavy}
+        status = 'ok'
+        if heavy:
+            failures.append(f"{name} imports {heavy} at module level")
+            status = 'HEAVY'
+        if name in baseline and seconds > baseline[name]['seconds'] * (1 + args.tolerance):
+            failures.append(f"{name}: {seconds:.3f}s vs baseline {baseline[name]['seconds']:.3f}s")
+            status = 'SLOWER'
+        print(f"{name:<28} {seconds * 1000:9.1f} ms  {status}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.update_baseline:
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {BASELINE_PATH}")
+
+    if failures:
+        print("\nImport-time check failed:")
+        for failure in failures:
+            print(f"- {failure}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,408 @@
+"""
+Pipeline and inference benchmark suite
+
+Times and memory-profiles every pipeline stage and the inference path on synthetic
+data scaled from the Item_FullList.csv schema. Each (benchmark, size) case runs in a
+fresh interpreter so peak RSS is measured per case, not across the whole run.
+Results are written as JSON (one file per run, tagged with the git commit) so two
+commits can be compared.
+
+Usage (from the project root):
+    python benchmarks/run_benchmarks.py                           # default sizes 1e4, 1e5, 1e6
+    python benchmarks/run_benchmarks.py --sizes 1e4 1e7 --only daily weekly
+    python benchmarks/run_benchmarks.py --compare old.json new.json --tolerance 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+DEFAULT_SIZES = [10 ** 4, 10 ** 5, 10 ** 6]
+
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(__file__))
+
+
+# --- benchmark cases ---------------------------------------------------------------
+# Each case has a setup(n_rows, workdir) returning a context dict (untimed) and a
+# run(ctx) doing the measured work. max_rows caps sizes where a case stops being
+# meaningful on one machine (model training on 10^8 rows).
+
+def _setup_raw(n_rows, workdir):
+    from synthetic import write_item_log
+    raw_dir = os.path.join(workdir, 'data', 'raw')
+    write_item_log(os.path.join(raw_dir, 'Item_FullList.csv'), n_rows)
+    return {'raw_dir': raw_dir}
+
+
+def _run_load_data_mode(memory_mode):
+    def run(ctx):
+        from src.data_preprocessing import DataPreprocessor
+        preprocessor = DataPreprocessor(base_dir=ctx['workdir'], memory_mode=memory_mode)
+        if not preprocessor.load_data('Item_FullList.csv', ctx['raw_dir']):
+            raise RuntimeError("load_data failed")
+        return len(preprocessor.df)
+    return run
+
+
+_run_load_data = _run_load_data_mode('default')
+
+
+def _setup_daily(n_rows, workdir):
+    from synthetic import item_rows
+    from src.ingestion import parse_dates, parse_unit_price
+    df = item_rows(n_rows)
+    df['Date'] = parse_dates(df['Date'])
+    df['Unit Price'] = parse_unit_price(df['Unit Price'])
+    return {'df': df}
+
+
+def _run_daily(ctx):
+    from src.daily_food_waste import DailyFoodWasteCalculator
+    calculator = DailyFoodWasteCalculator(base_dir=ctx['workdir'])
+    calculator.df = ctx['df']
+    if not calculator.calculate_daily_food_waste():
+        raise RuntimeError("calculate_daily_food_waste failed")
+    return len(calculator.daily_waste_df)
+
+
+def _run_daily_streaming_mode(memory_mode):
+    def run(ctx):
+        from src.daily_food_waste import DailyFoodWasteCalculator
+        calculator = DailyFoodWasteCalculator(base_dir=ctx['workdir'], memory_mode=memory_mode)
+        if not calculator.calculate_daily_food_waste_streaming(os.path.join(ctx['raw_dir'], 'Item_FullList.csv')):
+            raise RuntimeError("calculate_daily_food_waste_streaming failed")
+        return len(calculator.daily_waste_df)
+    return run
+
+
+_run_daily_streaming = _run_daily_streaming_mode('default')
+
+
+def _run_daily_backend(backend):
+    def run(ctx):
+        from src.daily_food_waste import DailyFoodWasteCalculator
+        calculator = DailyFoodWasteCalculator(base_dir=ctx['workdir'])
+        if not calculator.calculate_daily_food_waste_lazy(os.path.join(ctx['raw_dir'], 'Item_FullList.csv'), backend):
+            raise RuntimeError(f"calculate_daily_food_waste_lazy ({backend}) failed")
+        return len(calculator.daily_waste_df)
+    return run
+
+
+def _setup_weekly(n_rows, workdir):
+    from synthetic import daily_rows
+    return {'df': daily_rows(n_rows)}
+
+
+def _run_weekly(ctx):
+    from src.weekly_aggregation import WeeklyAggregator
+    aggregator = WeeklyAggregator(base_dir=ctx['workdir'])
+    aggregator.df = ctx['df'].copy()
+    if not aggregator.aggregate_weekly('sum'):
+        raise RuntimeError("aggregate_weekly failed")
+    return len(aggregator.weekly_df)
+
+
+def _setup_weekly_frame(n_rows, workdir):
+    from synthetic import weekly_rows
+    return {'df': weekly_rows(n_rows).drop(columns=['Series'])}
+
+
+def _run_features(ctx):
+    from src.feature_engineering_full import FeatureEngineer
+    engineer = FeatureEngineer(base_dir=ctx['workdir'])
+    engineer.df = ctx['df'].copy()
+    for step in [engineer.create_nutrient_ratios, engineer.create_nutrient_interactions,
+                 engineer.create_time_features, engineer.normalize_features]:
+        if not step():
+            raise RuntimeError(f"{step.__name__} failed")
+    return len(engineer.df)
+
+
+def _run_features_fused(kernel):
+    def run(ctx):
+        from src.feature_engineering_full import FeatureEngineer
+        os.environ['NUTRIMATCH_FEATURE_KERNEL'] = kernel
+        engineer = FeatureEngineer(base_dir=ctx['workdir'])
+        engineer.df = ctx['df'].copy()
+        if not engineer.engineer_features():
+            raise RuntimeError("engineer_features failed")
+        return len(engineer.df)
+    return run
+
+
+def _setup_lags(n_rows, workdir):
+    from synthetic import weekly_rows
+    # Many short series, the shape the lag builder sees for per-item data
+    return {'df': weekly_rows(n_rows, n_series=max(1, n_rows // 100))}
+
+
+def _run_lags(ctx):
+    from synthetic import NUTRIENTS
+    from src.feature_engineering_lag import build_lag_features
+    tables = build_lag_features(ctx['df'], NUTRIENTS, series_cols=['Series'])
+    return sum(len(t) for t in tables.values())
+
+
+def _setup_lag_table(n_rows, workdir):
+    from synthetic import lag_table
+    from src.storage import write_frame
+    data_dir = os.path.join(workdir, 'data', 'engineered')
+    os.makedirs(data_dir, exist_ok=True)
+    write_frame(lag_table(n_rows), os.path.join(data_dir, 'carbohydrates_lagged.parquet'))
+    return {'data_dir': data_dir, 'models_dir': os.path.join(workdir, 'models')}
+
+
+def _run_train_random_forest(ctx):
+    from src.random_forest_training import train_random_forest
+    train_random_forest('carbohydrates', data_dir=ctx['data_dir'], output_dir=ctx['models_dir'])
+
+
+def _run_train_xgboost(ctx):
+    from src.xgboost_training import train_xgboost
+    train_xgboost('carbohydrates', data_dir=ctx['data_dir'], output_dir=ctx['models_dir'])
+
+
+def _run_train_lstm(ctx):
+    from src.lstm_training import train_lstm
+    if train_lstm('carbohydrates', verbose=0, data_dir=ctx['data_dir'], output_dir=ctx['models_dir']) is None:
+        raise RuntimeError("train_lstm failed")
+
+
+def _setup_forecast(n_rows, workdir):
+    # n_rows = number of series forecast together; the model is fitted once, untimed
+    import numpy as np
+    from sklearn.ensemble import RandomForestRegressor
+    from synthetic import lag_table
+    train = lag_table(5000)
+    model = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=-1)
+    model.fit(train.drop(columns='target').to_numpy(), train['target'].to_numpy())
+    lags = np.random.default_rng(0).gamma(2.0, 500.0, (n_rows, 4))
+    return {'model': model, 'lags': lags}
+
+
+def _run_forecast(ctx):
+    from src.forecasting import ForecastEngine
+    return ForecastEngine(ctx['model'], horizon=8).recursive(ctx['lags']).shape[0]
+
+
+def _setup_forecast_compact(n_rows, workdir):
+    from src.tree_export import export_tree_model, load_tree_model
+    ctx = _setup_forecast(n_rows, workdir)
+    path = export_tree_model(ctx['model'], os.path.join(workdir, 'carbohydrates_random_forest.pkl'))
+    ctx['model'] = load_tree_model(path)
+    return ctx
+
+
+def _setup_upload(n_rows, workdir):
+    # A planner upload: n_rows lag rows scored by a fitted model, streamed to an output CSV
+    from synthetic import lag_table
+    ctx = _setup_forecast(1, workdir)
+    ctx['source'] = os.path.join(workdir, 'upload.csv')
+    lag_table(n_rows).to_csv(ctx['source'], index=False)
+    ctx['output'] = os.path.join(workdir, 'upload_scored.csv')
+    return ctx
+
+
+def _run_upload(ctx):
+    from src.upload_scoring import score_upload
+    return score_upload(ctx['source'], ctx['model'], ctx['output'])['rows']
+
+
+BENCHMARKS = {
+    'load_data': {'setup': _setup_raw, 'run': _run_load_data},
+    'load_data_compact': {'setup': _setup_raw, 'run': _run_load_data_mode('compact')},
+    'daily': {'setup': _setup_daily, 'run': _run_daily},
+    'daily_streaming': {'setup': _setup_raw, 'run': _run_daily_streaming},
+    'daily_streaming_compact': {'setup': _setup_raw, 'run': _run_daily_streaming_mode('compact')},
+    'daily_polars': {'setup': _setup_raw, 'run': _run_daily_backend('polars')},
+    'daily_dask': {'setup': _setup_raw, 'run': _run_daily_backend('dask')},
+    'weekly': {'setup': _setup_weekly, 'run': _run_weekly},
+    'features': {'setup': _setup_weekly_frame, 'run': _run_features},
+    'features_fused': {'setup': _setup_weekly_frame, 'run': _run_features_fused('numpy')},
+    'features_fused_numba': {'setup': _setup_weekly_frame, 'run': _run_features_fused('numba')},
+    'lags': {'setup': _setup_lags, 'run': _run_lags},
+    'train_random_forest': {'setup': _setup_lag_table, 'run': _run_train_random_forest, 'max_rows': 10 ** 6},
+    'train_xgboost': {'setup': _setup_lag_table, 'run': _run_train_xgboost, 'max_rows': 10 ** 7},
+    'train_lstm': {'setup': _setup_lag_table, 'run': _run_train_lstm, 'max_rows': 10 ** 5},
+    'forecast_8w': {'setup': _setup_forecast, 'run': _run_forecast, 'max_rows': 10 ** 7},
+    'forecast_8w_compact': {'setup': _setup_forecast_compact, 'run': _run_forecast, 'max_rows': 10 ** 7},
+    'upload_score': {'setup': _setup_upload, 'run': _run_upload, 'max_rows': 10 ** 7},
+}
+
+
+# --- measurement -----------------------------------------------------------------
+
+def _peak_rss_mb():
+    """Peak resident set size of this process (ru_maxrss is KiB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_case(name, n_rows, repeat):
+    """Run one benchmark case in this process and return its measurements"""
+    from src.logging_utils import setup_logging
+    bench = BENCHMARKS[name]
+    with tempfile.TemporaryDirectory(prefix='nutrimatch_bench_') as workdir:
+        # Stage classes log to the temporary tree, not the project's logs/
+        setup_logging(workdir, console=False)
+        ctx = bench['setup'](n_rows, workdir)
+        ctx['workdir'] = workdir
+        setup_rss = _peak_rss_mb()
+
+        times = []
+        peak_traced = 0
+        for i in range(repeat):
+            # Only the first run is traced: tracemalloc slows allocation-heavy code
+            if i == 0:
+                tracemalloc.start()
+            start = time.perf_counter()
+            bench['run'](ctx)
+            times.append(time.perf_counter() - start)
+            if i == 0:
+                peak_traced = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+
+    return {
+        'benchmark': name,
+        'rows': n_rows,
+        'repeat': repeat,
+        'min_s': min(times),
+        'median_s': sorted(times)[len(times) // 2],
+        'rows_per_s': n_rows / min(times) if min(times) > 0 else None,
+        'peak_alloc_mb': peak_traced / (1024 * 1024),
+        'setup_rss_mb': setup_rss,
+        'peak_rss_mb': _peak_rss_mb(),
+    }
+
+
+def run_isolated(name, n_rows, repeat, timeout):
+    """Run a case in a fresh interpreter; failures and timeouts are recorded, not raised"""
+    with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as f:
+        out_path = f.name
+    cmd = [sys.executable, os.path.abspath(__file__), '--case', name, str(n_rows),
+           '--repeat', str(repeat), '--output', out_path]
+    try:
+        proc = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True, timeout=timeout)
+        if proc.returncode != 0:
+            error = (proc.stderr.strip().splitlines() or ['unknown error'])[-1]
+            return {'benchmark': name, 'rows': n_rows, 'status': 'error', 'error': error}
+        with open(out_path) as f:
+            result = json.load(f)
+        result['status'] = 'ok'
+        return result
+    except subprocess.TimeoutExpired:
+        return {'benchmark': name, 'rows': n_rows, 'status': 'timeout', 'error': f"exceeded {timeout}s"}
+    finally:
+        os.remove(out_path)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run_suite(names, sizes, repeat, timeout, output=None):
+    """Run every selected case and write the JSON report"""
+    results = []
+    for name in names:
+        max_rows = BENCHMARKS[name].get('max_rows')
+        for n_rows in sizes:
+            if max_rows and n_rows > max_rows:
+                print(f"⏭️  {name} @ {n_rows:,} rows skipped (max {max_rows:,})")
+                continue
+            result = run_isolated(name, n_rows, repeat, timeout)
+            results.append(result)
+            if result['status'] == 'ok':
+                print(f"✅ {name} @ {n_rows:,} rows: {result['min_s']:.3f}s, "
+                      f"peak alloc {result['peak_alloc_mb']:.1f} MB, peak RSS {result['peak_rss_mb']:.1f} MB")
+            else:
+                print(f"❌ {name} @ {n_rows:,} rows: {result['status']} ({result['error']})")
+
+    commit = git_commit()
+    report = {
+        'commit': commit,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                    'processor': platform.processor(), 'cpu_count': os.cpu_count()},
+        'results': results,
+    }
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{commit}.json")
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"📄 Results written to {output}")
+    return report
+
+
+def compare(old_path, new_path, tolerance):
+    """Print per-case time/memory ratios; returns the number of regressions beyond tolerance"""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    old_cases = {(r['benchmark'], r['rows']): r for r in old['results'] if r.get('status') == 'ok'}
+
+    print(f"Comparing {old['commit']} -> {new['commit']}")
+    regressions = 0
+    for result in new['results']:
+        key = (result['benchmark'], result['rows'])
+        if result.get('status') != 'ok' or key not in old_cases:
+            continue
+        base = old_cases[key]
+        time_ratio = result['min_s'] / base['min_s'] if base['min_s'] else float('inf')
+        mem_ratio = result['peak_alloc_mb'] / base['peak_alloc_mb'] if base['peak_alloc_mb'] else 1.0
+        flag = ''
+        if time_ratio > 1 + tolerance or mem_ratio > 1 + tolerance:
+            flag = '  ⚠️ regression'
+            regressions += 1
+        print(f"{key[0]:>22} @ {key[1]:>11,}: time x{time_ratio:.2f}, peak alloc x{mem_ratio:.2f}{flag}")
+    return regressions
+
+
+def parse_size(value):
+    """Accept 10000, 1e4 or 10_000"""
+    return int(float(value.replace('_', '')))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the NutriMatch pipeline stages and inference path")
+    parser.add_argument('--sizes', nargs='+', type=parse_size, default=DEFAULT_SIZES,
+                        help="Row counts to run (e.g. 1e4 1e6 1e8)")
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), help="Subset of benchmarks to run")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per case (best is reported)")
+    parser.add_argument('--timeout', type=int, default=3600, help="Seconds allowed per case")
+    parser.add_argument('--output', help="Results file (default benchmarks/results/<time>_<commit>.json)")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help="Compare two results files")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed slowdown/growth ratio for --compare")
+    parser.add_argument('--case', nargs=2, metavar=('NAME', 'ROWS'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        name, n_rows = args.case[0], parse_size(args.case[1])
+        with open(args.output, 'w') as f:
+            json.dump(run_case(name, n_rows, args.repeat), f)
+        return 0
+
+    if args.compare:
+        return 1 if compare(args.compare[0], args.compare[1], args.tolerance) else 0
+
+    run_suite(args.only or list(BENCHMARKS), args.sizes, args.repeat, args.timeout, args.output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+Synthetic data generators matching the project's file schemas, for benchmarking at scale
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+NUTRIENTS = ['Carbohydrates', 'Fiber', 'Protein', 'Fat']
+ITEM_COLUMNS = ['Date', 'Carbohydrates', 'Fiber', 'Protein', 'Fat', 'Item Description', 'Item Code',
+                'Quantity', 'Unit Price', 'Carbohydrates (g)', 'Fiber (g)', 'Protein (g)', 'Fat (g)', 'Total Price']
+
+# Rows generated per block when writing large files, bounds generator memory
+_BLOCK_ROWS = 1_000_000
+
+
+def item_rows(n_rows, n_items=500, n_days=730, seed=0, start='2023-01-01'):
+    """
+    Item log rows with the Item_FullList.csv schema
+    Dates are day/month/year strings and Unit Price uses the ' RM9.00 ' format, as in the raw export
+    """
+    rng = np.random.default_rng(seed)
+    item_ids = rng.integers(0, n_items, n_rows)
+    # Stable per-item nutrient profile and price
+    profile_rng = np.random.default_rng(1234)
+    per_gram = profile_rng.gamma(2.0, [60.0, 2.0, 10.0, 15.0], size=(n_items, 4)).round(2)
+    prices = profile_rng.uniform(1.0, 30.0, n_items).round(2)
+
+    quantity = rng.integers(1, 10, n_rows)
+    grams = per_gram[item_ids]
+    dates = pd.Timestamp(start) + pd.to_timedelta(rng.integers(0, n_days, n_rows), unit='D')
+
+    df = pd.DataFrame({'Date': dates.strftime('%d/%m/%Y')})
+    for i, nutrient in enumerate(NUTRIENTS):
+        df[nutrient] = (grams[:, i] * quantity).round(2)
+    df['Item Description'] = np.char.add('SYNTHETIC ITEM ', item_ids.astype(str))
+    df['Item Code'] = np.char.add('PKS', item_ids.astype(str))
+    df['Quantity'] = quantity
+    df['Unit Price'] = [f' RM{p:.2f} ' for p in prices[item_ids]]
+    for i, nutrient in enumerate(NUTRIENTS):
+        df[f'{nutrient} (g)'] = grams[:, i]
+    df['Total Price'] = (prices[item_ids] * quantity).round(2)
+    return df[ITEM_COLUMNS]
+
+
+def write_item_log(path, n_rows, seed=0, **kwargs):
+    """Write an item log of n_rows to CSV in blocks (works for sizes that don't fit in memory)"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    written = 0
+    block = 0
+    while written < n_rows:
+        rows = min(_BLOCK_ROWS, n_rows - written)
+        item_rows(rows, seed=seed + block, **kwargs).to_csv(path, index=False, mode='w' if written == 0 else 'a',
+                                                           header=written == 0)
+        written += rows
+        block += 1
+    return path
+
+
+def daily_rows(n_rows, n_days=3650, seed=0, start='2015-01-01'):
+    """
+    Daily food waste rows (as produced by DailyFoodWasteCalculator), one per (site, day)
+    The span is capped at n_days and larger sizes add sites, so dates stay realistic at any n_rows
+    """
+    n_rows = int(n_rows)
+    rng = np.random.default_rng(seed)
+    n_sites = max(1, -(-n_rows // n_days))
+    row = np.arange(n_rows)
+    df = pd.DataFrame({'Date': pd.Timestamp(start) + pd.to_timedelta(row // n_sites, unit='D'),
+                       'Site': pd.Categorical.from_codes(row % n_sites, [f'SITE {i}' for i in range(n_sites)])})
+    for nutrient in NUTRIENTS:
+        df[nutrient] = rng.gamma(2.0, 300.0, n_rows)
+    df['Total_Quantity'] = rng.integers(1, 100, n_rows)
+    return df
+
+
+def weekly_rows(n_rows, n_series=1, n_weeks=520, seed=0):
+    """
+    Weekly rows with Year/Week keys; n_series independent series stacked, each with
+    up to n_weeks consecutive ISO weeks
+    More series are added when n_rows doesn't fit in n_series * n_weeks, so dates stay realistic
+    """
+    n_rows = int(n_rows)
+    rng = np.random.default_rng(seed)
+    n_series = max(n_series, -(-n_rows // n_weeks))
+    per_series = max(1, -(-n_rows // n_series))
+    weeks = pd.date_range('2000-01-03', periods=per_series, freq='W-MON')
+    iso = weeks.isocalendar()
+    row = np.arange(n_rows)
+    t = row % per_series
+    df = pd.DataFrame({
+        'Series': row // per_series,
+        'Year': iso['year'].to_numpy(dtype=np.int64)[t],
+        'Week': iso['week'].to_numpy(dtype=np.int64)[t],
+    })
+    for i, nutrient in enumerate(NUTRIENTS):
+        seasonal = 1 + 0.3 * np.sin(2 * np.pi * t / 52.0 + i)
+        df[nutrient] = seasonal * rng.gamma(2.0, 500.0, n_rows)
+    return df
+
+
+def lag_table(n_rows, n_lags=4, seed=0):
+    """lag_1..lag_n + target table, as in data/engineered/*_lagged.csv"""
+    rng = np.random.default_rng(seed)
+    series = rng.gamma(2.0, 500.0, n_rows + n_lags)
+    data = {f'lag_{k}': series[n_lags - k:n_lags - k + n_rows] for k in range(1, n_lags + 1)}
+    data['target'] = series[n_lags:n_lags + n_rows]
+    return pd.DataFrame(data)
@@ -1,10 +1,9 @@
-import streamlit as st
-import pandas as pd
-import pickle
-import numpy as np
-import joblib 
-from keras.models import load_model
 import os
+import tempfile
+import uuid
+import streamlit as st
+from src.model_registry import get_registry, MODEL_CHOICES
+from src.upload_scoring import PREVIEW_PAGE_ROWS, read_page, score_upload
 
 # Apply consistent styling across pages
 st.markdown("""
@@ -74,52 +73,51 @@ nutrient_choice = st.selectbox("Select nutrient", ["carbohydrates", "protein", "
 
 if uploaded_file is not None:
     try:
-        df = pd.read_csv(uploaded_file)
+        # Input preview: one page of the file, never the whole frame
         st.write(":open_file_folder: Uploaded Data:")
-        st.dataframe(df)
-
-        # Validate structure
-        required_cols = ['lag_1', 'lag_2', 'lag_3', 'lag_4']
-        if not all(col in df.columns for col in required_cols):
-            st.error("Uploaded file is missing required lag columns: lag_1 to lag_4")
-            st.stop()
-
-        model_dir = "models"
-        X_input = np.array(df[required_cols])
-
-        # Load model
-        if model_choice == "LSTM":
-            model_path = os.path.join(model_dir, f"{nutrient_choice}_lstm_model.h5")
-            model = load_model(model_path)
-            X_input = X_input[..., np.newaxis]  # reshape for LSTM
-        else:
-            model_type = "random_forest" if model_choice == "Random Forest" else "xgboost"
-            model_path = os.path.join(model_dir, f"{nutrient_choice}_{model_type}.pkl")
-            with open(model_path, "rb") as f:
-                model = joblib.load(model_path)
-
-        # Predict
-        if hasattr(model, "predict"):
-            y_pred = model.predict(X_input)
-        else:
-            st.error(f"Loaded model doesn't support prediction. Model: {model_path}")
-            st.stop()
-
-        # Results
-        forecast_df = pd.DataFrame({
-            "Index": list(range(1, len(y_pred)+1)),
-            f"Predicted {nutrient_choice.title()}": y_pred.flatten()
-        })
+        input_page = st.number_input("Preview page", min_value=1, value=1, step=1, key="input_page")
+        st.dataframe(read_page(uploaded_file, input_page - 1), use_container_width=True)
+
+        # Score once per (file, model, nutrient); pagination reruns reuse the result on disk
+        registry = get_registry()
+        model_type = MODEL_CHOICES[model_choice]
+        prediction_column = f"Predicted {nutrient_choice.title()}"
+        run_key = (uploaded_file.name, uploaded_file.size, model_type, nutrient_choice)
+        if st.session_state.get("upload_run", {}).get("key") != run_key:
+            output_dir = os.path.join(tempfile.gettempdir(), "nutrimatch_uploads")
+            os.makedirs(output_dir, exist_ok=True)
+            output_path = os.path.join(output_dir, f"{uuid.uuid4().hex}_{nutrient_choice}_{model_type}.csv")
+            model = registry.get(nutrient_choice, model_type)
+            bar = st.progress(0.0, text="Scoring...")
+
+            def show_progress(rows, position, total):
+                fraction = min(1.0, position / total) if position and total else 0.0
+                bar.progress(fraction, text=f"Scored {rows:,} rows")
+
+            summary = score_upload(uploaded_file, model, output_path, prediction_column, progress=show_progress)
+            bar.empty()
+            previous = st.session_state.get("upload_run", {}).get("path")
+            if previous and os.path.exists(previous):
+                os.remove(previous)
+            st.session_state["upload_run"] = {"key": run_key, "path": output_path, "summary": summary}
+
+        run = st.session_state["upload_run"]
+        summary = run["summary"]
         st.subheader("Prediction Results")
-        st.dataframe(forecast_df, use_container_width=True)
-
-        # Download
-        st.download_button(
-            label="Download Forecast CSV",
-            data=forecast_df.to_csv(index=False).encode("utf-8"),
-            file_name=f"forecast_{nutrient_choice}_{model_choice}.csv",
-            mime="text/csv"
-        )
+        st.caption(f"{summary['rows']:,} rows scored in {summary['seconds']:.1f}s")
+        total_pages = max(1, -(-summary['rows'] // PREVIEW_PAGE_ROWS))
+        result_page = st.number_input(f"Results page (of {total_pages})", min_value=1, max_value=total_pages,
+                                      value=1, step=1, key="result_page")
+        st.dataframe(read_page(run["path"], result_page - 1), use_container_width=True)
+
+        # Download straight from the file written chunk by chunk
+        with open(run["path"], "rb") as f:
+            st.download_button(
+                label="Download Forecast CSV",
+                data=f,
+                file_name=f"forecast_{nutrient_choice}_{model_choice}.csv",
+                mime="text/csv"
+            )
 
     except Exception as e:
-        st.error(f":x: Error processing file: {e}")
\ No newline at end of file
+        st.error(f":x: Error processing file: {e}")
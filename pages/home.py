@@ -1,5 +1,5 @@
 import streamlit as st
-from PIL import Image
+import os
 
 
 st.markdown("""
@@ -73,8 +73,9 @@ Use this platform to:
 ---
 """)
 
-try:
-    image = Image.open("info-images/dashboard_cover.png")
-    st.image(image, use_column_width=True)
-except FileNotFoundError:
+# st.image opens the file from its path (Streamlit itself imports PIL, so the page doesn't need to)
+cover_path = "info-images/dashboard_cover.png"
+if os.path.exists(cover_path):
+    st.image(cover_path, use_column_width=True)
+else:
     st.warning("⚠️ Cover image not found. Make sure `info-images/dashboard_cover.png` exists.")
@@ -1,9 +1,5 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import joblib 
-from keras.models import load_model
-import os
+from src.forecast_cache import is_stale, read_forecast
 
 # Apply consistent styling across pages
 st.markdown("""
@@ -70,62 +66,22 @@ st.markdown("## :crystal_ball: Predict Nutrient Waste")
 model_choice = st.selectbox("Choose model", ["Random Forest", "XGBoost", "LSTM"])
 nutrient_choice = st.selectbox("Select nutrient", ["carbohydrates", "protein", "fat", "fiber"])
 
-model_dir = "models"
-data_path = f"data/engineered/{nutrient_choice}_lagged.csv"
 
-try:
-    df = pd.read_csv(data_path)
-    X_test = df.drop("target", axis=1).tail(8)
+# Forecasts are precomputed by the batch job (python -m src.forecast_cache); no inference here
+forecast_df, entry = read_forecast(nutrient_choice, model_choice)
 
-    if model_choice == "LSTM":
-        lstm_model = load_model(f"{model_dir}/{nutrient_choice}_lstm_model.h5")
-        X_input = np.array(X_test)[..., np.newaxis]  # Reshape for LSTM
-        y_pred = lstm_model.predict(X_input)
-
-    elif model_choice == "XGBoost":
-        model_path = os.path.join(model_dir, f"{nutrient_choice}_xgboost.pkl")
-        st.write(f":mag: Trying to load model from: `{model_path}`")
-        if os.path.exists(model_path):
-            with open(model_path, "rb") as f:
-                model = joblib.load(model_path)
-            if hasattr(model, "predict"):
-                y_pred = model.predict(X_test)
-            else:
-                st.error(":warning: Loaded XGBoost object is not a valid model with 'predict' method.")
-                st.stop()
-        else:
-            st.error(f":x: Model file not found: `{model_path}`")
-            st.stop()
-
-    elif model_choice == "Random Forest":
-        model_path = os.path.join(model_dir, f"{nutrient_choice}_random_forest.pkl")
-        st.write(f":mag: Trying to load model from: `{model_path}`")
-        if os.path.exists(model_path):
-            with open(model_path, "rb") as f:
-                model = joblib.load(model_path)
-            if hasattr(model, "predict"):
-                y_pred = model.predict(X_test)
-            else:
-                st.error(":warning: Loaded Random Forest object is not a valid model with 'predict' method.")
-                st.stop()
-        else:
-            st.error(f":x: Model file not found: `{model_path}`")
-            st.stop()
-
-    # Display forecasted values
-    forecast_df = pd.DataFrame({
-        "Week": list(range(1, 9)),
-        f"{nutrient_choice.title()} Forecast": y_pred.flatten()
-    })
-    st.subheader(f"Forecasted {nutrient_choice.title()} (Next 8 Weeks)")
+if forecast_df is None:
+    st.error(f"No forecast cached for {nutrient_choice} ({model_choice}). "
+             "Run `python -m src.forecast_cache` after preprocessing and training.")
+else:
+    forecast_df = forecast_df.rename(columns={"Prediction": f"{nutrient_choice.title()} Forecast"})
+    st.subheader(f"Forecasted {nutrient_choice.title()} (Next {len(forecast_df)} Weeks)")
     st.dataframe(forecast_df, use_container_width=True)
 
-    # Save to CSV in results directory
-    results_dir = "results"
-    os.makedirs(results_dir, exist_ok=True)
-    result_file = os.path.join(results_dir, f"{nutrient_choice}_{model_choice.lower().replace(' ', '_')}_forecast.csv")
-    forecast_df.to_csv(result_file, index=False)
-    st.success(f"Saved forecast to: {result_file}")
-
-except FileNotFoundError:
-    st.error(f"Missing data or model for {nutrient_choice}. Ensure preprocessing and training are complete.")
+    if entry is None:
+        st.caption("Forecast version unknown: computed before the forecast cache existed.")
+    else:
+        st.caption(f"Computed {entry['created']} · data {entry['data_version'][:8]} · model {entry['model_version'][:8]}")
+        if is_stale(entry):
+            st.warning("New data or a new model has landed since this forecast was computed; "
+                       "it will be replaced on the next cache refresh.")
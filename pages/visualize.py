@@ -1,7 +1,6 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
-import os
+from src.forecast_cache import is_stale, read_forecast
 
 # Apply consistent styling across pages
 st.markdown("""
@@ -68,15 +67,15 @@ st.markdown("## 📈 Visualize Forecast Results")
 nutrient = st.selectbox("Select Nutrient to Visualize", ["carbohydrates", "protein", "fat", "fiber"])
 model = st.selectbox("Select Model", ["Random Forest", "XGBoost", "LSTM"])
 
-# Results path
-results_dir = "results"
-result_file = os.path.join(results_dir, f"{nutrient}_{model.lower().replace(' ', '_')}_forecast.csv")
+# Precomputed forecasts from the cache (python -m src.forecast_cache)
+df, entry = read_forecast(nutrient, model)
 
-if os.path.exists(result_file):
-    df = pd.read_csv(result_file)
+if df is not None:
     st.plotly_chart(
         px.line(df, x="Week", y=df.columns[1], title=f"{model} Forecast for {nutrient.title()}"),
         use_container_width=True
     )
+    if entry is not None and is_stale(entry):
+        st.warning("This forecast predates the latest data or model; it will be replaced on the next cache refresh.")
 else:
-    st.warning(f"Forecast file not found: {result_file}. Please run predictions first.")
+    st.warning(f"No forecast cached for {nutrient} ({model}). Run `python -m src.forecast_cache` first.")
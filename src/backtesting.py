@@ -0,0 +1,199 @@
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from src.forecasting import DEFAULT_HORIZON, DEFAULT_LAGS, ForecastEngine
+from src.feature_store import build_store, load_features
+from src.storage import write_frame
+from src.training_orchestrator import JOB_COST, model_families, nutrients, plan_core_split
+from src.tuning import DEFAULT_PARAMS, load_best_params, models_dir
+
+engineered_dir = "data/engineered"
+backtest_dir = os.path.join("data", "backtests")
+
+# Folds per worker task: large enough to amortise task overhead, small enough to balance the pool
+FOLDS_PER_TASK = 10
+
+# Memory-mapped lag matrices of the current worker process, set once by _init_worker
+_SHARED = {}
+
+
+def make_model(family, nutrient, n_threads=1, n_lags=DEFAULT_LAGS, params_dir=models_dir, params=None):
+    """
+    Fresh, unfitted estimator of a model family with the nutrient's settings, as the training scripts
+    build it: the tuned <params_dir>/<nutrient>_<family>_best_params.json when present, else the defaults
+    params: Settings already read with load_best_params (saves re-reading them for every fold)
+    """
+    if family not in model_families:
+        raise ValueError(f"Unknown model family '{family}'. Use one of {model_families}")
+    params = params or load_best_params(nutrient, family, params_dir)
+    if family == "random_forest":
+        from sklearn.ensemble import RandomForestRegressor
+        return RandomForestRegressor(random_state=42, n_jobs=n_threads, **params)
+    if family == "xgboost":
+        from xgboost import XGBRegressor
+        return XGBRegressor(random_state=42, n_jobs=n_threads, **params)
+    from src.lstm_training import build_lstm_model, set_tf_threads
+    set_tf_threads(n_threads)
+    return build_lstm_model(n_lags, units=params["units"], learning_rate=params["learning_rate"])
+
+
+def fit_model(model, family, X, y, params=None):
+    """params: The family's settings (the LSTM takes its epochs and batch size from them)"""
+    if family == "lstm":
+        from tensorflow.keras.callbacks import EarlyStopping
+        params = params or DEFAULT_PARAMS["lstm"]
+        model.fit(X[..., np.newaxis].astype(np.float32), y, epochs=params["epochs"], batch_size=params["batch_size"],
+                  verbose=0, callbacks=[EarlyStopping(monitor="loss", patience=5, restore_best_weights=True)])
+    else:
+        model.fit(X, y)
+    return model
+
+
+def make_cutoffs(n_rows, horizon=DEFAULT_HORIZON, n_folds=None, step=1, min_train=26):
+    """
+    Forecast origins, oldest first
+    Cutoff c trains on rows < c and forecasts targets c .. c + horizon - 1,
+    so the last cutoff is n_rows - horizon; earlier ones step back by `step` rows
+    n_folds: Limit to the most recent n_folds cutoffs (None: every cutoff with min_train rows)
+    """
+    cutoffs = list(range(n_rows - horizon, min_train - 1, -step))[::-1]
+    return cutoffs[-n_folds:] if n_folds else cutoffs
+
+
+def _init_worker(nutrient_list, data_dir):
+    """
+    Runs once per worker: maps the feature store read-only, so every worker shares the
+    same pages instead of receiving (and holding) its own copy of the lag tables
+    """
+    for nutrient in nutrient_list:
+        features = load_features(nutrient, data_dir, refresh=False)
+        _SHARED[nutrient] = (features.X, features.y)
+
+
+def run_folds(nutrient, family, cutoffs, horizon, mode, window, n_threads, params_dir=models_dir):
+    """
+    Fit and evaluate one model per cutoff on the shared lag matrices
+    mode: 'expanding' trains on all rows before the cutoff, 'rolling' on the last `window` rows
+    params_dir: Directory holding the tuned settings (see tuning.load_best_params)
+    Returns one record per (cutoff, horizon step)
+    """
+    X, y = _SHARED[nutrient]
+    params = load_best_params(nutrient, family, params_dir)
+    records = []
+    for cutoff in cutoffs:
+        start = max(0, cutoff - window) if mode == "rolling" else 0
+        fit_start = time.perf_counter()
+        model = fit_model(make_model(family, nutrient, n_threads, X.shape[1], params=params), family,
+                          X[start:cutoff], y[start:cutoff], params)
+        # Row `cutoff` holds the lags known at the origin; later lags would leak actuals
+        predictions = ForecastEngine(model, horizon=horizon, n_lags=X.shape[1]).recursive(X[cutoff:cutoff + 1])[0]
+        seconds = time.perf_counter() - fit_start
+        actuals = y[cutoff:cutoff + horizon]
+        for step, (actual, prediction) in enumerate(zip(actuals, predictions), start=1):
+            records.append({"nutrient": nutrient, "model": family, "cutoff": cutoff, "train_rows": cutoff - start,
+                            "horizon": step, "actual": float(actual), "prediction": float(prediction),
+                            "fold_seconds": round(seconds, 3)})
+    return records
+
+
+def summarize(folds):
+    """RMSE, MAPE (%) and bias (mean prediction - actual) per nutrient, model and horizon step"""
+    errors = folds.assign(error=folds["prediction"] - folds["actual"])
+    nonzero = errors["actual"] != 0
+    errors["ape"] = np.where(nonzero, np.abs(errors["error"]) / np.abs(errors["actual"].where(nonzero, 1)), np.nan)
+    grouped = errors.groupby(["nutrient", "model", "horizon"])
+    summary = pd.DataFrame({
+        "folds": grouped.size(),
+        "rmse": np.sqrt(grouped["error"].apply(lambda e: np.mean(e ** 2))),
+        "mape": grouped["ape"].mean() * 100,
+        "bias": grouped["error"].mean(),
+    })
+    return summary.reset_index()
+
+
+def run_backtest(nutrient_list=None, families=None, horizon=DEFAULT_HORIZON, n_folds=None, step=1, mode="expanding",
+                 window=52, min_train=26, core_budget=None, data_dir=engineered_dir, output_dir=backtest_dir,
+                 storage_format=None, params_dir=models_dir):
+    """
+    Rolling/expanding-origin backtest of every (nutrient, model family) over many cutoffs
+    Folds are spread over a process pool; workers memory-map the shared feature store
+    Each (nutrient, family) is fitted with the tuned settings in params_dir, like the training scripts
+    Writes every fold prediction plus a per-horizon summary, and returns the summary
+    """
+    if mode not in ["expanding", "rolling"]:
+        raise ValueError("Invalid backtest mode. Use 'expanding' or 'rolling'")
+    nutrient_list = nutrient_list or nutrients
+    families = families or model_families
+    # Build/refresh the feature store once here; workers only map it
+    build_store(nutrient_list, data_dir)
+
+    tasks = []
+    for nutrient in nutrient_list:
+        cutoffs = make_cutoffs(len(load_features(nutrient, data_dir, refresh=False)), horizon, n_folds, step, min_train)
+        for family in families:
+            for i in range(0, len(cutoffs), FOLDS_PER_TASK):
+                tasks.append((nutrient, family, cutoffs[i:i + FOLDS_PER_TASK]))
+    tasks.sort(key=lambda task: JOB_COST.get(task[1], 1), reverse=True)
+
+    workers, threads = plan_core_split(len(tasks), core_budget or os.cpu_count() or 1)
+    n_fold_runs = sum(len(task[2]) for task in tasks)
+    print(f"🔹 Backtesting {n_fold_runs} folds in {len(tasks)} tasks on {workers} workers x {threads} threads")
+
+    records = []
+    start = time.perf_counter()
+    # spawn, as in the training orchestrator: TensorFlow/OpenMP state must not be forked
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(nutrient_list, data_dir)) as pool:
+        futures = {pool.submit(run_folds, nutrient, family, cutoffs, horizon, mode, window, threads,
+                               params_dir): (nutrient, family)
+                   for nutrient, family, cutoffs in tasks}
+        for future in as_completed(futures):
+            nutrient, family = futures[future]
+            try:
+                records.extend(future.result())
+            except Exception as e:
+                print(f"❌ {family} | {nutrient} → backtest task failed: {e}")
+    print(f"✅ Backtest finished in {time.perf_counter() - start:.1f}s")
+
+    if not records:
+        raise RuntimeError("No backtest folds completed")
+    folds = pd.DataFrame(records).sort_values(["nutrient", "model", "cutoff", "horizon"]).reset_index(drop=True)
+    folds.insert(0, "mode", mode)
+    summary = summarize(folds)
+
+    os.makedirs(output_dir, exist_ok=True)
+    folds_path = write_frame(folds, os.path.join(output_dir, "backtest_folds"), storage_format)
+    summary_path = os.path.join(output_dir, "backtest_summary.csv")
+    summary.to_csv(summary_path, index=False)
+    print(f"📄 Saved fold predictions: {folds_path}")
+    print(f"📄 Saved summary: {summary_path}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rolling/expanding-origin backtests for all nutrient models")
+    parser.add_argument("--nutrients", nargs="+", default=nutrients, choices=nutrients)
+    parser.add_argument("--models", nargs="+", default=model_families, choices=model_families)
+    parser.add_argument("--horizon", type=int, default=DEFAULT_HORIZON)
+    parser.add_argument("--folds", type=int, default=None, help="Most recent cutoffs to evaluate (default: all)")
+    parser.add_argument("--step", type=int, default=1, help="Rows between consecutive cutoffs")
+    parser.add_argument("--mode", default="expanding", choices=["expanding", "rolling"])
+    parser.add_argument("--window", type=int, default=52, help="Training rows per fold in rolling mode")
+    parser.add_argument("--min-train", type=int, default=26, help="Minimum training rows for the first cutoff")
+    parser.add_argument("--cores", type=int, default=None, help="Total core budget (default: all cores)")
+    parser.add_argument("--params-dir", default=models_dir, help="Directory of the tuned *_best_params.json files")
+    args = parser.parse_args()
+    summary = run_backtest(args.nutrients, args.models, args.horizon, args.folds, args.step, args.mode,
+                           args.window, args.min_train, args.cores, params_dir=args.params_dir)
+    print(summary.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+
+class LatencyTracker:
+    def __init__(self, window=10000):
+        """
+        Rolling latency statistics
+        window: Number of most recent observations kept per metric
+        """
+        self.window = window
+        self._samples = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            if name not in self._samples:
+                self._samples[name] = deque(maxlen=self.window)
+                self._counts[name] = 0
+            self._samples[name].append(seconds)
+            self._counts[name] += 1
+
+    def summary(self):
+        """p50/p99/max in milliseconds plus total counts per metric"""
+        with self._lock:
+            snapshot = {name: np.fromiter(samples, dtype=np.float64) for name, samples in self._samples.items()}
+            counts = dict(self._counts)
+        report = {}
+        for name, values in snapshot.items():
+            if len(values) == 0:
+                continue
+            p50, p99 = np.percentile(values, [50, 99]) * 1000
+            report[name] = {
+                'count': counts[name],
+                'p50_ms': round(float(p50), 3),
+                'p99_ms': round(float(p99), 3),
+                'max_ms': round(float(values.max() * 1000), 3)
+            }
+        return report
+
+
+class MicroBatcher:
+    def __init__(self, predict_fn, max_batch_rows=256, max_wait_ms=5.0, name='model', tracker=None):
+        """
+        Coalesce concurrent predict requests into single predict calls
+        predict_fn: Callable mapping a (n_rows, n_features) array to (n_rows, n_outputs)
+        max_batch_rows: Flush as soon as this many rows are queued
+        max_wait_ms: Longest time the first queued request waits for others to join
+        name: Label used in latency/batch-size statistics
+        tracker: Optional LatencyTracker receiving 'batch:<name>' timings
+        """
+        self.predict_fn = predict_fn
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        self.tracker = tracker
+
+        self._queue = None
+        self._worker = None
+        self.batches = 0
+        self.rows = 0
+
+    def _ensure_started(self):
+        # Bound lazily to the running event loop (the server's loop, or a test loop)
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, X):
+        """Queue rows for prediction and wait for their results"""
+        self._ensure_started()
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((X, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            X, future = await self._queue.get()
+            pending = [(X, future)]
+            n_rows = len(X)
+            deadline = loop.time() + self.max_wait
+
+            # Gather more requests until the row budget or the deadline is hit
+            while n_rows < self.max_batch_rows:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    X, future = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                pending.append((X, future))
+                n_rows += len(X)
+
+            start = time.perf_counter()
+            try:
+                # Mismatched row widths fail here; the error still goes to every waiting request
+                batch = np.vstack([x for x, _ in pending])
+                # Run the model off the event loop so new requests keep queueing meanwhile
+                preds = await loop.run_in_executor(None, self.predict_fn, batch)
+            except Exception as e:
+                for _, fut in pending:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            if self.tracker is not None:
+                self.tracker.record(f'batch:{self.name}', time.perf_counter() - start)
+            self.batches += 1
+            self.rows += len(batch)
+
+            # Scatter results back in submission order
+            offset = 0
+            for x, fut in pending:
+                if not fut.done():
+                    fut.set_result(preds[offset:offset + len(x)])
+                offset += len(x)
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'rows': self.rows,
+            'mean_batch_rows': round(self.rows / self.batches, 2) if self.batches else 0.0
+        }
@@ -2,22 +2,28 @@ import pandas as pd
 import numpy as np
 import os
 from datetime import datetime
+from src.storage import get_storage, read_frame
+from src.ingestion import (iter_item_chunks, value_columns_for, partial_daily_aggregates,
+                           combine_partials, daily_means, DEFAULT_CHUNKSIZE)
+from src.execution_backends import aggregation_columns, daily_value_columns, get_backend
+from src.logging_utils import get_pipeline_logger, log_path, timed
+from src.memory import compact_frame, compact_read_dtypes, is_compact, resolve_memory_mode
 
 class DailyFoodWasteCalculator:
-    def __init__(self, base_dir=None):
+    def __init__(self, base_dir=None, storage_format=None, memory_mode=None):
         """
         Initialize the DailyFoodWasteCalculator class
         base_dir: Base directory for all data operations (should be your project root)
+        storage_format: Output format for the daily data ('parquet', 'feather' or 'csv')
+        memory_mode: 'compact' loads float32/categorical data and only the aggregated columns
+            (defaults to NUTRIMATCH_MEMORY_MODE)
         """
         # Set project root directory
         self.base_dir = base_dir if base_dir else os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 
-        # Set up log file
-        self.log_file = os.path.join(self.base_dir, 'logs',
-                                   f'daily_food_waste_log_{datetime.now().strftime("%Y%m%d_%H%M%S")}.txt')
-
-        # Create logs directory if it doesn't exist
-        os.makedirs(os.path.join(self.base_dir, 'logs'), exist_ok=True)
+        # Shared, buffered JSON log (logs/pipeline.jsonl, rotated by size or time)
+        self.logger = get_pipeline_logger('daily_food_waste', self.base_dir)
+        self.log_file = log_path(self.base_dir)
 
         # Directory structure
         self.data_dirs = {
@@ -30,6 +36,8 @@ class DailyFoodWasteCalculator:
         }
 
         self.create_directories()
+        self.storage = get_storage(storage_format)
+        self.memory_mode = resolve_memory_mode(memory_mode)
         self.df = None
         self.daily_waste_df = None
         self.original_shape = None
@@ -40,14 +48,11 @@ class DailyFoodWasteCalculator:
             os.makedirs(dir_path, exist_ok=True)
             self.log_message(f"Directory exists: {dir_path}")
 
-    def log_message(self, message):
-        """Log messages with timestamp"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_message = f"[{timestamp}] {message}\n"
-        print(message)
-        with open(self.log_file, 'a') as f:
-            f.write(log_message)
+    def log_message(self, message, **fields):
+        """Log a message (plus optional structured fields) to the console and the pipeline log"""
+        self.logger.info(message, extra={'fields': fields})
 
+    @timed('load_processed_data', rows='df')
     def load_processed_data(self, file_name):
         """
         Load the processed dataset
@@ -65,8 +70,18 @@ class DailyFoodWasteCalculator:
 
             self.log_message(f"Loading data from: {source_path}")
 
-            # Read CSV with dayfirst=True to handle day/month format
-            self.df = pd.read_csv(source_path, parse_dates=['Date'], dayfirst=True)
+            # Compact mode drops descriptions, codes and prices before they are ever materialized
+            columns, dtype = None, None
+            if is_compact(self.memory_mode):
+                columns = aggregation_columns(source_path)
+                dtype = compact_read_dtypes(source_path, columns)
+
+            # CSV dates are day/month; columnar files already store Date as a datetime
+            self.df = read_frame(source_path, columns=columns, parse_dates=['Date'], dayfirst=True, dtype=dtype)
+            if not pd.api.types.is_datetime64_any_dtype(self.df['Date']):
+                self.df['Date'] = pd.to_datetime(self.df['Date'], dayfirst=True)
+            if is_compact(self.memory_mode):
+                self.df = compact_frame(self.df)
             self.original_shape = self.df.shape
 
             self.log_message(f"Data loaded successfully. Shape: {self.df.shape}")
@@ -75,13 +90,12 @@ class DailyFoodWasteCalculator:
             self.log_message(f"Error loading data: {str(e)}")
             return False
 
+    @timed('calculate_daily_food_waste', rows='daily_waste_df')
     def calculate_daily_food_waste(self):
         """Calculate average daily food waste for each nutrient"""
         try:
             # List of nutrient columns (adjust these based on your actual columns)
-            nutrient_columns = [col for col in self.df.columns 
-                               if col not in ['Date', 'Quantity'] and 
-                               self.df[col].dtype in [np.float64, np.int64]]
+            nutrient_columns = value_columns_for(self.df)
 
             self.log_message("Starting daily food waste calculation...")
             self.log_message(f"Nutrient columns being processed: {nutrient_columns}")
@@ -105,6 +119,77 @@ class DailyFoodWasteCalculator:
             self.log_message(f"Error calculating daily food waste: {str(e)}")
             return False
 
+    @timed('calculate_daily_food_waste_streaming', rows='daily_waste_df')
+    def calculate_daily_food_waste_streaming(self, file_name, chunksize=DEFAULT_CHUNKSIZE):
+        """
+        Calculate daily food waste without loading the whole file
+        Each chunk is reduced to per-day sums/counts which are added together,
+        so memory depends on the number of days, not the number of rows
+        file_name: Processed or raw item file (CSV, Parquet or Feather)
+        """
+        try:
+            source_path = os.path.join(self.data_dirs['processed'], file_name)
+            if not os.path.exists(source_path):
+                source_path = os.path.join(self.base_dir, file_name)
+                if not os.path.exists(source_path):
+                    raise FileNotFoundError(f"File not found at: {source_path}")
+
+            self.log_message(f"Streaming daily food waste calculation from: {source_path}")
+            totals = None
+            value_columns = None
+            rows = 0
+            n_columns = 0
+            for chunk in iter_item_chunks(source_path, chunksize, memory_mode=self.memory_mode):
+                if value_columns is None:
+                    value_columns = value_columns_for(chunk)
+                    self.log_message(f"Nutrient columns being processed: {value_columns}")
+                totals = combine_partials(totals, partial_daily_aggregates(chunk, value_columns))
+                rows += len(chunk)
+                n_columns = chunk.shape[1]
+
+            if totals is None:
+                raise ValueError(f"No rows found in {source_path}")
+
+            self.original_shape = (rows, n_columns)
+            self.daily_waste_df = daily_means(totals, value_columns).sort_index().reset_index()
+
+            self.log_message(f"Daily food waste calculated from {rows} rows. Shape: {self.daily_waste_df.shape}")
+            self.log_message(f"Date range: {self.daily_waste_df['Date'].min()} to {self.daily_waste_df['Date'].max()}")
+            return True
+        except Exception as e:
+            self.log_message(f"Error calculating daily food waste: {str(e)}")
+            return False
+
+    @timed('calculate_daily_food_waste_lazy', rows='daily_waste_df')
+    def calculate_daily_food_waste_lazy(self, file_name, backend=None):
+        """
+        Calculate daily food waste with an out-of-core dataframe backend
+        Only Date, Quantity and the nutrient columns are read from the file
+        file_name: Processed or raw item file (CSV, Parquet or Feather)
+        backend: 'pandas' (chunked), 'polars' (lazy, multi-core) or 'dask';
+            defaults to NUTRIMATCH_DATAFRAME_BACKEND
+        """
+        try:
+            source_path = os.path.join(self.data_dirs['processed'], file_name)
+            if not os.path.exists(source_path):
+                source_path = os.path.join(self.base_dir, file_name)
+                if not os.path.exists(source_path):
+                    raise FileNotFoundError(f"File not found at: {source_path}")
+
+            engine = get_backend(backend, self.memory_mode)
+            value_columns = daily_value_columns(engine, source_path)
+            self.log_message(f"Calculating daily food waste from {source_path} with the {engine.name} backend...")
+            self.log_message(f"Nutrient columns being processed: {value_columns}")
+            self.daily_waste_df = engine.daily(source_path, value_columns)
+
+            self.log_message(f"Daily food waste calculated. Shape: {self.daily_waste_df.shape}")
+            self.log_message(f"Date range: {self.daily_waste_df['Date'].min()} to {self.daily_waste_df['Date'].max()}")
+            return True
+        except Exception as e:
+            self.log_message(f"Error calculating daily food waste: {str(e)}")
+            return False
+
+    @timed('save_daily_waste_data', rows='daily_waste_df')
     def save_daily_waste_data(self, file_name='daily_food_waste.csv'):
         """Save the daily food waste dataset"""
         try:
@@ -115,10 +200,10 @@ class DailyFoodWasteCalculator:
             os.makedirs(self.data_dirs['processed'], exist_ok=True)
 
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            file_name_with_timestamp = f"{os.path.splitext(file_name)[0]}_{timestamp}{os.path.splitext(file_name)[1]}"
+            file_name_with_timestamp = f"{os.path.splitext(file_name)[0]}_{timestamp}{self.storage.extension}"
             save_path = os.path.join(self.data_dirs['processed'], file_name_with_timestamp)
 
-            self.daily_waste_df.to_csv(save_path, index=False)
+            self.storage.write(self.daily_waste_df, save_path)
             self.log_message(f"Daily food waste data saved to {save_path}")
 
             # Save summary statistics
@@ -139,7 +224,7 @@ class DailyFoodWasteCalculator:
             return save_path
         except Exception as e:
             self.log_message(f"Error saving daily waste data: {str(e)}")
-            return None
+            return False
 
 def main():
     # Initialize calculator with the project root directory
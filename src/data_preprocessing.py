@@ -1,24 +1,28 @@
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import MinMaxScaler
-from sklearn.model_selection import train_test_split
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
 from datetime import datetime
+import shutil
+from src.storage import get_storage, read_frame, with_extension
+from src.ingestion import iter_item_chunks, DEFAULT_CHUNKSIZE
+from src.logging_utils import get_pipeline_logger, log_path, timed
+from src.memory import compact_frame, compact_read_dtypes, is_compact, resolve_memory_mode
 
 class DataPreprocessor:
-    def __init__(self, base_dir=None):
+    def __init__(self, base_dir=None, storage_format=None, memory_mode=None):
         """
         Initialize the DataPreprocessor class
         base_dir: Base directory for all data operations (should be your project root)
+        storage_format: Output format for backups and processed data ('parquet', 'feather' or 'csv')
+        memory_mode: 'compact' loads numerics as float32/small ints, descriptions and codes as
+            category and Unit Price as a number (defaults to NUTRIMATCH_MEMORY_MODE)
         """
         # Set project root directory
         self.base_dir = base_dir if base_dir else os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
         
-        # Set up log file
-        self.log_file = os.path.join(self.base_dir, 'logs',
-                                   f'preprocessing_log_{datetime.now().strftime("%Y%m%d_%H%M%S")}.txt')
+        # Shared, buffered JSON log (logs/pipeline.jsonl, rotated by size or time)
+        self.logger = get_pipeline_logger('preprocessing', self.base_dir)
+        self.log_file = log_path(self.base_dir)
         
         # Create logs directory if it doesn't exist
         os.makedirs(os.path.join(self.base_dir, 'logs'), exist_ok=True)
@@ -35,8 +39,9 @@ class DataPreprocessor:
         
         self.create_directories()
 
+        self.storage = get_storage(storage_format)
+        self.memory_mode = resolve_memory_mode(memory_mode)
         self.df = None
-        self.scaler = MinMaxScaler()
         self.original_shape = None
         self.normalized_columns = []
         self.missing_values_handled = False
@@ -47,14 +52,11 @@ class DataPreprocessor:
             os.makedirs(dir_path, exist_ok=True)
             self.log_message(f"Directory exists: {dir_path}")
 
-    def log_message(self, message):
-        """Log messages with timestamp"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_message = f"[{timestamp}] {message}\n"
-        print(message)
-        with open(self.log_file, 'a') as f:
-            f.write(log_message)
+    def log_message(self, message, **fields):
+        """Log a message (plus optional structured fields) to the console and the pipeline log"""
+        self.logger.info(message, extra={'fields': fields})
 
+    @timed('load_data', rows='df')
     def load_data(self, file_name, source_dir=None):
         """
         Load the dataset from specified directory
@@ -69,33 +71,97 @@ class DataPreprocessor:
             if not os.path.exists(source_path):
                 raise FileNotFoundError(f"File not found at: {source_path}")
                 
-            self.df = pd.read_csv(source_path)
+            dtype = compact_read_dtypes(source_path) if is_compact(self.memory_mode) else None
+            self.df = read_frame(source_path, dtype=dtype)
             self.original_shape = self.df.shape
             self.log_message(f"Data loaded successfully from {source_path}. Shape: {self.df.shape}")
 
             # Save backup
-            backup_path = os.path.join(self.data_dirs['interim'], f'backup_{datetime.now().strftime("%Y%m%d")}_{file_name}')
-            self.df.to_csv(backup_path, index=False)
+            backup_name = with_extension(f'backup_{datetime.now().strftime("%Y%m%d")}_{file_name}', self.storage)
+            backup_path = os.path.join(self.data_dirs['interim'], backup_name)
+            self.storage.write(self.df, backup_path)
             self.log_message(f"Backup created at {backup_path}")
 
+            if is_compact(self.memory_mode):
+                # Unit Price is parsed here once; later stages find it numeric
+                self.df = compact_frame(self.df)
+
             return True
         except Exception as e:
             self.log_message(f"Error loading data: {str(e)}")
             return False
 
+    def stream_chunks(self, file_name, source_dir=None, chunksize=DEFAULT_CHUNKSIZE, backup=True):
+        """
+        Stream a raw item log in bounded chunks instead of loading it whole
+        Each chunk comes back typed (datetime Date, numeric Unit Price)
+        backup: Copy the raw file to data/interim byte-for-byte (no parsing, constant memory)
+        """
+        source_path = os.path.join(source_dir if source_dir else self.data_dirs['raw'], file_name)
+        self.log_message(f"Streaming data from: {source_path} (chunksize={chunksize})")
+        if not os.path.exists(source_path):
+            raise FileNotFoundError(f"File not found at: {source_path}")
+
+        if backup:
+            backup_path = os.path.join(self.data_dirs['interim'], f'backup_{datetime.now().strftime("%Y%m%d")}_{file_name}')
+            shutil.copyfile(source_path, backup_path)
+            self.log_message(f"Backup created at {backup_path}")
+
+        rows = 0
+        for chunk in iter_item_chunks(source_path, chunksize, memory_mode=self.memory_mode):
+            rows += len(chunk)
+            yield chunk
+        self.log_message(f"Streamed {rows} rows from {source_path}")
+
+    @timed('save_processed_stream')
+    def save_processed_stream(self, file_name, output_name='processed_data.csv', source_dir=None,
+                              chunksize=DEFAULT_CHUNKSIZE):
+        """Preprocess a raw log chunk by chunk into one processed file; peak memory is one chunk"""
+        try:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            save_path = os.path.join(self.data_dirs['processed'],
+                                     f"{os.path.splitext(output_name)[0]}_{timestamp}{self.storage.extension}")
+            writer = self.storage.open_writer(save_path)
+            try:
+                for chunk in self.stream_chunks(file_name, source_dir, chunksize):
+                    writer.write(chunk)
+            finally:
+                writer.close()
+            self.log_message(f"Processed data saved to {save_path}")
+            return save_path
+        except Exception as e:
+            self.log_message(f"Error streaming data: {e}")
+            return False
+
+    def parse_dates(self, columns=('Date',), dayfirst=True):
+        """
+        Convert day/month/year date strings to datetimes once, so typed
+        outputs carry them and later stages skip date inference
+        """
+        try:
+            for col in columns:
+                if col in self.df.columns and not pd.api.types.is_datetime64_any_dtype(self.df[col]):
+                    self.df[col] = pd.to_datetime(self.df[col], dayfirst=dayfirst)
+            self.log_message(f"Parsed date columns: {[c for c in columns if c in self.df.columns]}")
+            return True
+        except Exception as e:
+            self.log_message(f"Error parsing dates: {e}")
+            return False
+
+    @timed('save_processed_data', rows='df')
     def save_processed_data(self, file_name, custom_dir=None):
         """Save the processed dataset"""
         try:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            file_name_with_timestamp = f"{os.path.splitext(file_name)[0]}_{timestamp}{os.path.splitext(file_name)[1]}"
+            file_name_with_timestamp = f"{os.path.splitext(file_name)[0]}_{timestamp}{self.storage.extension}"
             save_path = os.path.join(custom_dir if custom_dir else self.data_dirs['processed'],
                                    file_name_with_timestamp)
-            self.df.to_csv(save_path, index=False)
+            self.storage.write(self.df, save_path)
             self.log_message(f"Processed data saved to {save_path}")
             return save_path
         except Exception as e:
             self.log_message(f"Error saving data: {e}")
-            return None
+            return False
 
 def main():
     # Initialize preprocessor - no need for custom base_dir if running from project root
@@ -118,6 +184,7 @@ def main():
 
     # Add your preprocessing steps here
     # preprocessor.df = preprocessor.df.dropna()  # Example
+    preprocessor.parse_dates()
     
     # Save processed data
     processed_path = preprocessor.save_processed_data('processed_data.csv')
@@ -1,9 +1,10 @@
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
 import os
 from datetime import datetime
 import joblib
+from src.storage import read_frame, resolve_frame
+from src.logging_utils import get_pipeline_logger, log_path, timed
 
 class DataSplitter:
     def __init__(self, base_dir=None):
@@ -14,9 +15,9 @@ class DataSplitter:
         # Set project root directory
         self.base_dir = base_dir if base_dir else os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 
-        # Set up log file
-        self.log_file = os.path.join(self.base_dir, 'logs',
-                                   f'data_splitting_log_{datetime.now().strftime("%Y%m%d_%H%M%S")}.txt')
+        # Shared, buffered JSON log (logs/pipeline.jsonl, rotated by size or time)
+        self.logger = get_pipeline_logger('data_splitting', self.base_dir)
+        self.log_file = log_path(self.base_dir)
 
         # Directory structure
         self.data_dirs = {
@@ -41,24 +42,18 @@ class DataSplitter:
         self.y_val = None
         self.timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
-    def log_message(self, message):
-        """Log messages with timestamp"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_message = f"[{timestamp}] {message}\n"
-        print(message)
-        with open(self.log_file, 'a') as f:
-            f.write(log_message)
+    def log_message(self, message, **fields):
+        """Log a message (plus optional structured fields) to the console and the pipeline log"""
+        self.logger.info(message, extra={'fields': fields})
 
+    @timed('load_data', rows='data')
     def load_data(self, input_file):
         """Load the engineered features dataset"""
         try:
-            input_path = os.path.join(self.data_dirs['engineered'], input_file)
+            input_path = resolve_frame(os.path.join(self.data_dirs['engineered'], input_file))
             self.log_message(f"Loading data from: {input_path}")
 
-            if not os.path.exists(input_path):
-                raise FileNotFoundError(f"File not found: {input_path}")
-
-            self.data = pd.read_csv(input_path)
+            self.data = read_frame(input_path)
             self.log_message(f"Data loaded successfully. Shape: {self.data.shape}")
             self.log_message(f"Available columns: {self.data.columns.tolist()}")
             return True
@@ -93,14 +88,20 @@ class DataSplitter:
             self.log_message(f"Error preparing data: {str(e)}")
             return False
 
-    def perform_train_test_split(self, test_size=0.2, random_state=42):
-        """Perform basic train-test split"""
+    @timed('perform_train_test_split', rows='X_train')
+    def perform_train_test_split(self, test_size=0.2, random_state=42, shuffle=False):
+        """
+        Perform basic train-test split
+        Rows are weekly observations, so the split is chronological by default (the test set
+        is the most recent weeks); shuffle=True mixes future weeks into training
+        """
         try:
             if self.X is None or self.y is None:
                 raise ValueError("Data not prepared. Run prepare_data first.")
 
+            from sklearn.model_selection import train_test_split
             self.X_train, self.X_test, self.y_train, self.y_test = train_test_split(
-                self.X, self.y, test_size=test_size, random_state=random_state, shuffle=True
+                self.X, self.y, test_size=test_size, random_state=random_state if shuffle else None, shuffle=shuffle
             )
 
             self.log_message("Train-Test Split Results:")
@@ -113,14 +114,16 @@ class DataSplitter:
             self.log_message(f"Error in train-test split: {str(e)}")
             return False
 
-    def create_validation_set(self, val_size=0.2):
-        """Create a validation set from training data"""
+    def create_validation_set(self, val_size=0.2, shuffle=False):
+        """Create a validation set from training data (the latest training weeks unless shuffle=True)"""
         try:
             if self.X_train is None or self.y_train is None:
                 raise ValueError("Train-test split not performed yet.")
 
+            from sklearn.model_selection import train_test_split
             self.X_train, self.X_val, self.y_train, self.y_val = train_test_split(
-                self.X_train, self.y_train, test_size=val_size, random_state=42
+                self.X_train, self.y_train, test_size=val_size, random_state=42 if shuffle else None,
+                shuffle=shuffle
             )
 
             self.log_message("Validation Split Results:")
@@ -133,6 +136,7 @@ class DataSplitter:
             self.log_message(f"Error creating validation set: {str(e)}")
             return False
 
+    @timed('save_split_data')
     def save_split_data(self):
         """Save the split datasets"""
         try:
@@ -0,0 +1,232 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.ingestion import (DEFAULT_CHUNKSIZE, NON_VALUE_COLUMNS, combine_partials, daily_means, iter_item_chunks,
+                           partial_daily_aggregates, week_start)
+from src.storage import sample_dtypes
+
+# Backend used by the aggregation stages when none is given
+DEFAULT_BACKEND = os.environ.get('NUTRIMATCH_DATAFRAME_BACKEND', 'pandas')
+
+# Rows sampled to infer column types before the full scan
+_SCHEMA_SAMPLE_ROWS = 1000
+
+
+def numeric_columns(dtypes, exclude=()):
+    """Numeric column names from a {column: dtype} mapping, in file order"""
+    return [col for col, dtype in dtypes.items()
+            if col not in exclude and pd.api.types.is_numeric_dtype(dtype)]
+
+
+def finish_weekly(weekly):
+    """
+    Add ISO Year/Week and Week_End to a frame keyed by Week_Start (Monday)
+    isocalendar runs once per week here, not once per input row
+    """
+    weekly = weekly.sort_values('Week_Start').reset_index(drop=True)
+    iso = weekly['Week_Start'].dt.isocalendar()
+    weekly['Year'] = iso['year'].astype('int64')
+    weekly['Week'] = iso['week'].astype('int64')
+    weekly['Week_End'] = weekly['Week_Start'] + pd.Timedelta(days=6)
+    leading = ['Year', 'Week', 'Week_Start', 'Week_End']
+    return weekly[leading + [col for col in weekly.columns if col not in leading]]
+
+
+class PandasBackend:
+    """
+    Chunked pandas: reads only the needed columns, chunk by chunk, and adds up per-group
+    partial sums, so memory is bounded by the number of days/weeks (single core)
+    """
+    name = 'pandas'
+
+    def __init__(self, chunksize=DEFAULT_CHUNKSIZE, memory_mode=None):
+        self.chunksize = chunksize
+        self.memory_mode = memory_mode
+
+    def dtypes(self, path):
+        return sample_dtypes(path, _SCHEMA_SAMPLE_ROWS)
+
+    def daily(self, path, value_columns):
+        columns = ['Date'] + list(value_columns) + (['Quantity'] if 'Quantity' in self.dtypes(path) else [])
+        totals = None
+        for chunk in iter_item_chunks(path, self.chunksize, columns=columns, memory_mode=self.memory_mode):
+            totals = combine_partials(totals, partial_daily_aggregates(chunk, value_columns))
+        if totals is None:
+            raise ValueError(f"No rows found in {path}")
+        return daily_means(totals, value_columns).sort_index().reset_index()
+
+    def weekly(self, path, value_columns, agg_method='sum'):
+        totals = None
+        for chunk in iter_item_chunks(path, self.chunksize, columns=['Date'] + list(value_columns),
+                                      memory_mode=self.memory_mode):
+            weeks = week_start(chunk['Date']).rename('Week_Start')
+            grouped = chunk[list(value_columns)].astype(np.float64).groupby(weeks)
+            partial = grouped.sum().join(grouped.count().add_suffix('__count'))
+            totals = combine_partials(totals, partial)
+        if totals is None:
+            raise ValueError(f"No rows found in {path}")
+        for col in value_columns:
+            # Weeks without a single value stay NaN (like sum(min_count=1)) rather than 0
+            counts = totals.pop(f'{col}__count')
+            totals[col] = totals[col].where(counts > 0)
+            if agg_method == 'mean':
+                totals[col] = totals[col] / counts.where(counts > 0)
+        return finish_weekly(totals.reset_index())
+
+
+class PolarsBackend:
+    """
+    Polars LazyFrame: the scan only reads the selected columns (projection pushdown),
+    the group-by runs on all cores and the streaming engine processes larger-than-RAM files
+    """
+    name = 'polars'
+
+    def _scan(self, path):
+        import polars as pl
+        extension = os.path.splitext(path)[1].lower()
+        if extension == '.csv':
+            return pl.scan_csv(path, try_parse_dates=False)
+        if extension == '.parquet':
+            return pl.scan_parquet(path)
+        if extension == '.feather':
+            return pl.scan_ipc(path)
+        raise ValueError(f"Unsupported file type '{extension}' for {path}")
+
+    def _date(self, lf):
+        """Date column as pl.Date; CSV strings may be day/month/year (raw) or ISO (processed)"""
+        import polars as pl
+        dtype = lf.collect_schema()['Date']
+        if dtype == pl.String:
+            return pl.coalesce(pl.col('Date').str.to_date('%d/%m/%Y', strict=False),
+                               pl.col('Date').str.to_datetime(strict=False).dt.date()).alias('Date')
+        return pl.col('Date').cast(pl.Date)
+
+    def _collect(self, lf):
+        try:
+            return lf.collect(engine='streaming')
+        except TypeError:
+            # Polars < 1.23
+            return lf.collect(streaming=True)
+
+    def dtypes(self, path):
+        return self._scan(path).head(_SCHEMA_SAMPLE_ROWS).collect().to_pandas().dtypes.to_dict()
+
+    def daily(self, path, value_columns):
+        import polars as pl
+        lf = self._scan(path)
+        aggs = [pl.col(col).mean() for col in value_columns]
+        if 'Quantity' in lf.collect_schema().names():
+            aggs.append(pl.col('Quantity').sum().alias('Total_Quantity'))
+        query = (lf.select([self._date(lf)] + [pl.col(c) for c in value_columns]
+                           + ([pl.col('Quantity')] if len(aggs) > len(value_columns) else []))
+                 .group_by('Date').agg(aggs).sort('Date'))
+        daily = self._collect(query).to_pandas()
+        daily['Date'] = pd.to_datetime(daily['Date'])
+        return daily
+
+    def weekly(self, path, value_columns, agg_method='sum'):
+        import polars as pl
+        lf = self._scan(path)
+        date = self._date(lf)
+        # A week without a single value stays null (like pandas' sum(min_count=1)) rather than 0
+        agg = {'sum': lambda c: pl.when(pl.col(c).count() > 0).then(pl.col(c).sum()).alias(c),
+               'mean': lambda c: pl.col(c).mean()}[agg_method]
+        query = (lf.select([date] + [pl.col(c) for c in value_columns])
+                 .with_columns((pl.col('Date') - pl.duration(days=pl.col('Date').dt.weekday() - 1)).alias('Week_Start'))
+                 .group_by('Week_Start').agg([agg(c) for c in value_columns]))
+        weekly = self._collect(query).to_pandas()
+        weekly['Week_Start'] = pd.to_datetime(weekly['Week_Start'])
+        return finish_weekly(weekly)
+
+
+class DaskBackend:
+    """
+    Dask DataFrame: partitioned reads of only the selected columns, group-by partials
+    combined across partitions on a multi-core scheduler
+    """
+    name = 'dask'
+
+    def __init__(self, blocksize='64MB', scheduler='threads'):
+        self.blocksize = blocksize
+        self.scheduler = scheduler
+
+    def _read(self, path, columns):
+        import dask.dataframe as dd
+        extension = os.path.splitext(path)[1].lower()
+        if extension == '.csv':
+            return dd.read_csv(path, usecols=columns, blocksize=self.blocksize)
+        if extension == '.parquet':
+            return dd.read_parquet(path, columns=columns)
+        raise ValueError(f"Dask backend reads CSV or Parquet, not '{extension}' ({path})")
+
+    def _dates(self, ddf):
+        import dask.dataframe as dd
+        if pd.api.types.is_datetime64_any_dtype(ddf['Date'].dtype):
+            return ddf['Date'].dt.normalize()
+        return dd.to_datetime(ddf['Date'], dayfirst=True).dt.normalize()
+
+    def dtypes(self, path):
+        return PandasBackend().dtypes(path)
+
+    def daily(self, path, value_columns):
+        has_quantity = 'Quantity' in self.dtypes(path)
+        ddf = self._read(path, ['Date'] + list(value_columns) + (['Quantity'] if has_quantity else []))
+        ddf['Date'] = self._dates(ddf)
+        daily = ddf.groupby('Date')[list(value_columns)].mean()
+        if has_quantity:
+            daily['Total_Quantity'] = ddf.groupby('Date')['Quantity'].sum()
+        return daily.compute(scheduler=self.scheduler).sort_index().reset_index()
+
+    def weekly(self, path, value_columns, agg_method='sum'):
+        ddf = self._read(path, ['Date'] + list(value_columns))
+        dates = self._dates(ddf)
+        # Days since Monday; works partition-wise, unlike pd.to_timedelta
+        ddf['Week_Start'] = dates - dates.dt.weekday.astype('int64') * np.timedelta64(1, 'D')
+        grouped = ddf.groupby('Week_Start')[list(value_columns)]
+        if agg_method == 'sum':
+            # A week without a single value stays NaN (like sum(min_count=1)) rather than 0
+            sums, counts = grouped.sum(), grouped.count()
+            weekly = sums.where(counts > 0).compute(scheduler=self.scheduler)
+        else:
+            weekly = grouped.mean().compute(scheduler=self.scheduler)
+        return finish_weekly(weekly.reset_index())
+
+
+DATAFRAME_BACKENDS = {
+    'pandas': PandasBackend,
+    'polars': PolarsBackend,
+    'dask': DaskBackend
+}
+
+
+def get_backend(name=None, memory_mode=None):
+    """
+    Return an aggregation backend by name ('pandas', 'polars' or 'dask')
+    memory_mode: 'compact' downcasts the pandas backend's chunks (Polars and Dask already
+        keep Arrow-typed columns and read only the aggregated ones)
+    """
+    name = (name or DEFAULT_BACKEND).lower()
+    if name not in DATAFRAME_BACKENDS:
+        raise ValueError(f"Unknown dataframe backend '{name}'. Use one of {list(DATAFRAME_BACKENDS)}")
+    if name == 'pandas':
+        return PandasBackend(memory_mode=memory_mode)
+    return DATAFRAME_BACKENDS[name]()
+
+
+def daily_value_columns(backend, path):
+    """Columns averaged per day: numeric columns other than Date/Quantity/Unit Price"""
+    return numeric_columns(backend.dtypes(path), exclude=NON_VALUE_COLUMNS)
+
+
+def aggregation_columns(path):
+    """Date, Quantity and the daily value columns of an item file: everything the aggregation reads"""
+    dtypes = sample_dtypes(path, _SCHEMA_SAMPLE_ROWS)
+    quantity = ['Quantity'] if 'Quantity' in dtypes else []
+    return ['Date'] + quantity + numeric_columns(dtypes, exclude=NON_VALUE_COLUMNS)
+
+
+def weekly_value_columns(backend, path, exclude=()):
+    """Columns aggregated per week: numeric columns other than the calendar keys"""
+    return numeric_columns(backend.dtypes(path), exclude=['Year', 'Week'] + list(exclude))
@@ -1,26 +1,31 @@
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler
 import os
-from datetime import datetime
+from src.storage import get_storage, read_frame, with_extension
+from src.logging_utils import get_pipeline_logger, log_path, timed
+from src.memory import is_compact, resolve_memory_mode
+from src.transforms import RATIO_EPSILON, WEEKS_PER_YEAR, FeatureTransform, load_transform, transform_path
 
 class FeatureEngineer:
-    def __init__(self, input_data_path=None): 
+    def __init__(self, base_dir=None, storage_format=None, memory_mode=None):
         """
         Initialize the FeatureEngineer class
         base_dir: Base directory for all data operations (should be your project root)
+        storage_format: Output format for engineered features ('parquet', 'feather' or 'csv')
+        memory_mode: 'compact' engineers features as float32 (defaults to NUTRIMATCH_MEMORY_MODE)
         """
         # Set project root directory
         self.base_dir = base_dir if base_dir else os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 
-        # Set up log file
-        self.log_file = os.path.join(self.base_dir, 'logs',
-                                   f'feature_engineering_log_{datetime.now().strftime("%Y%m%d_%H%M%S")}.txt')
+        # Shared, buffered JSON log (logs/pipeline.jsonl, rotated by size or time)
+        self.logger = get_pipeline_logger('feature_engineering', self.base_dir)
+        self.log_file = log_path(self.base_dir)
 
         # Directory structure
         self.data_dirs = {
             'processed': os.path.join(self.base_dir, 'data', 'processed'),
             'engineered': os.path.join(self.base_dir, 'data', 'engineered'),
+            'models': os.path.join(self.base_dir, 'models'),
             'logs': os.path.join(self.base_dir, 'logs')
         }
 
@@ -29,18 +34,18 @@ class FeatureEngineer:
             os.makedirs(dir_path, exist_ok=True)
             self.log_message(f"Directory exists: {dir_path}")
 
+        self.storage = get_storage(storage_format)
+        self.memory_mode = resolve_memory_mode(memory_mode)
         self.df = None
-        self.scaler = StandardScaler()
+        # Ratio/interaction/week definitions and the fitted scaling, saved with the models
+        self.transform = FeatureTransform()
         self.original_columns = None
 
-    def log_message(self, message):
-        """Log messages with timestamp"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_message = f"[{timestamp}] {message}\n"
-        print(message)
-        with open(self.log_file, 'a') as f:
-            f.write(log_message)
+    def log_message(self, message, **fields):
+        """Log a message (plus optional structured fields) to the console and the pipeline log"""
+        self.logger.info(message, extra={'fields': fields})
 
+    @timed('load_weekly_data', rows='df')
     def load_weekly_data(self, file_name='weekly_food_waste_20250507_000105.csv'):
         """Load the weekly dataset from a fixed file name"""
         try:
@@ -48,7 +53,7 @@ class FeatureEngineer:
             self.log_message(f"Loading weekly data from: {source_path}")
             if not os.path.exists(source_path):
                 raise FileNotFoundError(f"File not found at: {source_path}")
-            self.df = pd.read_csv(source_path)
+            self.df = read_frame(source_path)
             self.original_columns = self.df.columns.tolist()
             self.log_message(f"Loaded weekly data successfully. Shape: {self.df.shape}")
             return True
@@ -59,17 +64,10 @@ class FeatureEngineer:
     def create_nutrient_ratios(self):
         """Create new features based on nutrient ratios"""
         try:
-            # Protein to Fat ratio
-            if 'Protein' in self.df.columns and 'Fat' in self.df.columns:
-                self.df['Protein_Fat_Ratio'] = self.df['Protein'] / (self.df['Fat'] + 1e-6)
-
-            # Carbs to Protein ratio
-            if 'Carbohydrates' in self.df.columns and 'Protein' in self.df.columns:
-                self.df['Carbs_Protein_Ratio'] = self.df['Carbohydrates'] / (self.df['Protein'] + 1e-6)
-
-            # Fiber to Carbs ratio
-            if 'Fiber' in self.df.columns and 'Carbohydrates' in self.df.columns:
-                self.df['Fiber_Carbs_Ratio'] = self.df['Fiber'] / (self.df['Carbohydrates'] + 1e-6)
+            # Protein/Fat, Carbs/Protein and Fiber/Carbs, as defined by the transform
+            for name, numerator, denominator in self.transform.ratios:
+                if numerator in self.df.columns and denominator in self.df.columns:
+                    self.df[name] = self.df[numerator] / (self.df[denominator] + RATIO_EPSILON)
 
             self.log_message("Created nutrient ratio features successfully")
             return True
@@ -80,17 +78,10 @@ class FeatureEngineer:
     def create_nutrient_interactions(self):
         """Create interaction features between nutrients"""
         try:
-            # Protein x Fat interaction
-            if 'Protein' in self.df.columns and 'Fat' in self.df.columns:
-                self.df['Protein_Fat_Interaction'] = self.df['Protein'] * self.df['Fat']
-
-            # Protein x Carbs interaction
-            if 'Protein' in self.df.columns and 'Carbohydrates' in self.df.columns:
-                self.df['Protein_Carbs_Interaction'] = self.df['Protein'] * self.df['Carbohydrates']
-
-            # Fat x Carbs interaction
-            if 'Fat' in self.df.columns and 'Carbohydrates' in self.df.columns:
-                self.df['Fat_Carbs_Interaction'] = self.df['Fat'] * self.df['Carbohydrates']
+            # Protein x Fat, Protein x Carbs and Fat x Carbs
+            for name, left, right in self.transform.interactions:
+                if left in self.df.columns and right in self.df.columns:
+                    self.df[name] = self.df[left] * self.df[right]
 
             self.log_message("Created nutrient interaction features successfully")
             return True
@@ -101,10 +92,10 @@ class FeatureEngineer:
     def create_time_features(self):
         """Create time-based features"""
         try:
-            if 'Week' in self.df.columns:
+            if self.transform.week_column in self.df.columns:
                 # Create cyclical features for week number
-                self.df['Week_Sin'] = np.sin(2 * np.pi * self.df['Week']/52.0)
-                self.df['Week_Cos'] = np.cos(2 * np.pi * self.df['Week']/52.0)
+                self.df['Week_Sin'] = np.sin(2 * np.pi * self.df[self.transform.week_column]/WEEKS_PER_YEAR)
+                self.df['Week_Cos'] = np.cos(2 * np.pi * self.df[self.transform.week_column]/WEEKS_PER_YEAR)
 
             self.log_message("Created time-based features successfully")
             return True
@@ -112,26 +103,71 @@ class FeatureEngineer:
             self.log_message(f"Error creating time features: {e}")
             return False
 
-    def normalize_features(self):
-        """Normalize numerical features"""
+    @timed('normalize_features', rows='df')
+    def normalize_features(self, partial=False):
+        """
+        Normalize numerical features (all but date and week-related columns)
+        partial: Update the statistics of an already fitted transform (see load_transform)
+            with these rows instead of refitting from scratch
+        """
         try:
-            # Select numerical columns excluding date and week-related columns
-            exclude_cols = ['Year', 'Week', 'Week_Start', 'Week_End']
-            num_cols = self.df.select_dtypes(include=['float64', 'int64']).columns
-            cols_to_normalize = [col for col in num_cols if col not in exclude_cols]
-
-            self.df[cols_to_normalize] = self.scaler.fit_transform(self.df[cols_to_normalize])
-            self.log_message(f"Normalized {len(cols_to_normalize)} features successfully")
+            if partial and self.transform.is_fitted:
+                self.transform.partial_fit(self.df, derived=True)
+            else:
+                self.transform.fit(self.df, derived=True)
+            self.df = self.transform.scale(self.df)
+            self.log_message(f"Normalized {len(self.transform.scaled_columns)} features successfully",
+                             partial=partial)
             return True
         except Exception as e:
             self.log_message(f"Error normalizing features: {e}")
             return False
 
+    @timed('engineer_features', rows='df')
+    def engineer_features(self, partial=False, dtype=None):
+        """
+        Ratios, interactions, week features and normalization in one fused pass
+        Produces the same columns as the four step methods above, but computes them from one
+        numeric block straight into a preallocated array instead of column by column
+        partial: Update the statistics of an already fitted transform instead of refitting
+        dtype: np.float32 halves the memory of the engineered block (default in compact mode)
+        """
+        try:
+            dtype = dtype or (np.float32 if is_compact(self.memory_mode) else np.float64)
+            self.df = self.transform.fit_transform(self.df, partial=partial, dtype=dtype)
+            self.log_message(f"Engineered and normalized {len(self.transform.scaled_columns)} features in one pass",
+                             partial=partial)
+            return True
+        except Exception as e:
+            self.log_message(f"Error engineering features: {e}")
+            return False
+
+    def save_transform(self, directory=None):
+        """Save the fitted transform next to the models (models/feature_transform.json)"""
+        try:
+            path = self.transform.save(transform_path(directory or self.data_dirs['models']))
+            self.log_message(f"Saved feature transform to: {path}")
+            return path
+        except Exception as e:
+            self.log_message(f"Error saving feature transform: {e}")
+            return None
+
+    def load_transform(self, directory=None):
+        """Reuse a previously fitted transform (e.g. before normalize_features(partial=True))"""
+        try:
+            self.transform = load_transform(directory or self.data_dirs['models'])
+            self.log_message(f"Loaded feature transform ({len(self.transform.scaled_columns)} scaled columns)")
+            return True
+        except Exception as e:
+            self.log_message(f"Error loading feature transform: {e}")
+            return False
+
+    @timed('save_engineered_features', rows='df')
     def save_engineered_features(self, file_name='engineered_features.csv'):
         """Save the engineered features to a fixed file name"""
         try:
-            output_path = os.path.join(self.data_dirs['engineered'], file_name)
-            self.df.to_csv(output_path, index=False)
+            output_path = os.path.join(self.data_dirs['engineered'], with_extension(file_name, self.storage))
+            self.storage.write(self.df, output_path)
             self.log_message(f"Saved engineered features to: {output_path}")
 
             # Save feature engineering summary
@@ -150,7 +186,7 @@ class FeatureEngineer:
             return output_path
         except Exception as e:
             self.log_message(f"Error saving engineered features: {e}")
-            return None
+            return False
 
 def main():
     try:
@@ -163,14 +199,12 @@ def main():
             print("Failed to load weekly data. Check the logs for details.")
             return
 
-        # Create features
-        fe.create_nutrient_ratios()
-        fe.create_nutrient_interactions()
-        fe.create_time_features()
-        fe.normalize_features()
+        # Create and normalize features in one pass
+        fe.engineer_features()
 
         # Save engineered features
         output_path = fe.save_engineered_features('engineered_features.csv')
+        fe.save_transform()
 
         if output_path:
             print(f"\nFeature engineering completed successfully!")
@@ -1,32 +1,117 @@
 import pandas as pd
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import os
-# Load and prepare the data
-df = pd.read_csv("data/processed/weekly_food_waste_20250507_000105.csv")
-df = df.rename(columns={
-    "Carbohydrates": "carbohydrates",
-    "Fiber": "fiber",
-    "Protein": "protein",
-    "Fat": "fat"
-})
-df = df.sort_values("Week").reset_index(drop=True)
-# Create output folder if not exists
-os.makedirs("data/engineered", exist_ok=True)
+from src.storage import read_frame, resolve_frame, write_frame, export_csv
+
+weekly_file = "data/processed/weekly_food_waste_20250507_000105.csv"
+engineered_dir = "data/engineered"
+nutrients = ["carbohydrates", "fiber", "protein", "fat"]
+time_cols = ["Year", "Week"]
+
+ROLLING_FUNCS = {
+    "mean": lambda w: w.mean(axis=-1),
+    "std": lambda w: w.std(axis=-1, ddof=1) if w.shape[-1] > 1 else np.zeros(w.shape[:-1]),
+    "min": lambda w: w.min(axis=-1),
+    "max": lambda w: w.max(axis=-1),
+    "sum": lambda w: w.sum(axis=-1),
+}
+
+def build_lag_features(df, value_cols, series_cols=None, lags=(1, 2, 3, 4),
+                       rolling_windows=(), rolling_stats=("mean",), order_cols=time_cols,
+                       keep_keys=False):
+    """
+    Build lag/rolling feature tables for several value columns and many series in one pass
+    df: Long frame with one row per (series, period)
+    value_cols: Columns to lag (e.g. the nutrient columns)
+    series_cols: Columns identifying a series (e.g. site or item); None means a single series
+    lags: Lag offsets, lag_k is the value k periods before the target
+    rolling_windows: Window lengths for rolling stats over the values preceding the target
+    rolling_stats: Any of 'mean', 'std', 'min', 'max', 'sum'
+    order_cols: Columns giving chronological order within a series, (Year, Week) by default
+    keep_keys: Keep series/order columns in the output tables
+    Rows with a missing lag, rolling stat or target (e.g. a week without data) are dropped
+    Returns {value_col: DataFrame of lag_k, roll_{stat}_{w} and target columns}
+    """
+    series_cols = list(series_cols or [])
+    lags = sorted(set(int(k) for k in lags))
+    rolling_windows = sorted(set(int(w) for w in rolling_windows))
+    for stat in rolling_stats:
+        if stat not in ROLLING_FUNCS:
+            raise ValueError(f"Unknown rolling stat '{stat}'. Use one of {list(ROLLING_FUNCS)}")
+
+    sort_cols = series_cols + list(order_cols)
+    ordered = df.sort_values(sort_cols, kind="mergesort") if sort_cols else df
+    ordered = ordered.reset_index(drop=True)
+    # Span of history each row needs: the largest lag or rolling window
+    span = max(lags + rolling_windows)
+    feature_cols = ([f"lag_{k}" for k in lags]
+                    + [f"roll_{stat}_{size}" for size in rolling_windows for stat in rolling_stats] + ["target"])
+    if len(ordered) <= span:
+        empty = pd.DataFrame(columns=(sort_cols if keep_keys else []) + feature_cols, dtype=np.float64)
+        return {col: empty.copy() for col in value_cols}
+
+    values = ordered[list(value_cols)].to_numpy(dtype=np.float64)
+    if series_cols:
+        position = ordered.groupby(series_cols, sort=False).cumcount().to_numpy()
+    else:
+        position = np.arange(len(ordered))
+
+    # windows[i, c, :] holds values[i:i + span + 1, c]; the last element is the target
+    windows = sliding_window_view(values, span + 1, axis=0)
+    # A window is valid only when its first row belongs to the same series as the target
+    valid = position[span:] >= span
+    windows = windows[valid]
+    target_rows = np.flatnonzero(valid) + span
+
+    keys = ordered.loc[target_rows, series_cols + list(order_cols)].reset_index(drop=True) if keep_keys else None
+    tables = {}
+    for c, col in enumerate(value_cols):
+        w = windows[:, c, :]
+        features = {f"lag_{k}": w[:, span - k] for k in lags}
+        for size in rolling_windows:
+            history = w[:, span - size:span]
+            for stat in rolling_stats:
+                features[f"roll_{stat}_{size}"] = ROLLING_FUNCS[stat](history)
+        features["target"] = w[:, span]
+        table = pd.DataFrame(features)
+        if keep_keys:
+            table = pd.concat([keys, table], axis=1)
+        # Incomplete rows would put NaNs into the lag tables and from there into training
+        tables[col] = table.dropna(subset=feature_cols).reset_index(drop=True)
+    return tables
+
 # Function to create lag features
 def create_lag_features(df, col, window=4):
-    data = pd.DataFrame()
-    for i in range(window):
-        data[f'lag_{i+1}'] = df[col].shift(i + 1)
-    data['target'] = df[col]
-    return data.dropna().reset_index(drop=True)
+    # Ordered by Year/Week when present, otherwise by row order as before
+    order_cols = [c for c in time_cols if c in df.columns]
+    return build_lag_features(df, [col], lags=range(1, window + 1), order_cols=order_cols)[col]
+
 # Function to split train/test (optional if needed)
 def split_data(data):
     X = data.drop("target", axis=1)
     y = data["target"]
     return X[:-8], X[-8:], y[:-8], y[-8:]
-# Process all nutrients
-nutrients = ["carbohydrates", "fiber", "protein", "fat"]
-for nutrient in nutrients:
-    print(f"🔹 Creating lag features for: {nutrient}")
-    lagged = create_lag_features(df, nutrient)
-    lagged.to_csv(f"data/engineered/{nutrient}_lagged.csv", index=False)
-    print(f"✅ Saved to data/engineered/{nutrient}_lagged.csv")
\ No newline at end of file
+
+def main(storage_format=None, csv_export=True):
+    # Load and prepare the data
+    df = read_frame(resolve_frame(weekly_file))
+    df = df.rename(columns={
+        "Carbohydrates": "carbohydrates",
+        "Fiber": "fiber",
+        "Protein": "protein",
+        "Fat": "fat"
+    })
+    # Create output folder if not exists
+    os.makedirs(engineered_dir, exist_ok=True)
+    # Process all nutrients in one pass
+    print(f"🔹 Creating lag features for: {', '.join(nutrients)}")
+    tables = build_lag_features(df, nutrients)
+    for nutrient, lagged in tables.items():
+        path = write_frame(lagged, os.path.join(engineered_dir, f"{nutrient}_lagged"), storage_format)
+        print(f"✅ Saved to {path}")
+        if csv_export:
+            export_csv(lagged, path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import os
+
+import numpy as np
+
+# 'numpy', 'numba' or 'auto' (Numba when installed, NumPy otherwise)
+KERNEL_ENV = "NUTRIMATCH_FEATURE_KERNEL"
+# Rows per NumPy tile: one tile's input and output columns stay in cache between operations
+TILE_ROWS = 1 << 15
+
+_NUMBA_KERNEL = None
+
+
+def resolve_kernel(name=None):
+    name = (name or os.environ.get(KERNEL_ENV) or "auto").lower()
+    if name not in ["auto", "numpy", "numba"]:
+        raise ValueError(f"Unknown feature kernel '{name}'. Use 'auto', 'numpy' or 'numba'")
+    if name == "numpy":
+        return "numpy"
+    try:
+        import numba  # noqa: F401
+        return "numba"
+    except ImportError:
+        if name == "numba":
+            raise
+        return "numpy"
+
+
+def _numpy_kernel(X, n_pass, ratio_idx, inter_idx, week_idx, scale_idx, mean, inv_scale, eps, omega, out):
+    """Tile by tile: every output column of a tile is written once, straight into out"""
+    for start in range(0, X.shape[0], TILE_ROWS):
+        x = X[start:start + TILE_ROWS]
+        o = out[start:start + TILE_ROWS]
+        o[:, :n_pass] = x[:, :n_pass]
+        j = n_pass
+        for a, b in ratio_idx:
+            np.add(x[:, b], eps, out=o[:, j])
+            np.divide(x[:, a], o[:, j], out=o[:, j])
+            j += 1
+        for a, b in inter_idx:
+            np.multiply(x[:, a], x[:, b], out=o[:, j])
+            j += 1
+        if week_idx >= 0:
+            np.multiply(x[:, week_idx], omega, out=o[:, j + 1])
+            np.sin(o[:, j + 1], out=o[:, j])
+            np.cos(o[:, j + 1], out=o[:, j + 1])
+        for s, c in enumerate(scale_idx):
+            np.subtract(o[:, c], mean[s], out=o[:, c])
+            np.multiply(o[:, c], inv_scale[s], out=o[:, c])
+
+
+def _numba_kernel():
+    """Compiled on first use: one loop over rows computing every output of a row in registers"""
+    global _NUMBA_KERNEL
+    if _NUMBA_KERNEL is None:
+        import math
+        from numba import njit, prange
+
+        @njit(parallel=True, cache=True)
+        def kernel(X, n_pass, ratio_idx, inter_idx, week_idx, scale_idx, mean, inv_scale, eps, omega, out):
+            for i in prange(X.shape[0]):
+                for c in range(n_pass):
+                    out[i, c] = X[i, c]
+                j = n_pass
+                for r in range(ratio_idx.shape[0]):
+                    out[i, j] = X[i, ratio_idx[r, 0]] / (X[i, ratio_idx[r, 1]] + eps)
+                    j += 1
+                for r in range(inter_idx.shape[0]):
+                    out[i, j] = X[i, inter_idx[r, 0]] * X[i, inter_idx[r, 1]]
+                    j += 1
+                if week_idx >= 0:
+                    angle = X[i, week_idx] * omega
+                    out[i, j] = math.sin(angle)
+                    out[i, j + 1] = math.cos(angle)
+                for s in range(scale_idx.shape[0]):
+                    c = scale_idx[s]
+                    out[i, c] = (out[i, c] - mean[s]) * inv_scale[s]
+
+        _NUMBA_KERNEL = kernel
+    return _NUMBA_KERNEL
+
+
+def feature_block(X, n_pass, ratio_idx=(), inter_idx=(), week_idx=-1, scale_idx=(), mean=None, scale=None,
+                  eps=1e-6, period=52.0, dtype=np.float64, out=None, kernel=None):
+    """
+    Fused feature engineering over one numeric block, in a single pass into a preallocated array
+    X: (n_rows, n_inputs) inputs; the first n_pass columns are copied to the output as is
+    ratio_idx / inter_idx: (numerator, denominator) / (left, right) column pairs of X; each adds
+        X[:, a] / (X[:, b] + eps) / X[:, a] * X[:, b] as the next output column
+    week_idx: Column of X holding the week number (-1: none); adds sin and cos of the week angle
+    scale_idx, mean, scale: Output columns standardized in the same pass ((value - mean) / scale)
+    out: Optional (n_rows, n_outputs) array to fill (Fortran order is fastest for the NumPy path)
+    Returns out
+    """
+    ratio_idx = np.asarray(ratio_idx, dtype=np.int64).reshape(-1, 2)
+    inter_idx = np.asarray(inter_idx, dtype=np.int64).reshape(-1, 2)
+    scale_idx = np.asarray(scale_idx, dtype=np.int64)
+    n_out = n_pass + len(ratio_idx) + len(inter_idx) + (2 if week_idx >= 0 else 0)
+    if out is None:
+        out = np.empty((X.shape[0], n_out), dtype=dtype, order="F")
+    elif out.shape != (X.shape[0], n_out):
+        raise ValueError(f"Output array has shape {out.shape}, expected {(X.shape[0], n_out)}")
+    mean = np.zeros(0) if mean is None else np.asarray(mean, dtype=np.float64)
+    inv_scale = np.zeros(0) if scale is None else 1.0 / np.asarray(scale, dtype=np.float64)
+    if len(scale_idx) != len(mean) or len(scale_idx) != len(inv_scale):
+        raise ValueError("scale_idx, mean and scale must have the same length")
+
+    args = (X, n_pass, ratio_idx, inter_idx, int(week_idx), scale_idx, mean, inv_scale, eps, 2 * np.pi / period, out)
+    if resolve_kernel(kernel) == "numba":
+        _numba_kernel()(*args)
+    else:
+        _numpy_kernel(*args)
+    return out
+
+
+def scale_block(out, scale_idx, mean, scale):
+    """Standardize columns of an already computed block in place, tile by tile"""
+    inv_scale = 1.0 / np.asarray(scale, dtype=np.float64)
+    for start in range(0, out.shape[0], TILE_ROWS):
+        o = out[start:start + TILE_ROWS]
+        for s, c in enumerate(scale_idx):
+            np.subtract(o[:, c], mean[s], out=o[:, c])
+            np.multiply(o[:, c], inv_scale[s], out=o[:, c])
+    return out
@@ -0,0 +1,134 @@
+import json
+import os
+
+import numpy as np
+
+from src.storage import atomic_write, find_frame, load_lagged
+
+engineered_dir = "data/engineered"
+
+FEATURE_DTYPE = np.float32
+# Sub-directory of a lag table directory holding its materialized matrices
+STORE_SUBDIR = "features"
+
+
+def store_dir_for(data_dir=engineered_dir):
+    return os.path.join(data_dir, STORE_SUBDIR)
+
+
+def _signature(path):
+    """Cheap change detector for the source lag table"""
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _paths(nutrient, store_dir):
+    stem = os.path.join(store_dir, f"{nutrient}_lagged")
+    return {"X": f"{stem}.X.npy", "y": f"{stem}.y.npy", "meta": f"{stem}.json"}
+
+
+class FeatureSet:
+    def __init__(self, X, y, columns, meta=None):
+        """
+        Lag features of one nutrient as read-only, memory-mapped float32 arrays
+        X: (n_rows, n_features) C-contiguous, columns in lag table order (lag_1 .. lag_n, ...)
+        y: (n_rows,) targets
+        Processes mapping the same files share one copy in the OS page cache
+        """
+        self.X = X
+        self.y = y
+        self.columns = columns
+        self.meta = meta or {}
+
+    def __len__(self):
+        return len(self.y)
+
+    def holdout_split(self, test_rows=8):
+        """Chronological split used by the training scripts: the last test_rows rows are the test set"""
+        return self.X[:-test_rows], self.X[-test_rows:], self.y[:-test_rows], self.y[-test_rows:]
+
+    @property
+    def lag_columns(self):
+        """lag_1 .. lag_n columns in lag order (rolling stats and other features excluded)"""
+        lags = [col for col in self.columns if col.startswith("lag_") and col[4:].isdigit()]
+        return sorted(lags, key=lambda col: int(col[4:]))
+
+    def last_lags(self, n_rows=1):
+        """Most recent lag rows (lag columns only, lag_1 first), the starting point of a forecast"""
+        positions = [self.columns.index(col) for col in self.lag_columns]
+        return self.X[-n_rows:, positions]
+
+
+def materialize(nutrient, data_dir=engineered_dir, store_dir=None):
+    """
+    Convert a nutrient's lag table into contiguous float32 .npy files (features and target)
+    Files are written under unique temporary names and swapped in, so concurrent readers never
+    see a half-written matrix and concurrent writers never share a file; the metadata file is replaced last
+    """
+    store_dir = store_dir or store_dir_for(data_dir)
+    os.makedirs(store_dir, exist_ok=True)
+    source = find_frame(data_dir, f"{nutrient}_lagged")
+    df = load_lagged(nutrient, data_dir)
+    columns = [col for col in df.columns if col != "target"]
+
+    paths = _paths(nutrient, store_dir)
+    arrays = {"X": np.ascontiguousarray(df[columns].to_numpy(dtype=FEATURE_DTYPE)),
+              "y": np.ascontiguousarray(df["target"].to_numpy(dtype=FEATURE_DTYPE))}
+    for name, array in arrays.items():
+        atomic_write(paths[name], lambda f, array=array: np.save(f, array))
+
+    # The source is recorded relative to data_dir, so a lag directory can be moved or
+    # renamed (e.g. a pipeline stage's build directory) without invalidating its store
+    meta = {"nutrient": nutrient, "source": os.path.basename(source), "source_signature": _signature(source),
+            "columns": columns, "rows": len(df), "dtype": np.dtype(FEATURE_DTYPE).name}
+    atomic_write(paths["meta"], lambda f: f.write(json.dumps(meta, indent=2).encode()))
+    return meta
+
+
+def is_current(nutrient, data_dir=engineered_dir, store_dir=None):
+    """True when the stored matrices were built from the current lag table"""
+    paths = _paths(nutrient, store_dir or store_dir_for(data_dir))
+    if not all(os.path.exists(path) for path in paths.values()):
+        return False
+    with open(paths["meta"]) as f:
+        meta = json.load(f)
+    try:
+        source = find_frame(data_dir, f"{nutrient}_lagged")
+    except FileNotFoundError:
+        # Only the store is shipped (e.g. to a serving host): use it as is
+        return True
+    return (os.path.basename(meta["source"]) == os.path.basename(source)
+            and meta["source_signature"] == _signature(source))
+
+
+def load_features(nutrient, data_dir=engineered_dir, store_dir=None, refresh=True):
+    """
+    Memory-map a nutrient's feature matrices read-only
+    refresh: Rebuild the store first when the lag table changed (workers that must not
+        race on a rebuild pass refresh=False after the parent called build_store)
+    """
+    store_dir = store_dir or store_dir_for(data_dir)
+    if refresh and not is_current(nutrient, data_dir, store_dir):
+        materialize(nutrient, data_dir, store_dir)
+    paths = _paths(nutrient, store_dir)
+    with open(paths["meta"]) as f:
+        meta = json.load(f)
+    X = np.load(paths["X"], mmap_mode="r")
+    y = np.load(paths["y"], mmap_mode="r")
+    return FeatureSet(X, y, meta["columns"], meta)
+
+
+def build_store(nutrient_list, data_dir=engineered_dir, store_dir=None):
+    """Bring every nutrient's matrices up to date (run once in the parent before starting workers)"""
+    built = []
+    for nutrient in nutrient_list:
+        if not is_current(nutrient, data_dir, store_dir):
+            materialize(nutrient, data_dir, store_dir)
+            built.append(nutrient)
+    return built
+
+
+if __name__ == "__main__":
+    for name in ["carbohydrates", "fiber", "protein", "fat"]:
+        info = materialize(name)
+        print(f"✅ {name}: {info['rows']} rows x {len(info['columns'])} features → {store_dir_for()}")
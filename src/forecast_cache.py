@@ -0,0 +1,213 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+from src.model_registry import MODEL_CHOICES, MODEL_FILES
+from src.storage import atomic_write
+
+# Single home of the precomputed forecasts read by the dashboard
+forecast_dir = os.path.join("data", "forecast")
+engineered_dir = "data/engineered"
+nutrients = ["carbohydrates", "fiber", "protein", "fat"]
+DEFAULT_HORIZON = 8
+
+INDEX_FILE = "index.json"
+# Content hashes memoised by (path, mtime, size) so unchanged inputs are not re-read
+VERSIONS_FILE = "versions.json"
+LOCK_FILE = "index.lock"
+
+
+def forecast_file(nutrient, model_type):
+    return f"{nutrient}_{model_type}_forecast.csv"
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def file_version(path, memo=None):
+    """Content hash of a file (first 16 hex chars of sha256), reusing memo when the file is unchanged"""
+    path = os.path.abspath(path)
+    signature = _signature(path)
+    if memo is not None and memo.get(path, {}).get("signature") == signature:
+        return memo[path]["version"]
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    version = digest.hexdigest()[:16]
+    if memo is not None:
+        memo[path] = {"signature": signature, "version": version}
+    return version
+
+
+def _read_json(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_json(data, path):
+    """Replace a JSON file atomically, so readers never see a partial index"""
+    atomic_write(path, lambda f: json.dump(data, f, indent=2), mode="w")
+
+
+@contextmanager
+def _index_lock(cache_dir):
+    """
+    Serialize index/memo updates between concurrent refreshes (--every loop, pipeline run)
+    Advisory lock where fcntl exists; elsewhere the re-read-and-merge still keeps other runs' entries
+    """
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    with open(os.path.join(cache_dir, LOCK_FILE), "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def read_index(cache_dir=forecast_dir):
+    return _read_json(os.path.join(cache_dir, INDEX_FILE))
+
+
+def model_source(registry, nutrient, model_type):
+    """The trained model file a forecast is versioned by (the compact export on serving-only hosts)"""
+    path = registry.model_path(nutrient, model_type)
+    return path if os.path.exists(path) else registry.artifact_path(nutrient, model_type)
+
+
+def is_stale(entry):
+    """
+    Cheap freshness check for readers: True when the lag table or model file the entry was
+    computed from has changed on disk since (stat only, no hashing, no inference)
+    """
+    try:
+        return (_signature(entry["data_path"]) != entry["data_signature"] or
+                _signature(entry["model_path"]) != entry["model_signature"])
+    except (OSError, KeyError):
+        return True
+
+
+def read_forecast(nutrient, model_type, cache_dir=forecast_dir):
+    """
+    Read-only access for the pages: (forecast DataFrame or None, index entry or None)
+    Forecasts written before the cache existed are returned without an entry
+    """
+    model_type = MODEL_CHOICES.get(model_type, model_type)
+    entry = read_index(cache_dir).get(f"{nutrient}/{model_type}")
+    path = os.path.join(cache_dir, entry["file"] if entry else forecast_file(nutrient, model_type))
+    if not os.path.exists(path):
+        return None, entry
+    return pd.read_csv(path), entry
+
+
+def refresh(nutrient_list=None, model_types=None, horizon=DEFAULT_HORIZON, data_dir=engineered_dir,
+            models_dir=None, cache_dir=forecast_dir, force=False):
+    """
+    Batch job: recompute every forecast whose (nutrient, model, data version, model version)
+    key changed, leave the others untouched
+    Several refreshes may run at once: each forecast is swapped in through its own temporary
+    file, and only the entries this run computed are merged into the index as it is on disk
+    Returns {'nutrient/model': 'updated' | 'current' | 'missing' | 'error'}
+    """
+    from src.feature_store import load_features
+    from src.forecasting import ForecastEngine
+    from src.model_registry import ModelRegistry
+    from src.storage import find_frame
+
+    nutrient_list = nutrient_list or nutrients
+    model_types = model_types or list(MODEL_FILES)
+    registry = ModelRegistry(models_dir=models_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    index = read_index(cache_dir)
+    versions_path = os.path.join(cache_dir, VERSIONS_FILE)
+    memo = _read_json(versions_path)
+
+    status, updated = {}, {}
+    for nutrient in nutrient_list:
+        try:
+            data_path = find_frame(data_dir, f"{nutrient}_lagged")
+        except FileNotFoundError:
+            status.update({f"{nutrient}/{m}": "missing" for m in model_types})
+            continue
+        data_version = file_version(data_path, memo)
+        last_lags = None
+        for model_type in model_types:
+            name = f"{nutrient}/{model_type}"
+            model_path = model_source(registry, nutrient, model_type)
+            if not os.path.exists(model_path):
+                status[name] = "missing"
+                continue
+            model_version = file_version(model_path, memo)
+            entry = index.get(name, {})
+            if (not force and entry.get("data_version") == data_version and entry.get("model_version") == model_version
+                    and entry.get("horizon") == horizon and os.path.exists(os.path.join(cache_dir, entry["file"]))):
+                status[name] = "current"
+                continue
+
+            file_name = forecast_file(nutrient, model_type)
+            try:
+                if last_lags is None:
+                    last_lags = load_features(nutrient, data_dir).last_lags()
+                model = registry.get(nutrient, model_type)
+                predictions = ForecastEngine(model, horizon=horizon).recursive(last_lags)[0]
+                forecast = pd.DataFrame({"Week": range(1, horizon + 1), "Prediction": predictions})
+                atomic_write(os.path.join(cache_dir, file_name), lambda f: forecast.to_csv(f, index=False), mode="w")
+            except Exception as e:
+                # One broken model must not stop the others or leave the index unwritten
+                print(f"⚠️  {name}: {e}")
+                status[name] = "error"
+                continue
+
+            updated[name] = {"nutrient": nutrient, "model": model_type, "data_version": data_version,
+                             "model_version": model_version, "horizon": horizon, "file": file_name,
+                             "data_path": os.path.abspath(data_path), "data_signature": _signature(data_path),
+                             "model_path": os.path.abspath(model_path), "model_signature": _signature(model_path),
+                             "created": datetime.now().isoformat(timespec="seconds")}
+            status[name] = "updated"
+
+    with _index_lock(cache_dir):
+        # Re-read under the lock: entries written by a concurrent refresh since we started are kept
+        index = read_index(cache_dir)
+        index.update(updated)
+        _write_json(index, os.path.join(cache_dir, INDEX_FILE))
+        _write_json(dict(_read_json(versions_path), **memo), versions_path)
+    return status
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute the dashboard forecasts")
+    parser.add_argument("--nutrients", nargs="+", default=nutrients, choices=nutrients)
+    parser.add_argument("--models", nargs="+", default=list(MODEL_FILES), choices=list(MODEL_FILES))
+    parser.add_argument("--horizon", type=int, default=DEFAULT_HORIZON)
+    parser.add_argument("--force", action="store_true", help="Recompute even when the versions match")
+    parser.add_argument("--every", type=float, default=None,
+                        help="Keep running and refresh every N minutes (otherwise run once, e.g. from cron)")
+    args = parser.parse_args()
+
+    while True:
+        start = time.perf_counter()
+        status = refresh(args.nutrients, args.models, args.horizon, force=args.force)
+        for name, state in sorted(status.items()):
+            print(f"{'✅' if state in ['updated', 'current'] else '⚠️ '} {name}: {state}")
+        print(f"🔄 Forecast cache refreshed in {time.perf_counter() - start:.2f}s")
+        if args.every is None:
+            break
+        time.sleep(args.every * 60)
+
+
+if __name__ == "__main__":
+    main()
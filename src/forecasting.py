@@ -0,0 +1,111 @@
+import numpy as np
+
+DEFAULT_HORIZON = 8
+DEFAULT_LAGS = 4
+
+
+def is_keras_model(model):
+    """Keras models expose predict_on_batch, sklearn/XGBoost estimators do not"""
+    return hasattr(model, 'predict_on_batch')
+
+
+def predict_rows(model, X):
+    """
+    One vectorized predict over a (n_rows, n_lags) block, returned as (n_rows, n_outputs)
+    LSTM inputs are reshaped to (samples, timesteps, 1); predict_on_batch avoids the
+    per-call dataset/callback setup done by Keras predict
+    """
+    if is_keras_model(model):
+        out = model.predict_on_batch(X[..., np.newaxis].astype(np.float32))
+        return np.asarray(out).reshape(X.shape[0], -1)
+    return np.asarray(model.predict(X)).reshape(X.shape[0], -1)
+
+
+def lag_matrix(df, n_lags=DEFAULT_LAGS):
+    """
+    Extract the lag_1..lag_n columns as a float array (one row per series/start point)
+    df: Lagged dataframe as written to data/engineered/*_lagged.csv
+    """
+    cols = [f'lag_{i + 1}' for i in range(n_lags)]
+    return np.ascontiguousarray(df[cols].to_numpy(dtype=np.float64))
+
+
+def make_direct_dataset(values, n_lags=DEFAULT_LAGS, horizon=DEFAULT_HORIZON):
+    """
+    Build (X, Y) for a direct multi-output model from one chronological series
+    X rows follow the lag_1 (most recent) .. lag_n layout, Y holds the next `horizon` values
+    """
+    from numpy.lib.stride_tricks import sliding_window_view
+
+    values = np.asarray(values, dtype=np.float64)
+    windows = sliding_window_view(values, n_lags + horizon)
+    X = windows[:, :n_lags][:, ::-1]
+    Y = windows[:, n_lags:]
+    return np.ascontiguousarray(X), np.ascontiguousarray(Y)
+
+
+class ForecastEngine:
+    def __init__(self, model, horizon=DEFAULT_HORIZON, n_lags=DEFAULT_LAGS):
+        """
+        Multi-horizon forecaster running many series/start points per predict call
+        model: Fitted Random Forest / XGBoost estimator or Keras LSTM
+        horizon: Number of weeks to forecast
+        n_lags: Number of lag features the model was trained on
+        """
+        self.model = model
+        self.horizon = horizon
+        self.n_lags = n_lags
+
+    def _predict(self, X):
+        """Single vectorized predict over a (n_rows, n_lags) block"""
+        return predict_rows(self.model, X)
+
+    def recursive(self, lags):
+        """
+        Recursive forecast: each step feeds its prediction back in as lag_1
+        lags: Array (n_series, n_lags) in lag_1 (most recent) .. lag_n order
+        Returns an array of shape (n_series, horizon)
+        """
+        lags = np.atleast_2d(np.asarray(lags, dtype=np.float64))
+        n_series = lags.shape[0]
+
+        # Preallocated history, oldest value first: [lag_n .. lag_1, step_1 .. step_h]
+        # Step h reads the window buffer[:, h:h+n_lags] and writes column n_lags+h,
+        # so nothing is re-allocated or shifted between steps
+        buffer = np.empty((n_series, self.n_lags + self.horizon), dtype=np.float64)
+        buffer[:, :self.n_lags] = lags[:, ::-1]
+        X = np.empty((n_series, self.n_lags), dtype=np.float64)
+
+        for step in range(self.horizon):
+            # Back to lag_1 .. lag_n column order expected by the models
+            X[:] = buffer[:, step:step + self.n_lags][:, ::-1]
+            buffer[:, self.n_lags + step] = self._predict(X)[:, 0]
+
+        return buffer[:, self.n_lags:].copy()
+
+    def direct(self, lags):
+        """
+        Direct forecast: one predict call returning every horizon step
+        Requires a multi-output model trained on make_direct_dataset targets
+        """
+        lags = np.atleast_2d(np.asarray(lags, dtype=np.float64))
+        preds = self._predict(np.ascontiguousarray(lags))
+        if preds.shape[1] != self.horizon:
+            raise ValueError(f"Direct mode needs a model with {self.horizon} outputs, got {preds.shape[1]}")
+        return preds
+
+    def forecast(self, lags, mode='recursive'):
+        """Dispatch to the recursive or direct strategy"""
+        if mode not in ['recursive', 'direct']:
+            raise ValueError("Invalid forecast mode. Use 'recursive' or 'direct'")
+        return self.recursive(lags) if mode == 'recursive' else self.direct(lags)
+
+
+def fit_direct_model(model, values, n_lags=DEFAULT_LAGS, horizon=DEFAULT_HORIZON):
+    """
+    Fit a multi-output estimator for direct forecasting on one chronological series
+    Random Forest supports 2-D targets natively; XGBoost needs multi_strategy support (>= 2.0)
+    """
+    X, Y = make_direct_dataset(values, n_lags, horizon)
+    model.fit(X, Y)
+    return model
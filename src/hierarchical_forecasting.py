@@ -0,0 +1,267 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from src.forecasting import DEFAULT_HORIZON, DEFAULT_LAGS
+from src.ingestion import DEFAULT_CHUNKSIZE, iter_item_chunks, week_start
+from src.storage import write_frame
+
+raw_file = "data/raw/Item_FullList.csv"
+models_dir = os.path.join("models", "hierarchical")
+forecast_dir = os.path.join("data", "forecast", "items")
+
+NUTRIENT_COLUMNS = ["Carbohydrates", "Fiber", "Protein", "Fat"]
+ITEM_KEY = "Item Code"
+# Upper hierarchy levels, used when the item log carries them
+GROUP_COLUMNS = ["Outlet", "Category"]
+# Recent windows per series used for training; bounds the training set at 50k+ series
+DEFAULT_MAX_WINDOWS = 52
+
+
+def series_columns_for(columns, item_key=ITEM_KEY):
+    """Hierarchy columns present in an item log: outlet/category (if any), then the item"""
+    return [col for col in GROUP_COLUMNS if col in columns] + [item_key]
+
+
+def build_item_weekly(source_path, series_cols=None, value_cols=NUTRIENT_COLUMNS, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Stream an item log into weekly per-series totals
+    Each chunk is reduced to (series, week) sums which are added together,
+    so memory depends on the number of series x weeks, not the number of rows
+    Returns a long frame: series columns, Week_Start, value columns, Quantity
+    """
+    totals = None
+    for chunk in iter_item_chunks(source_path, chunksize):
+        if series_cols is None:
+            series_cols = series_columns_for(chunk.columns)
+        columns = [col for col in list(value_cols) + ["Quantity"] if col in chunk.columns]
+        chunk["Week_Start"] = week_start(chunk["Date"])
+        partial = chunk.groupby(list(series_cols) + ["Week_Start"], sort=False)[columns].sum()
+        totals = partial if totals is None else totals.add(partial, fill_value=0)
+    if totals is None:
+        raise ValueError(f"No rows found in {source_path}")
+    return totals.reset_index()
+
+
+class ItemPanel:
+    def __init__(self, keys, weeks, values):
+        """
+        Dense weekly panel: one row per series, one column per week
+        keys: DataFrame of series columns, row i identifies series i
+        weeks: DatetimeIndex of consecutive week starts
+        values: {value column: float array (n_series, n_weeks)}, weeks without sales are 0
+        """
+        self.keys = keys
+        self.weeks = weeks
+        self.values = values
+
+    @classmethod
+    def from_long(cls, weekly, series_cols, value_cols=NUTRIENT_COLUMNS):
+        """Scatter a long (series, Week_Start) frame into dense per-nutrient matrices"""
+        series_cols = list(series_cols)
+        codes, uniques = pd.factorize(pd.MultiIndex.from_frame(weekly[series_cols]))
+        keys = uniques.to_frame(index=False)
+
+        first, last = weekly["Week_Start"].min(), weekly["Week_Start"].max()
+        weeks = pd.date_range(first, last, freq="7D")
+        positions = ((weekly["Week_Start"] - first).dt.days // 7).to_numpy()
+
+        values = {}
+        for col in value_cols:
+            matrix = np.zeros((len(keys), len(weeks)), dtype=np.float64)
+            # (series, week) pairs are unique after aggregation, so plain assignment is enough
+            matrix[codes, positions] = weekly[col].to_numpy(dtype=np.float64)
+            values[col] = matrix
+        return cls(keys, weeks, values)
+
+    @property
+    def n_series(self):
+        return len(self.keys)
+
+
+def default_model(n_jobs=-1):
+    """Histogram XGBoost: trains on millions of (series, week) rows in minutes"""
+    from xgboost import XGBRegressor
+    return XGBRegressor(n_estimators=300, max_depth=8, learning_rate=0.1, subsample=0.8,
+                        tree_method="hist", n_jobs=n_jobs, random_state=42)
+
+
+class GlobalSeriesForecaster:
+    def __init__(self, model=None, n_lags=DEFAULT_LAGS, horizon=DEFAULT_HORIZON, max_windows=DEFAULT_MAX_WINDOWS):
+        """
+        One model shared by every series of a panel (a "global" model)
+        Lags are divided by each series' mean level, so items of very different volume
+        share one model; series-id features (series code, log level, week of year)
+        let it still tell series apart
+        model: Regressor with fit/predict (defaults to histogram XGBoost)
+        max_windows: Most recent training windows used per series
+        """
+        self.model = model
+        self.n_lags = n_lags
+        self.horizon = horizon
+        self.max_windows = max_windows
+        self.scale_ = None
+
+    def _features(self, lags, codes, log_scale, week_of_year):
+        """Feature block: scaled lag_1..lag_n, series code, log level, cyclical week"""
+        angle = 2 * np.pi * week_of_year / 52.0
+        return np.column_stack([lags, codes, log_scale, np.sin(angle), np.cos(angle)]).astype(np.float32)
+
+    def fit(self, values, weeks):
+        """
+        Train on every series at once
+        values: Array (n_series, n_weeks) for one nutrient
+        weeks: Week starts matching the columns of values
+        """
+        if self.model is None:
+            self.model = default_model()
+        n_series, n_weeks = values.shape
+        if n_weeks <= self.n_lags:
+            raise ValueError(f"Need more than {self.n_lags} weeks of history, got {n_weeks}")
+
+        self.scale_ = values.mean(axis=1) + 1e-6
+        scaled = values / self.scale_[:, None]
+
+        # windows[s, w, :] = scaled[s, w:w + n_lags + 1]; the last element is the target
+        windows = sliding_window_view(scaled, self.n_lags + 1, axis=1)[:, -self.max_windows:]
+        n_windows = windows.shape[1]
+        target_pos = np.arange(n_weeks - n_windows, n_weeks)
+
+        lags = windows[..., :self.n_lags][..., ::-1].reshape(-1, self.n_lags)
+        target = windows[..., self.n_lags].reshape(-1)
+        codes = np.repeat(np.arange(n_series), n_windows)
+        log_scale = np.repeat(np.log1p(self.scale_), n_windows)
+        week_of_year = np.tile(weeks[target_pos].isocalendar().week.to_numpy(dtype=np.float64), n_series)
+
+        # Windows that are all zero (before an item's first sale) carry no signal
+        active = (lags.sum(axis=1) + target) > 0
+        X = self._features(lags[active], codes[active], log_scale[active], week_of_year[active])
+        self.model.fit(X, target[active])
+        return self
+
+    def forecast(self, values, weeks, horizon=None):
+        """
+        Recursive forecast for all series together: one predict call per step
+        Returns an array (n_series, horizon) on the original scale, clipped at 0
+        """
+        horizon = horizon or self.horizon
+        n_series = values.shape[0]
+        codes = np.arange(n_series, dtype=np.float64)
+        log_scale = np.log1p(self.scale_)
+        future_weeks = pd.date_range(weeks[-1] + pd.Timedelta(days=7), periods=horizon, freq="7D")
+        future_woy = future_weeks.isocalendar().week.to_numpy(dtype=np.float64)
+
+        # Same preallocated layout as ForecastEngine: [lag_n .. lag_1, step_1 .. step_h]
+        buffer = np.empty((n_series, self.n_lags + horizon), dtype=np.float64)
+        buffer[:, :self.n_lags] = values[:, -self.n_lags:] / self.scale_[:, None]
+        for step in range(horizon):
+            lags = buffer[:, step:step + self.n_lags][:, ::-1]
+            X = self._features(lags, codes, log_scale, np.full(n_series, future_woy[step]))
+            buffer[:, self.n_lags + step] = np.maximum(self.model.predict(X), 0)
+
+        return buffer[:, self.n_lags:] * self.scale_[:, None], future_weeks
+
+
+def reconcile(forecasts, keys, totals=None):
+    """
+    Make forecasts coherent across the hierarchy
+    forecasts: Array (n_series, horizon) of item-level forecasts
+    keys: Series key frame (group columns first, item last)
+    totals: Optional array (horizon,) of top-level forecasts on the same scale
+        (summed item waste). When given, item forecasts are scaled proportionally
+        to add up to it (top-down); otherwise totals are the item sums (bottom-up)
+    Returns (item forecasts, {group column: (group keys, forecasts)}, totals)
+    """
+    if totals is not None:
+        item_sum = forecasts.sum(axis=0)
+        share = np.divide(np.asarray(totals, dtype=np.float64), item_sum,
+                          out=np.ones_like(item_sum), where=item_sum > 0)
+        forecasts = forecasts * share
+    levels = {}
+    for col in keys.columns[:-1]:
+        codes, groups = pd.factorize(keys[col])
+        summed = np.zeros((len(groups), forecasts.shape[1]))
+        np.add.at(summed, codes, forecasts)
+        levels[col] = (pd.DataFrame({col: groups}), summed)
+    return forecasts, levels, forecasts.sum(axis=0)
+
+
+def forecast_frame(keys, forecasts, future_weeks, nutrient):
+    """Long frame: key columns, Week_Start, step, nutrient forecast"""
+    n_series, horizon = forecasts.shape
+    frame = keys.loc[keys.index.repeat(horizon)].reset_index(drop=True)
+    frame["Week_Start"] = np.tile(future_weeks.to_numpy(), n_series)
+    frame["step"] = np.tile(np.arange(1, horizon + 1), n_series)
+    frame[nutrient] = forecasts.reshape(-1)
+    return frame
+
+
+def run_hierarchical(source_path=raw_file, series_cols=None, nutrients=NUTRIENT_COLUMNS, horizon=DEFAULT_HORIZON,
+                     n_lags=DEFAULT_LAGS, model_dir=models_dir, output_dir=forecast_dir, storage_format=None):
+    """
+    Build item-level weekly series, train one global model per nutrient, forecast every
+    series and write item, group and total forecasts
+    Returns {level: path} of the written forecast files
+    """
+    import joblib
+
+    start = time.perf_counter()
+    weekly = build_item_weekly(source_path, series_cols, nutrients)
+    series_cols = series_cols or [col for col in weekly.columns if col not in list(nutrients) + ["Week_Start", "Quantity"]]
+    panel = ItemPanel.from_long(weekly, series_cols, nutrients)
+    print(f"🔹 Built {panel.n_series} series x {len(panel.weeks)} weeks in {time.perf_counter() - start:.1f}s")
+
+    os.makedirs(model_dir, exist_ok=True)
+    item_frames, group_frames, total_frame = [], {}, None
+    for nutrient in nutrients:
+        fit_start = time.perf_counter()
+        forecaster = GlobalSeriesForecaster(n_lags=n_lags, horizon=horizon).fit(panel.values[nutrient], panel.weeks)
+        model_path = os.path.join(model_dir, f"{nutrient.lower()}_global_item_model.pkl")
+        joblib.dump(forecaster, model_path)
+
+        forecasts, future_weeks = forecaster.forecast(panel.values[nutrient], panel.weeks)
+        forecasts, levels, totals = reconcile(forecasts, panel.keys)
+        print(f"✅ {nutrient}: trained and forecast {panel.n_series} series in "
+              f"{time.perf_counter() - fit_start:.1f}s, saved {model_path}")
+
+        item_frames.append(forecast_frame(panel.keys, forecasts, future_weeks, nutrient))
+        for col, (group_keys, summed) in levels.items():
+            group_frames.setdefault(col, []).append(forecast_frame(group_keys, summed, future_weeks, nutrient))
+        totals_df = pd.DataFrame({"Week_Start": future_weeks, "step": np.arange(1, horizon + 1), nutrient: totals})
+        total_frame = totals_df if total_frame is None else total_frame.merge(totals_df, on=["Week_Start", "step"])
+
+    def merge_nutrients(frames):
+        merged = frames[0]
+        for frame in frames[1:]:
+            merged[frame.columns[-1]] = frame[frame.columns[-1]].to_numpy()
+        return merged
+
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {"item": write_frame(merge_nutrients(item_frames), os.path.join(output_dir, "item_forecast"), storage_format)}
+    for col, frames in group_frames.items():
+        paths[col] = write_frame(merge_nutrients(frames),
+                                 os.path.join(output_dir, f"{col.lower()}_forecast"), storage_format)
+    paths["total"] = write_frame(total_frame, os.path.join(output_dir, "total_forecast"), storage_format)
+    for level, path in paths.items():
+        print(f"💾 Saved {level} forecasts: {path}")
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Item-level hierarchical forecasting with global models")
+    parser.add_argument("--source", default=raw_file, help="Item log (CSV, Parquet or Feather)")
+    parser.add_argument("--series", nargs="+", help="Series key columns (default: Outlet/Category if present, then Item Code)")
+    parser.add_argument("--horizon", type=int, default=DEFAULT_HORIZON)
+    parser.add_argument("--lags", type=int, default=DEFAULT_LAGS)
+    parser.add_argument("--storage-format", help="Output format: parquet, feather or csv")
+    args = parser.parse_args()
+    run_hierarchical(args.source, args.series, horizon=args.horizon, n_lags=args.lags,
+                     storage_format=args.storage_format)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+import pandas as pd
+import os
+import json
+from datetime import datetime
+from src.storage import get_storage, read_frame, find_frame
+from src.ingestion import (DEFAULT_CHUNKSIZE, combine_partials, daily_means, iter_csv_range, parse_item_chunk,
+                           partial_daily_aggregates, value_columns_for)
+from src.logging_utils import get_pipeline_logger, log_path, timed
+
+class IncrementalAggregator:
+    def __init__(self, base_dir=None, storage_format=None, state_name='aggregation_state'):
+        """
+        Maintain daily and weekly food waste aggregates incrementally
+        base_dir: Base directory for all data operations (should be your project root)
+        storage_format: Format for state and output files ('parquet', 'feather' or 'csv')
+        state_name: Sub-directory of data/interim holding the aggregation state
+
+        State kept between runs:
+        - per-day sums and non-null counts for every nutrient column, plus row count and quantity sum
+        - per ISO-week sums of the daily values (the weekly_food_waste table)
+        - a watermark (byte offset) into each append-only item log
+        """
+        # Set project root directory
+        self.base_dir = base_dir if base_dir else os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+        # Shared, buffered JSON log (logs/pipeline.jsonl, rotated by size or time)
+        self.logger = get_pipeline_logger('incremental_aggregation', self.base_dir)
+        self.log_file = log_path(self.base_dir)
+
+        # Directory structure
+        self.data_dirs = {
+            'raw': os.path.join(self.base_dir, 'data', 'raw'),
+            'processed': os.path.join(self.base_dir, 'data', 'processed'),
+            'interim': os.path.join(self.base_dir, 'data', 'interim'),
+            'logs': os.path.join(self.base_dir, 'logs')
+        }
+        self.state_dir = os.path.join(self.data_dirs['interim'], state_name)
+
+        for dir_path in list(self.data_dirs.values()) + [self.state_dir]:
+            os.makedirs(dir_path, exist_ok=True)
+
+        self.storage = get_storage(storage_format)
+        self.value_columns = None
+        self.daily_state = None
+        self.weekly_df = None
+        self.watermarks = {}
+        self.generation = None
+
+    def log_message(self, message, **fields):
+        """Log a message (plus optional structured fields) to the console and the pipeline log"""
+        self.logger.info(message, extra={'fields': fields})
+
+    @property
+    def _meta_path(self):
+        return os.path.join(self.state_dir, 'state.json')
+
+    def load_state(self):
+        """Load persisted state; returns False when starting from scratch"""
+        try:
+            if not os.path.exists(self._meta_path):
+                self.log_message("No aggregation state found, starting from scratch")
+                return False
+            with open(self._meta_path) as f:
+                meta = json.load(f)
+            self.value_columns = meta['value_columns']
+            self.watermarks = meta['watermarks']
+            # state.json names the generation of data files it was saved with (none in older states)
+            suffix = f"_{meta['generation']}" if meta.get('generation') else ''
+            daily = read_frame(find_frame(self.state_dir, f'daily_state{suffix}'))
+            weekly = read_frame(find_frame(self.state_dir, f'weekly_state{suffix}'))
+            # CSV state comes back with string dates
+            daily['Date'] = pd.to_datetime(daily['Date'])
+            for col in ['Week_Start', 'Week_End']:
+                if col in weekly.columns:
+                    weekly[col] = pd.to_datetime(weekly[col])
+            self.daily_state = daily.set_index('Date')
+            self.weekly_df = weekly.set_index(['Year', 'Week'])
+            self.generation = meta.get('generation')
+            self.log_message(f"Loaded aggregation state: {len(self.daily_state)} days, {len(self.weekly_df)} weeks")
+            return True
+        except Exception as e:
+            self.log_message(f"Error loading aggregation state: {e}")
+            return False
+
+    def save_state(self):
+        """
+        Persist state and watermarks
+        The data files are written as a new generation and only become current when state.json
+        (which names the generation and holds the watermarks) is atomically replaced, so a crash
+        at any point leaves the previous state and its watermarks together
+        """
+        try:
+            generation = datetime.now().strftime("%Y%m%d%H%M%S%f")
+            self.storage.write(self.daily_state.reset_index(),
+                               os.path.join(self.state_dir, f'daily_state_{generation}{self.storage.extension}'))
+            self.storage.write(self.weekly_df.reset_index(),
+                               os.path.join(self.state_dir, f'weekly_state_{generation}{self.storage.extension}'))
+            with open(self._meta_path + '.tmp', 'w') as f:
+                json.dump({'value_columns': self.value_columns, 'watermarks': self.watermarks,
+                           'generation': generation}, f, indent=2)
+            os.replace(self._meta_path + '.tmp', self._meta_path)
+            self._remove_generations(keep=generation)
+            self.generation = generation
+            self.log_message(f"Aggregation state saved to {self.state_dir}")
+            return True
+        except Exception as e:
+            self.log_message(f"Error saving aggregation state: {e}")
+            return False
+
+    def _remove_generations(self, keep):
+        """Delete state data files of older (or unfinished) generations"""
+        for name in os.listdir(self.state_dir):
+            stem = os.path.splitext(name)[0]
+            if stem.startswith(('daily_state', 'weekly_state')) and not stem.endswith(f'_{keep}'):
+                os.remove(os.path.join(self.state_dir, name))
+
+    def _partial(self, df):
+        if self.value_columns is None:
+            # Same column selection as DailyFoodWasteCalculator.calculate_daily_food_waste
+            self.value_columns = value_columns_for(df)
+        # Partial aggregates for the new rows only
+        return partial_daily_aggregates(df, self.value_columns)
+
+    def update(self, new_rows):
+        """
+        Merge new item rows (any dates, including late arrivals) into the state
+        Returns (affected_days, affected_weeks) frames holding only the re-emitted rows
+        """
+        df = parse_item_chunk(new_rows.copy())
+        self.log_message(f"Merging {len(df)} rows")
+        return self.merge(self._partial(df))
+
+    def merge(self, partial):
+        """
+        Merge per-day partial aggregates (see ingestion.partial_daily_aggregates) into the state
+        Returns (affected_days, affected_weeks) frames holding only the re-emitted rows
+        """
+        # Merge into the per-day state; only the touched days are recomputed
+        if self.daily_state is None:
+            merged = partial
+            self.daily_state = partial
+        else:
+            previous = self.daily_state.reindex(partial.index).fillna(0)
+            merged = previous.add(partial, fill_value=0)
+            self.daily_state = pd.concat([self.daily_state.drop(partial.index, errors='ignore'), merged])
+        self.daily_state = self.daily_state.sort_index()
+        affected_days = daily_means(merged, self.value_columns).reset_index()
+
+        # Recompute the ISO weeks containing a touched day from their days' values
+        iso = self.daily_state.index.isocalendar()
+        week_keys = pd.MultiIndex.from_arrays([iso['year'].astype('int64').to_numpy(),
+                                               iso['week'].astype('int64').to_numpy()], names=['Year', 'Week'])
+        touched_iso = merged.index.isocalendar()
+        touched = pd.MultiIndex.from_arrays([touched_iso['year'].astype('int64').to_numpy(),
+                                             touched_iso['week'].astype('int64').to_numpy()],
+                                            names=['Year', 'Week']).unique()
+        in_touched = week_keys.isin(touched)
+        days = daily_means(self.daily_state[in_touched], self.value_columns)
+        days.index = week_keys[in_touched]
+        weeks = days.groupby(level=['Year', 'Week']).sum(min_count=1)
+        week_start = pd.to_datetime(
+            weeks.index.get_level_values('Year').astype(str) + '-' +
+            weeks.index.get_level_values('Week').astype(str) + '-1',
+            format='%G-%V-%u'
+        )
+        weeks.insert(0, 'Week_Start', week_start)
+        weeks.insert(1, 'Week_End', week_start + pd.Timedelta(days=6))
+
+        if self.weekly_df is None:
+            self.weekly_df = weeks
+        else:
+            self.weekly_df = pd.concat([self.weekly_df.drop(weeks.index, errors='ignore'), weeks])
+        self.weekly_df = self.weekly_df.sort_index()
+
+        self.log_message(f"Merged {len(affected_days)} days: {len(weeks)} weeks affected")
+        return affected_days, weeks.reset_index()
+
+    def read_new_rows(self, source_path, chunksize=DEFAULT_CHUNKSIZE):
+        """
+        Per-day partial aggregates of the rows appended to a CSV item log since the last run
+        The appended byte range is parsed chunk by chunk, so a first run over a large log never
+        holds more than chunksize rows at once
+        Returns the combined partial (None when there are no new rows) and the new watermark
+        """
+        key = os.path.abspath(source_path)
+        mark = self.watermarks.get(key, {'offset': 0, 'columns': None, 'rows': 0})
+        size = os.path.getsize(source_path)
+        if size < mark['offset']:
+            raise ValueError(f"{source_path} shrank since the last run; rebuild the state from scratch")
+
+        # Ignore a trailing partial line still being written
+        end = _last_line_end(source_path, mark['offset'], size)
+        if end <= mark['offset']:
+            return None, mark
+
+        total, columns, rows = None, mark['columns'], 0
+        try:
+            for chunk in iter_csv_range(source_path, mark['offset'], end, chunksize, names=mark['columns']):
+                columns = chunk.columns.tolist()
+                rows += len(chunk)
+                total = combine_partials(total, self._partial(chunk))
+        except pd.errors.EmptyDataError:
+            # Only blank lines were appended
+            pass
+        new_mark = {'offset': end, 'columns': columns, 'rows': mark['rows'] + rows}
+        return total, new_mark
+
+    @timed('ingest_log', rows='weekly_df')
+    def ingest_log(self, file_name='Item_FullList.csv', source_dir=None):
+        """
+        Process the rows appended to an item log since the stored watermark
+        Writes only the affected days and weeks, plus refreshed full tables
+        Returns the output paths, None when there are no new rows, False on error
+        """
+        try:
+            source_path = os.path.join(source_dir if source_dir else self.data_dirs['raw'], file_name)
+            if not os.path.exists(source_path):
+                raise FileNotFoundError(f"File not found at: {source_path}")
+
+            if self.daily_state is None:
+                self.load_state()
+
+            partial, new_mark = self.read_new_rows(source_path)
+            if partial is None:
+                self.log_message(f"No new rows in {source_path}")
+                return None
+
+            previous_rows = self.watermarks.get(os.path.abspath(source_path), {}).get('rows', 0)
+            self.log_message(f"Read {new_mark['rows'] - previous_rows} new rows from {source_path}")
+            affected_days, affected_weeks = self.merge(partial)
+            self.watermarks[os.path.abspath(source_path)] = new_mark
+
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            outputs = {
+                'daily_updates': os.path.join(self.data_dirs['processed'], f"daily_updates_{timestamp}{self.storage.extension}"),
+                'weekly_updates': os.path.join(self.data_dirs['processed'], f"weekly_updates_{timestamp}{self.storage.extension}"),
+                'weekly': os.path.join(self.data_dirs['processed'], f"weekly_food_waste_current{self.storage.extension}")
+            }
+            self.storage.write(affected_days, outputs['daily_updates'])
+            self.storage.write(affected_weeks, outputs['weekly_updates'])
+            self.storage.write(self.weekly_df.reset_index(), outputs['weekly'])
+            self.save_state()
+
+            for name, path in outputs.items():
+                self.log_message(f"Saved {name} to {path}")
+            return outputs
+        except Exception as e:
+            self.log_message(f"Error in incremental aggregation: {e}")
+            return False
+
+def _last_line_end(path, start, size, block_size=1 << 16):
+    """Offset just past the last newline in bytes [start, size) of a file (start if there is none)"""
+    with open(path, 'rb') as f:
+        position = size
+        while position > start:
+            block_start = max(start, position - block_size)
+            f.seek(block_start)
+            block = f.read(position - block_start)
+            newline = block.rfind(b'\n')
+            if newline >= 0:
+                return block_start + newline + 1
+            position = block_start
+    return start
+
+def main():
+    aggregator = IncrementalAggregator()
+    outputs = aggregator.ingest_log('Item_FullList.csv')
+    if outputs:
+        print(f"\nIncremental aggregation complete. Weekly table: {outputs['weekly']}")
+
+if __name__ == "__main__":
+    main()
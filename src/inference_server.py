@@ -0,0 +1,220 @@
+import json
+import os
+import time
+
+import numpy as np
+
+from src.batching import LatencyTracker, MicroBatcher
+from src.forecasting import DEFAULT_HORIZON, DEFAULT_LAGS, predict_rows
+from src.lstm_inference import create_lstm_batcher
+from src.model_registry import MODEL_CHOICES, MODEL_FILES, get_registry
+
+nutrients = ["carbohydrates", "fiber", "protein", "fat"]
+
+MAX_BATCH_ROWS = int(os.environ.get('NUTRIMATCH_MAX_BATCH_ROWS', 256))
+MAX_WAIT_MS = float(os.environ.get('NUTRIMATCH_MAX_WAIT_MS', 5))
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class InferenceService:
+    def __init__(self, registry=None, max_batch_rows=MAX_BATCH_ROWS, max_wait_ms=MAX_WAIT_MS):
+        """
+        Model serving state shared by all requests
+        registry: ModelRegistry holding the warm models (the process-wide one by default)
+        max_batch_rows / max_wait_ms: Micro-batching limits per (nutrient, model)
+        """
+        self.registry = registry or get_registry()
+        self.max_batch_rows = max_batch_rows
+        self.max_wait_ms = max_wait_ms
+        self.tracker = LatencyTracker()
+        self.batchers = {}
+
+    def resolve(self, payload):
+        """Validate nutrient/model fields of a request body"""
+        nutrient = payload.get('nutrient')
+        model_type = MODEL_CHOICES.get(payload.get('model'), payload.get('model'))
+        if nutrient not in nutrients:
+            raise HTTPError(400, f"'nutrient' must be one of {nutrients}")
+        if model_type not in MODEL_FILES:
+            raise HTTPError(400, f"'model' must be one of {list(MODEL_FILES)}")
+        return nutrient, model_type
+
+    def batcher(self, nutrient, model_type):
+        key = (nutrient, model_type)
+        if key not in self.batchers:
+            # The model is looked up per batch, so a retrained file is picked up via the registry
+            def load_model():
+                return self.registry.get(nutrient, model_type)
+
+            name = f'{nutrient}_{model_type}'
+            if model_type == 'lstm':
+                # Compiled tf.function path with its own (larger) batching limits
+                self.batchers[key] = create_lstm_batcher(load_model, name=name, tracker=self.tracker)
+            else:
+                self.batchers[key] = MicroBatcher(lambda X: predict_rows(load_model(), X), self.max_batch_rows,
+                                                  self.max_wait_ms, name=name, tracker=self.tracker)
+        return self.batchers[key]
+
+    def warm_up(self):
+        """Load every available model so the first requests don't pay the load cost"""
+        loaded = []
+        for nutrient in nutrients:
+            for model_type in MODEL_FILES:
+                if os.path.exists(self.registry.model_path(nutrient, model_type)):
+                    # One dummy call loads the model and traces the LSTM graph ahead of traffic
+                    self.batcher(nutrient, model_type).predict_fn(np.zeros((1, DEFAULT_LAGS)))
+                    loaded.append(f'{nutrient}_{model_type}')
+        return loaded
+
+    @staticmethod
+    def parse_rows(payload, field='rows'):
+        rows = payload.get(field)
+        if rows is None:
+            raise HTTPError(400, f"Missing '{field}'")
+        try:
+            X = np.atleast_2d(np.asarray(rows, dtype=np.float64))
+        except (TypeError, ValueError):
+            raise HTTPError(400, f"'{field}' must be a list of numeric lag rows")
+        if X.ndim != 2 or X.shape[1] != DEFAULT_LAGS:
+            raise HTTPError(400, f"Each row needs {DEFAULT_LAGS} values (lag_1 .. lag_{DEFAULT_LAGS})")
+        return X
+
+    @staticmethod
+    def parse_horizon(payload):
+        horizon = payload.get('horizon', DEFAULT_HORIZON)
+        # bool is an int subclass; 8.0 is accepted, 8.5, "8" and null are not
+        if isinstance(horizon, float) and horizon.is_integer():
+            horizon = int(horizon)
+        if isinstance(horizon, bool) or not isinstance(horizon, int):
+            raise HTTPError(400, "'horizon' must be an integer")
+        if not 1 <= horizon <= 52:
+            raise HTTPError(400, "'horizon' must be between 1 and 52")
+        return horizon
+
+    async def predict(self, payload):
+        """One-step predictions for lag rows"""
+        nutrient, model_type = self.resolve(payload)
+        X = self.parse_rows(payload)
+        preds = await self.batcher(nutrient, model_type).submit(X)
+        return {'nutrient': nutrient, 'model': model_type, 'predictions': preds[:, 0].tolist()}
+
+    async def forecast(self, payload):
+        """
+        Recursive multi-week forecast for lag rows
+        Each horizon step goes through the micro-batcher, so concurrent forecasts share predict calls
+        """
+        nutrient, model_type = self.resolve(payload)
+        X = self.parse_rows(payload, 'lags' if 'lags' in payload else 'rows')
+        horizon = self.parse_horizon(payload)
+
+        batcher = self.batcher(nutrient, model_type)
+        n_lags = X.shape[1]
+        # Same preallocated history layout as ForecastEngine.recursive
+        buffer = np.empty((len(X), n_lags + horizon), dtype=np.float64)
+        buffer[:, :n_lags] = X[:, ::-1]
+        for step in range(horizon):
+            window = np.ascontiguousarray(buffer[:, step:step + n_lags][:, ::-1])
+            buffer[:, n_lags + step] = (await batcher.submit(window))[:, 0]
+        return {'nutrient': nutrient, 'model': model_type, 'horizon': horizon,
+                'forecasts': buffer[:, n_lags:].tolist()}
+
+    def metrics(self):
+        return {
+            'latency': self.tracker.summary(),
+            'batching': {f'{n}_{m}': b.stats() for (n, m), b in self.batchers.items()},
+            'registry': self.registry.stats()
+        }
+
+
+async def _read_body(receive):
+    body = b''
+    more = True
+    while more:
+        message = await receive()
+        body += message.get('body', b'')
+        more = message.get('more_body', False)
+    return body
+
+
+async def _send_json(send, status, payload):
+    body = json.dumps(payload).encode('utf-8')
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json'),
+                            (b'content-length', str(len(body)).encode())]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def create_app(service=None, warm=True):
+    """
+    Build the ASGI application
+    Routes: POST /predict, POST /forecast, GET /metrics, GET /health
+    """
+    service = service or InferenceService()
+    routes = {
+        ('POST', '/predict'): service.predict,
+        ('POST', '/forecast'): service.forecast,
+    }
+
+    async def app(scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    if warm:
+                        service.warm_up()
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+
+        if scope['type'] != 'http':
+            return
+
+        method, path = scope['method'], scope['path'].rstrip('/') or '/'
+        if method == 'GET' and path == '/health':
+            return await _send_json(send, 200, {'status': 'ok'})
+        if method == 'GET' and path == '/metrics':
+            return await _send_json(send, 200, service.metrics())
+
+        handler = routes.get((method, path))
+        if handler is None:
+            return await _send_json(send, 404, {'error': f'No route for {method} {path}'})
+
+        start = time.perf_counter()
+        try:
+            payload = json.loads(await _read_body(receive) or b'{}')
+            if not isinstance(payload, dict):
+                raise HTTPError(400, 'Request body must be a JSON object')
+            status, result = 200, await handler(payload)
+        except json.JSONDecodeError:
+            status, result = 400, {'error': 'Invalid JSON body'}
+        except HTTPError as e:
+            status, result = e.status, {'error': e.message}
+        except FileNotFoundError as e:
+            status, result = 404, {'error': str(e)}
+        except Exception as e:
+            status, result = 500, {'error': str(e)}
+        service.tracker.record(path, time.perf_counter() - start)
+        await _send_json(send, status, result)
+
+    app.service = service
+    return app
+
+
+app = create_app()
+
+
+def main():
+    import uvicorn
+    uvicorn.run("src.inference_server:app", host=os.environ.get('HOST', '0.0.0.0'),
+                port=int(os.environ.get('PORT', 8000)), workers=1)
+
+
+if __name__ == "__main__":
+    main()
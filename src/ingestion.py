@@ -0,0 +1,130 @@
+import io
+
+import pandas as pd
+import numpy as np
+from src.memory import compact_frame, is_compact
+from src.storage import storage_for_path
+
+DEFAULT_CHUNKSIZE = 100_000
+
+# Never averaged per day: the date key, quantities (summed separately) and the per-unit price
+NON_VALUE_COLUMNS = ['Date', 'Quantity', 'Unit Price']
+
+
+def parse_unit_price(values):
+    """Convert ' RM9.00 ' style price strings to floats (unparseable values become NaN)"""
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(np.float64)
+    cleaned = values.astype(str).str.replace(r'[^0-9.\-]', '', regex=True)
+    return pd.to_numeric(cleaned, errors='coerce')
+
+
+def parse_dates(values, dayfirst=True):
+    """Parse day/month/year dates, using the fixed-format fast path when it applies"""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    try:
+        return pd.to_datetime(values, format='%d/%m/%Y' if dayfirst else '%m/%d/%Y')
+    except (ValueError, TypeError):
+        return pd.to_datetime(values, dayfirst=dayfirst)
+
+
+def week_start(dates):
+    """ISO week start (Monday) of each date"""
+    dates = dates.dt.normalize()
+    return dates - pd.to_timedelta(dates.dt.weekday, unit='D')
+
+
+def parse_item_chunk(chunk, dayfirst=True, memory_mode=None):
+    """
+    Type one chunk of an item log: datetime Date, numeric Unit Price
+    memory_mode: 'compact' also downcasts numerics and makes descriptions/codes categorical
+    """
+    if 'Date' in chunk.columns:
+        chunk['Date'] = parse_dates(chunk['Date'], dayfirst=dayfirst)
+    if 'Unit Price' in chunk.columns:
+        chunk['Unit Price'] = parse_unit_price(chunk['Unit Price'])
+    if is_compact(memory_mode):
+        chunk = compact_frame(chunk)
+    return chunk
+
+
+def iter_item_chunks(path, chunksize=DEFAULT_CHUNKSIZE, columns=None, dayfirst=True, memory_mode=None):
+    """Yield typed chunks of an item log (CSV, Parquet or Feather) of at most chunksize rows"""
+    for chunk in storage_for_path(path).iter_chunks(path, chunksize, columns=columns):
+        yield parse_item_chunk(chunk, dayfirst=dayfirst, memory_mode=memory_mode)
+
+
+class _ByteRange(io.RawIOBase):
+    """Read-only view of bytes [start, end) of a file, so the CSV parser stops at end"""
+
+    def __init__(self, f, start, end):
+        self.f = f
+        self.f.seek(start)
+        self.remaining = end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = self.f.readinto(memoryview(buffer)[:min(len(buffer), self.remaining)])
+        self.remaining -= n
+        return n
+
+
+def iter_csv_range(path, start, end, chunksize=DEFAULT_CHUNKSIZE, names=None, dayfirst=True, memory_mode=None):
+    """
+    Yield typed chunks of the rows stored in bytes [start, end) of a CSV item log
+    names: Column names when the range starts after the header (None: the range holds the header)
+    """
+    with open(path, 'rb') as f:
+        stream = io.BufferedReader(_ByteRange(f, start, end))
+        reader = pd.read_csv(stream, chunksize=chunksize, header=None if names else 'infer', names=names)
+        for chunk in reader:
+            yield parse_item_chunk(chunk, dayfirst=dayfirst, memory_mode=memory_mode)
+
+
+def value_columns_for(df, exclude=NON_VALUE_COLUMNS):
+    """Nutrient/price columns averaged per day (same selection as the daily calculator)"""
+    return [col for col in df.columns
+            if col not in exclude and pd.api.types.is_numeric_dtype(df[col])
+            and not pd.api.types.is_bool_dtype(df[col])]
+
+
+def partial_daily_aggregates(df, value_columns):
+    """
+    Per-day sums and non-null counts of one chunk
+    Partials from different chunks combine by addition (see combine_partials)
+    """
+    days = df['Date'].dt.normalize()
+    # Sums are accumulated in float64 even for float32 (compact) chunks, within the chunk as well
+    # as across chunks; only the value columns are upcast, one chunk at a time
+    grouped = df[value_columns].astype(np.float64).groupby(days)
+    partial = grouped.sum().add_suffix('__sum')
+    partial = partial.join(grouped.count().add_suffix('__count'))
+    partial['Row_Count'] = grouped.size()
+    if 'Quantity' in df.columns:
+        quantity = df['Quantity']
+        if pd.api.types.is_float_dtype(quantity):
+            quantity = quantity.astype(np.float64)
+        partial['Total_Quantity'] = quantity.groupby(days).sum()
+    partial.index.name = 'Date'
+    return partial
+
+
+def combine_partials(total, partial):
+    """Add a chunk's partial aggregates into the running total (None starts a new total)"""
+    if total is None:
+        return partial
+    return total.add(partial, fill_value=0)
+
+
+def daily_means(partials, value_columns):
+    """Turn combined sums/counts into per-day means plus Total_Quantity"""
+    daily = pd.DataFrame(index=partials.index)
+    for col in value_columns:
+        counts = partials[f'{col}__count']
+        daily[col] = partials[f'{col}__sum'].where(counts > 0) / counts.where(counts > 0)
+    if 'Total_Quantity' in partials.columns:
+        daily['Total_Quantity'] = partials['Total_Quantity']
+    return daily
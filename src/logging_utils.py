@@ -0,0 +1,152 @@
+import atexit
+import functools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+LOGGER_NAME = 'nutrimatch'
+LOG_FILE_NAME = 'pipeline.jsonl'
+
+# 'size' rotates at NUTRIMATCH_LOG_MAX_MB, 'time' rotates at midnight
+LOG_ROTATION = os.environ.get('NUTRIMATCH_LOG_ROTATION', 'size')
+LOG_MAX_MB = float(os.environ.get('NUTRIMATCH_LOG_MAX_MB', 10))
+LOG_BACKUPS = int(os.environ.get('NUTRIMATCH_LOG_BACKUPS', 7))
+
+_listener = None
+_setup_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; fields passed via extra={'fields': {...}} are merged in"""
+
+    def format(self, record):
+        payload = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'stage': record.name[len(LOGGER_NAME) + 1:] or None,
+            'message': record.getMessage(),
+        }
+        payload.update(getattr(record, 'fields', None) or {})
+        if record.exc_info:
+            payload['exception'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+def _file_handler(path):
+    if LOG_ROTATION == 'time':
+        handler = logging.handlers.TimedRotatingFileHandler(path, when='midnight', backupCount=LOG_BACKUPS,
+                                                            encoding='utf-8')
+    else:
+        handler = logging.handlers.RotatingFileHandler(path, maxBytes=int(LOG_MAX_MB * 1024 * 1024),
+                                                       backupCount=LOG_BACKUPS, encoding='utf-8')
+    handler.setFormatter(JsonFormatter())
+    return handler
+
+
+def setup_logging(base_dir=None, console=True):
+    """
+    Configure the shared pipeline logger once per process
+    Records go through a queue to a background thread that owns the rotating
+    JSON log file, so callers never block on file I/O; console output stays synchronous
+    """
+    global _listener
+    with _setup_lock:
+        logger = logging.getLogger(LOGGER_NAME)
+        if _listener is not None:
+            return logger
+
+        base_dir = base_dir if base_dir else os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        log_dir = os.path.join(base_dir, 'logs')
+        os.makedirs(log_dir, exist_ok=True)
+
+        records = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(records, _file_handler(os.path.join(log_dir, LOG_FILE_NAME)),
+                                                   respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        logger.addHandler(logging.handlers.QueueHandler(records))
+        if console:
+            stream = logging.StreamHandler(sys.stdout)
+            stream.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(stream)
+        return logger
+
+
+def shutdown_logging():
+    """Flush queued records and close the log file"""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+            logger = logging.getLogger(LOGGER_NAME)
+            for handler in list(logger.handlers):
+                logger.removeHandler(handler)
+
+
+def log_path(base_dir=None):
+    base_dir = base_dir if base_dir else os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    return os.path.join(base_dir, 'logs', LOG_FILE_NAME)
+
+
+def get_pipeline_logger(stage, base_dir=None):
+    """Logger for one pipeline stage (e.g. 'preprocessing'); records carry the stage name"""
+    setup_logging(base_dir)
+    return logging.getLogger(f'{LOGGER_NAME}.{stage}')
+
+
+@contextmanager
+def stage_timer(logger, step, **fields):
+    """
+    Log the duration of a step as a structured record
+    Yields a dict; values set on it (e.g. rows) are added to the record
+    """
+    info = dict(fields)
+    start = time.perf_counter()
+    status = 'ok'
+    try:
+        yield info
+    except Exception:
+        status = 'failed'
+        raise
+    finally:
+        info.update({'event': 'timing', 'step': step, 'status': status,
+                     'duration_s': round(time.perf_counter() - start, 6)})
+        logger.info(f"{step} finished in {info['duration_s']:.3f}s ({status})", extra={'fields': info})
+
+
+def timed(step, rows=None):
+    """
+    Method decorator for the pipeline classes: logs a timing record for each call
+    rows: Name of the DataFrame attribute whose length (and in-memory size) is reported afterwards
+    Methods returning False are recorded with status 'failed' (None, e.g. "nothing to do", is 'ok')
+    Every record also carries the process RSS after the step and its peak so far
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            from src.memory import memory_fields
+            start = time.perf_counter()
+            result = method(self, *args, **kwargs)
+            fields = {'event': 'timing', 'step': step,
+                      'status': 'failed' if result is False else 'ok',
+                      'duration_s': round(time.perf_counter() - start, 6)}
+            frame = getattr(self, rows, None) if rows else None
+            if frame is not None:
+                fields['rows'] = len(frame)
+            fields.update(memory_fields(frame))
+            self.logger.info(f"{step} finished in {fields['duration_s']:.3f}s ({fields['status']}), "
+                             f"RSS {fields['rss_mb']} MB", extra={'fields': fields})
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,64 @@
+import os
+
+import numpy as np
+
+from src.batching import MicroBatcher
+from src.forecasting import DEFAULT_LAGS
+
+# LSTM calls are dominated by fixed per-call overhead, so wait a little longer for bigger batches
+LSTM_MAX_BATCH_ROWS = int(os.environ.get('NUTRIMATCH_LSTM_MAX_BATCH_ROWS', 1024))
+LSTM_MAX_WAIT_MS = float(os.environ.get('NUTRIMATCH_LSTM_MAX_WAIT_MS', 8))
+
+
+class CompiledLSTMPredictor:
+    def __init__(self, model, n_lags=DEFAULT_LAGS):
+        """
+        Wrap a Keras LSTM in a tf.function traced once for any batch size
+        model: Loaded Keras model taking (samples, n_lags, 1)
+        n_lags: Number of timesteps (lag features)
+
+        The input signature leaves the batch dimension open, so variable-sized
+        micro-batches reuse one graph instead of retracing, and none of the
+        per-call setup done by Model.predict runs
+        """
+        import tensorflow as tf
+
+        self.model = model
+        self.n_lags = n_lags
+        signature = [tf.TensorSpec(shape=[None, n_lags, 1], dtype=tf.float32)]
+        self._fn = tf.function(lambda x: model(x, training=False), input_signature=signature)
+
+    def __call__(self, X):
+        """Predict a (n_rows, n_lags) block, returning (n_rows, n_outputs)"""
+        X = np.asarray(X, dtype=np.float32).reshape(-1, self.n_lags, 1)
+        return np.asarray(self._fn(X)).reshape(len(X), -1)
+
+
+class LSTMBatchPredictor:
+    def __init__(self, load_model, n_lags=DEFAULT_LAGS):
+        """
+        Predict function for a MicroBatcher that follows model reloads
+        load_model: Zero-argument callable returning the current model (e.g. a registry lookup)
+        The compiled graph is rebuilt only when the returned model object changes
+        """
+        self.load_model = load_model
+        self.n_lags = n_lags
+        self._model = None
+        self._compiled = None
+
+    def __call__(self, X):
+        model = self.load_model()
+        if model is not self._model:
+            self._compiled = CompiledLSTMPredictor(model, self.n_lags)
+            self._model = model
+        return self._compiled(X)
+
+
+def create_lstm_batcher(load_model, max_batch_rows=LSTM_MAX_BATCH_ROWS, max_wait_ms=LSTM_MAX_WAIT_MS,
+                        name='lstm', tracker=None):
+    """
+    Asyncio micro-batcher in front of LSTM inference
+    Requests are gathered for up to max_wait_ms or max_batch_rows rows, run as one
+    compiled call, and the results scattered back to each awaiting caller
+    """
+    return MicroBatcher(LSTMBatchPredictor(load_model), max_batch_rows, max_wait_ms, name=name, tracker=tracker)
@@ -1,44 +1,65 @@
-import pandas as pd
 import numpy as np
 import os
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense
-from tensorflow.keras.callbacks import EarlyStopping
-from sklearn.metrics import mean_squared_error
+from src.feature_store import load_features
+from src.tuning import load_best_params
 # Directory setup
 engineered_dir = "data/engineered"
 models_dir = "models"
 os.makedirs(models_dir, exist_ok=True)
 nutrients = ["carbohydrates", "fiber", "protein", "fat"]
-for nutrient in nutrients:
+def build_lstm_model(n_lags, units=64, learning_rate=0.001):
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import LSTM, Dense
+    from tensorflow.keras.losses import MeanSquaredError
+    from tensorflow.keras.optimizers import Adam
+    # Define LSTM model
+    model = Sequential()
+    model.add(LSTM(units, activation='relu', input_shape=(n_lags, 1)))
+    model.add(Dense(1))
+    model.compile(optimizer=Adam(learning_rate=learning_rate), loss=MeanSquaredError())
+    return model
+def set_tf_threads(n_threads):
+    """Limit TensorFlow's thread pools (must run before TF executes any op)"""
+    import tensorflow as tf
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(n_threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+    except RuntimeError:
+        # Runtime already initialized in this process; keep the existing pools
+        pass
+def train_lstm(nutrient, n_threads=None, verbose=1, data_dir=engineered_dir, output_dir=models_dir, params_dir=None):
+    from tensorflow.keras.callbacks import EarlyStopping
     print(f"\n:arrows_counterclockwise: Training LSTM for {nutrient}...")
+    if n_threads:
+        set_tf_threads(n_threads)
     # Load lagged data
-    path = os.path.join(engineered_dir, f"{nutrient}_lagged.csv")
-    if not os.path.exists(path):
-        print(f":warning:  File not found: {path}")
-        continue
-    df = pd.read_csv(path)
-    X = df.drop("target", axis=1).values
-    y = df["target"].values
+    try:
+        features = load_features(nutrient, data_dir)
+    except FileNotFoundError as e:
+        print(f":warning:  {e}")
+        return None
+    X = features.X
+    y = features.y
     # Reshape for LSTM: (samples, timesteps, features)
     X = X.reshape((X.shape[0], X.shape[1], 1))
     # Split into train/test
     X_train, X_test = X[:-8], X[-8:]
     y_train, y_test = y[:-8], y[-8:]
-    # Define LSTM model
-    model = Sequential()
-    model.add(LSTM(64, activation='relu', input_shape=(X.shape[1], 1)))
-    model.add(Dense(1))
-
-    from tensorflow.keras.losses import MeanSquaredError
-    model.compile(optimizer='adam', loss=MeanSquaredError())
+    # Tuned settings from <params_dir>/<nutrient>_lstm_best_params.json when present
+    params = load_best_params(nutrient, "lstm", params_dir or output_dir)
+    model = build_lstm_model(X.shape[1], units=params["units"], learning_rate=params["learning_rate"])
     # Train model
-    model.fit(X_train, y_train, epochs=50, verbose=1,
+    model.fit(X_train, y_train, epochs=params["epochs"], batch_size=params["batch_size"], verbose=verbose,
               callbacks=[EarlyStopping(patience=5, restore_best_weights=True)])
     # Evaluate
     preds = model.predict(X_test)
-    rmse = mean_squared_error(y_test, preds, squared=False)
+    rmse = np.sqrt(np.mean((y_test - preds.ravel()) ** 2))
     print(f":white_check_mark: RMSE for {nutrient}: {rmse:.2f}")
     # Save model
-    model.save(os.path.join(models_dir, f"{nutrient}_lstm_model.h5"))
-    print(f":floppy_disk: Saved model: {nutrient}_lstm_model.h5")
\ No newline at end of file
+    os.makedirs(output_dir, exist_ok=True)
+    model.save(os.path.join(output_dir, f"{nutrient}_lstm_model.h5"))
+    print(f":floppy_disk: Saved model: {nutrient}_lstm_model.h5")
+    return rmse
+if __name__ == "__main__":
+    for nutrient in nutrients:
+        train_lstm(nutrient)
@@ -0,0 +1,113 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# 'default' keeps pandas' float64/int64/object types; 'compact' downcasts as below
+MEMORY_MODES = ['default', 'compact']
+DEFAULT_MEMORY_MODE = os.environ.get('NUTRIMATCH_MEMORY_MODE', 'default')
+
+# Deep frame measurement walks every Python string of object columns (an extra pass over the
+# data), so the per-step frame_mb is shallow unless this is set
+DEEP_MEMORY = os.environ.get('NUTRIMATCH_DEEP_MEMORY', '').lower() in ['1', 'true', 'yes']
+
+# Repeated strings interned once per distinct value in compact mode
+CATEGORY_COLUMNS = ['Item Description', 'Item Code']
+
+
+def resolve_memory_mode(mode=None):
+    mode = (mode or DEFAULT_MEMORY_MODE).lower()
+    if mode not in MEMORY_MODES:
+        raise ValueError(f"Unknown memory mode '{mode}'. Use one of {MEMORY_MODES}")
+    return mode
+
+
+def is_compact(mode=None):
+    return resolve_memory_mode(mode) == 'compact'
+
+
+def compact_read_dtypes(path, columns=None, categories=CATEGORY_COLUMNS):
+    """
+    dtypes to read a file with in compact mode (float32 numerics, categorical descriptions/codes),
+    so the parser never builds the float64/object version. Integers are left to compact_frame,
+    which checks their range first
+    """
+    from src.storage import sample_dtypes
+    dtypes = {}
+    for col, dtype in sample_dtypes(path).items():
+        if columns is not None and col not in columns:
+            continue
+        if col in categories and dtype == object:
+            dtypes[col] = 'category'
+        elif pd.api.types.is_float_dtype(dtype):
+            dtypes[col] = np.float32
+    return dtypes
+
+
+def compact_frame(df, categories=CATEGORY_COLUMNS):
+    """
+    Downcast a frame in one astype call: floats to float32, integers to the smallest type
+    that holds them, description/code strings to category, 'Unit Price' strings to float32
+    Aggregations over the result must accumulate in float64 (see ingestion.partial_daily_aggregates)
+    """
+    from src.ingestion import parse_unit_price
+    if 'Unit Price' in df.columns and not pd.api.types.is_numeric_dtype(df['Unit Price']):
+        df = df.assign(**{'Unit Price': parse_unit_price(df['Unit Price'])})
+    dtypes = {}
+    for col, dtype in df.dtypes.items():
+        if col in categories and dtype == object:
+            dtypes[col] = 'category'
+        elif pd.api.types.is_float_dtype(dtype) and dtype != np.float32:
+            dtypes[col] = np.float32
+        elif pd.api.types.is_integer_dtype(dtype) and len(df):
+            low, high = df[col].min(), df[col].max()
+            for candidate in [np.int8, np.int16, np.int32]:
+                info = np.iinfo(candidate)
+                if info.min <= low and high <= info.max:
+                    dtypes[col] = candidate
+                    break
+    return df.astype(dtypes) if dtypes else df
+
+
+def frame_memory_mb(df, deep=False):
+    """
+    In-memory size of a frame: column buffers only (O(columns)), or with deep=True
+    also the string payloads of object columns (O(rows))
+    """
+    return round(df.memory_usage(deep=deep).sum() / 2 ** 20, 3)
+
+
+def current_rss_mb():
+    """Resident set size of this process right now (None where it can't be read cheaply)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return round(int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20, 1)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return round(psutil.Process().memory_info().rss / 2 ** 20, 1)
+    except ImportError:
+        return None
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far (ru_maxrss is KiB on Linux, bytes on macOS)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+def memory_fields(frame=None, deep=None):
+    """
+    Structured log fields describing memory use after a step
+    deep: Measure string payloads too (default: NUTRIMATCH_DEEP_MEMORY)
+    """
+    fields = {'rss_mb': current_rss_mb(), 'peak_rss_mb': peak_rss_mb()}
+    if frame is not None:
+        fields['frame_mb'] = frame_memory_mb(frame, DEEP_MEMORY if deep is None else deep)
+    return fields
@@ -0,0 +1,155 @@
+import os
+import threading
+from collections import OrderedDict
+
+# Model families and the file naming used by the training scripts
+MODEL_FILES = {
+    'random_forest': '{nutrient}_random_forest.pkl',
+    'xgboost': '{nutrient}_xgboost.pkl',
+    'lstm': '{nutrient}_lstm_model.h5'
+}
+
+# Display names used by the Streamlit dropdowns
+MODEL_CHOICES = {
+    'Random Forest': 'random_forest',
+    'XGBoost': 'xgboost',
+    'LSTM': 'lstm'
+}
+
+DEFAULT_MEMORY_BUDGET_MB = float(os.environ.get('NUTRIMATCH_MODEL_CACHE_MB', 512))
+
+# Serve exported .npz tree ensembles instead of the sklearn/XGBoost pickles when available
+PREFER_COMPACT_TREES = os.environ.get('NUTRIMATCH_COMPACT_TREES', '1') == '1'
+
+
+def _load_pickle(path):
+    import joblib
+    return joblib.load(path)
+
+
+def _load_compact(path):
+    from src.tree_export import load_tree_model
+    return load_tree_model(path)
+
+
+def _load_keras(path):
+    # compile=False skips rebuilding the optimizer/loss, inference only needs the graph
+    from tensorflow.keras.models import load_model
+    return load_model(path, compile=False)
+
+
+class ModelRegistry:
+    def __init__(self, models_dir=None, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB,
+                 prefer_compact=PREFER_COMPACT_TREES):
+        """
+        Process-wide cache of trained model artifacts
+        models_dir: Directory holding the saved models (defaults to <project root>/models)
+        memory_budget_mb: Approximate upper bound for the cached models, based on artifact size
+        prefer_compact: Load tree models from their exported .npz (NumPy only) when it is
+                        at least as new as the pickle
+        """
+        self.base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        self.models_dir = models_dir if models_dir else os.path.join(self.base_dir, 'models')
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self.prefer_compact = prefer_compact
+
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def model_path(self, nutrient, model_type):
+        """Resolve the artifact path for a nutrient/model family"""
+        model_type = MODEL_CHOICES.get(model_type, model_type)
+        if model_type not in MODEL_FILES:
+            raise ValueError(f"Unknown model type '{model_type}'. Use one of {list(MODEL_FILES)}")
+        return os.path.join(self.models_dir, MODEL_FILES[model_type].format(nutrient=nutrient))
+
+    def artifact_path(self, nutrient, model_type):
+        """Path actually served: the compact export for tree models when preferred and fresh"""
+        path = self.model_path(nutrient, model_type)
+        if self.prefer_compact and path.endswith('.pkl'):
+            compact = os.path.splitext(path)[0] + '.npz'
+            if os.path.exists(compact) and (not os.path.exists(path) or
+                                            os.path.getmtime(compact) >= os.path.getmtime(path)):
+                return compact
+        return path
+
+    def get(self, nutrient, model_type):
+        """
+        Return the loaded model, reading it from disk only on first use
+        or when the file changed since it was cached
+        """
+        path = self.artifact_path(nutrient, model_type)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Model file not found: {path}")
+
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry['signature'] == signature:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry['model']
+
+            self.misses += 1
+            if path.endswith('.h5'):
+                loader = _load_keras
+            elif path.endswith('.npz'):
+                loader = _load_compact
+            else:
+                loader = _load_pickle
+            model = loader(path)
+            self._entries[path] = {
+                'model': model,
+                'signature': signature,
+                'size': stat.st_size
+            }
+            self._entries.move_to_end(path)
+            self._evict()
+            return model
+
+    def invalidate(self, nutrient=None, model_type=None):
+        """Drop one cached model, or everything when no arguments are given"""
+        with self._lock:
+            if nutrient is None and model_type is None:
+                self._entries.clear()
+            else:
+                for path in {self.model_path(nutrient, model_type), self.artifact_path(nutrient, model_type)}:
+                    self._entries.pop(path, None)
+
+    def memory_usage(self):
+        """Approximate size of the cached models in bytes"""
+        with self._lock:
+            return sum(entry['size'] for entry in self._entries.values())
+
+    def stats(self):
+        """Cache statistics for display/logging"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'memory_bytes': self.memory_usage(),
+                'memory_budget_bytes': self.memory_budget,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+    def _evict(self):
+        """Evict least recently used models until the budget is met (always keep the newest)"""
+        while len(self._entries) > 1 and self.memory_usage() > self.memory_budget:
+            self._entries.popitem(last=False)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Shared registry instance, reused across Streamlit reruns in the same process"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+        return _registry
@@ -0,0 +1,308 @@
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.ingestion import DEFAULT_CHUNKSIZE
+from src.storage import find_frame, read_frame, storage_for_path, write_frame
+
+raw_dir = os.path.join("data", "raw")
+catalog_dir = os.path.join("data", "catalog")
+nutrients = ["carbohydrates", "fiber", "protein", "fat"]
+
+# Raw files the catalog is built from, most authoritative first. Only Item_FullList carries
+# per-unit nutrients ("(g)" columns) and item codes; Item_List and Merged_ItemList hold line
+# totals, so they are resolved against the catalog rather than feeding it
+CATALOG_SOURCES = [
+    {"file": "Item_FullList.csv", "description": "Item Description", "code": "Item Code",
+     "nutrients": {"carbohydrates": "Carbohydrates (g)", "fiber": "Fiber (g)",
+                   "protein": "Protein (g)", "fat": "Fat (g)"}},
+]
+
+# Fuzzy matches below this trigram similarity (Dice coefficient, 0..1) are left unresolved
+MIN_SIMILARITY = 0.6
+# Cells of the dense (queries x catalog items) similarity block scored at once (float32: 64 MB)
+FUZZY_BLOCK_CELLS = 1 << 24
+CATALOG_STEM = "nutrient_catalog"
+
+
+def normalize_descriptions(values):
+    """Canonical form used as the hash key: upper case, punctuation to spaces, single spaces"""
+    return (pd.Series(values, dtype="object").astype(str).str.upper()
+            .str.replace(r"[^A-Z0-9]+", " ", regex=True).str.strip())
+
+
+def trigrams(text):
+    """Character trigrams of a normalized description, padded so short words still count"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _trigram_matrix(texts, vocabulary, grow=False):
+    """
+    Binary (n_texts, n_trigrams) CSR matrix
+    grow: Add unseen trigrams to vocabulary (catalog build); otherwise they are dropped
+    """
+    from scipy import sparse
+    indptr, indices = [0], []
+    for text in texts:
+        for gram in trigrams(text):
+            column = vocabulary.get(gram)
+            if column is None and grow:
+                column = vocabulary[gram] = len(vocabulary)
+            if column is not None:
+                indices.append(column)
+        indptr.append(len(indices))
+    data = np.ones(len(indices), dtype=np.float32)
+    return sparse.csr_matrix((data, indices, indptr), shape=(len(texts), len(vocabulary)))
+
+
+def _clean_codes(values):
+    """Stripped code strings with missing codes kept as None"""
+    return values.astype(str).str.strip().where(values.notna(), None).to_numpy()
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+class NutrientCatalog:
+    def __init__(self, items, meta=None):
+        """
+        Per-unit nutrients of every known item plus the lookup structures over it
+        items: DataFrame with key (normalized description), description, code and one column per nutrient
+        Exact lookups go through hash indexes on key and code; fuzzy lookups through a
+        trigram matrix built once and scored with a sparse product
+        """
+        self.items = items.reset_index(drop=True)
+        self.meta = meta or {}
+        self.key_index = pd.Index(self.items["key"])
+        codes = self.items["code"].dropna().astype(str).str.upper().str.strip()
+        # A code shared by several descriptions can't pick an item on its own: those lines
+        # are resolved by their description instead, so the code index stays unique
+        codes = codes[~codes.duplicated(keep=False)]
+        self.code_index = pd.Index(codes)
+        self.code_rows = codes.index.to_numpy()
+        self.values = np.ascontiguousarray(self.items[nutrients].to_numpy(dtype=np.float32))
+        self._vocabulary = None
+        self._grams = None
+
+    def __len__(self):
+        return len(self.items)
+
+    def _ensure_trigrams(self):
+        if self._grams is None:
+            self._vocabulary = {}
+            self._grams = _trigram_matrix(self.items["key"], self._vocabulary, grow=True).T.tocsr()
+            self._gram_counts = np.asarray(self._grams.sum(axis=0)).ravel()
+
+    def _fuzzy(self, keys, min_similarity):
+        """Best catalog row and Dice similarity for each key (-1 when below min_similarity)"""
+        self._ensure_trigrams()
+        rows = np.full(len(keys), -1, dtype=np.int64)
+        scores = np.zeros(len(keys), dtype=np.float32)
+        batch_rows = max(1, FUZZY_BLOCK_CELLS // max(1, len(self)))
+        for start in range(0, len(keys), batch_rows):
+            batch = keys[start:start + batch_rows]
+            query = _trigram_matrix(batch, self._vocabulary)
+            # Query trigrams missing from the vocabulary still count in the query's size
+            query_counts = np.fromiter((len(trigrams(text)) for text in batch), dtype=np.float32, count=len(batch))
+            shared = (query @ self._grams).toarray()
+            dice = 2 * shared / (query_counts[:, np.newaxis] + self._gram_counts[np.newaxis, :])
+            best = dice.argmax(axis=1)
+            best_scores = dice[np.arange(len(batch)), best]
+            keep = best_scores >= min_similarity
+            rows[start:start + len(batch)] = np.where(keep, best, -1)
+            scores[start:start + len(batch)] = best_scores
+        return rows, scores
+
+    def resolve(self, descriptions, codes=None, fuzzy=True, min_similarity=MIN_SIMILARITY):
+        """
+        Map transaction lines to catalog rows
+        Each distinct description is resolved once (lines repeat the same few thousand items),
+        by item code first, then exact normalized description, then trigram similarity
+        Returns a DataFrame aligned with the input: row (-1 if unresolved), match ('code',
+        'exact', 'fuzzy' or 'none') and score (1.0 for exact matches)
+        """
+        n_lines = len(descriptions)
+        line_rows = np.full(n_lines, -1, dtype=np.int64)
+        line_scores = np.zeros(n_lines, dtype=np.float32)
+        line_match = np.full(n_lines, "none", dtype=object)
+
+        if codes is not None:
+            codes = pd.Series(codes, dtype="object")
+            # Missing codes stay missing (never the string "nan") and fall through to the description
+            code_keys = codes.astype(str).str.upper().str.strip().where(codes.notna())
+            positions = self.code_index.get_indexer(code_keys)
+            found = positions >= 0
+            line_rows[found] = self.code_rows[positions[found]]
+            line_scores[found] = 1.0
+            line_match[found] = "code"
+
+        pending = line_rows < 0
+        codes_, uniques = pd.factorize(normalize_descriptions(np.asarray(descriptions, dtype=object)[pending]))
+        unique_rows = self.key_index.get_indexer(uniques)
+        unique_scores = (unique_rows >= 0).astype(np.float32)
+        unique_match = np.where(unique_rows >= 0, "exact", "none").astype(object)
+        if fuzzy:
+            missing = np.flatnonzero(unique_rows < 0)
+            if len(missing):
+                rows, scores = self._fuzzy(np.asarray(uniques)[missing], min_similarity)
+                unique_rows[missing] = rows
+                unique_scores[missing] = scores
+                unique_match[missing[rows >= 0]] = "fuzzy"
+
+        pending_lines = np.flatnonzero(pending)
+        has_key = codes_ >= 0
+        line_rows[pending_lines[has_key]] = unique_rows[codes_[has_key]]
+        line_scores[pending_lines[has_key]] = unique_scores[codes_[has_key]]
+        line_match[pending_lines[has_key]] = unique_match[codes_[has_key]]
+        return pd.DataFrame({"row": line_rows, "match": line_match, "score": line_scores})
+
+    def join(self, df, description_col="Item Description", code_col="Item Code", quantity_col=None, **kwargs):
+        """
+        Add per-unit nutrients (and line totals when quantity_col is given) to transaction lines
+        Adds catalog_description, catalog_match and catalog_score; unresolved lines get NaN nutrients
+        and an empty catalog_description
+        """
+        codes = df[code_col] if code_col and code_col in df.columns else None
+        resolved = self.resolve(df[description_col].to_numpy(), codes, **kwargs)
+        rows = resolved["row"].to_numpy()
+        found = rows >= 0
+        per_unit = np.full((len(df), len(nutrients)), np.nan, dtype=np.float32)
+        per_unit[found] = self.values[rows[found]]
+
+        out = df.copy()
+        out["catalog_description"] = np.where(found, self.items["description"].to_numpy()[np.maximum(rows, 0)], "")
+        out["catalog_match"] = resolved["match"].to_numpy()
+        out["catalog_score"] = resolved["score"].to_numpy()
+        for i, nutrient in enumerate(nutrients):
+            out[f"{nutrient}_per_unit"] = per_unit[:, i]
+            if quantity_col:
+                out[f"{nutrient}_total"] = per_unit[:, i] * pd.to_numeric(df[quantity_col], errors="coerce").to_numpy()
+        return out
+
+    def save(self, directory=catalog_dir, storage_format=None):
+        os.makedirs(directory, exist_ok=True)
+        path = write_frame(self.items, os.path.join(directory, CATALOG_STEM), storage_format)
+        with open(os.path.join(directory, f"{CATALOG_STEM}.json.tmp"), "w") as f:
+            json.dump(self.meta, f, indent=2)
+        os.replace(os.path.join(directory, f"{CATALOG_STEM}.json.tmp"), os.path.join(directory, f"{CATALOG_STEM}.json"))
+        return path
+
+    @classmethod
+    def load(cls, directory=catalog_dir):
+        items = read_frame(find_frame(directory, CATALOG_STEM))
+        with open(os.path.join(directory, f"{CATALOG_STEM}.json")) as f:
+            meta = json.load(f)
+        return cls(items, meta)
+
+
+def build_catalog(sources=None, source_dir=raw_dir):
+    """
+    One row per normalized description: median per-unit nutrients over every line it appears in,
+    its most frequent item code and spelling. Earlier sources win when an item is in several
+    Codes shared by several descriptions are kept per item but not used for code lookups
+    """
+    sources = sources or CATALOG_SOURCES
+    frames, signatures = [], {}
+    for rank, source in enumerate(sources):
+        path = os.path.join(source_dir, source["file"])
+        columns = [source["description"]] + ([source["code"]] if source.get("code") else []) + list(source["nutrients"].values())
+        df = read_frame(path, columns=columns)
+        frame = pd.DataFrame({"key": normalize_descriptions(df[source["description"]]).to_numpy(),
+                              "description": df[source["description"]].astype(str).str.strip().to_numpy(),
+                              "code": _clean_codes(df[source["code"]]) if source.get("code") else None,
+                              "rank": rank})
+        for nutrient, column in source["nutrients"].items():
+            frame[nutrient] = pd.to_numeric(df[column], errors="coerce").to_numpy()
+        frames.append(frame)
+        signatures[os.path.abspath(path)] = _signature(path)
+
+    lines = pd.concat(frames, ignore_index=True)
+    lines = lines[lines["key"] != ""]
+    # Only the most authoritative source of each item contributes to its values
+    lines = lines[lines["rank"] == lines.groupby("key")["rank"].transform("min")]
+    grouped = lines.groupby("key", sort=True)
+    items = grouped[nutrients].median()
+    items["description"] = grouped["description"].agg(lambda s: s.mode().iat[0])
+    items["code"] = grouped["code"].agg(lambda s: s.mode().iat[0] if s.notna().any() else None)
+    items["lines"] = grouped.size()
+    items = items.reset_index()[["key", "description", "code", "lines"] + nutrients]
+    meta = {"sources": signatures, "items": len(items)}
+    return NutrientCatalog(items, meta)
+
+
+def is_current(directory=catalog_dir):
+    """True when a saved catalog was built from the raw files as they are now"""
+    meta_path = os.path.join(directory, f"{CATALOG_STEM}.json")
+    if not os.path.exists(meta_path):
+        return False
+    with open(meta_path) as f:
+        meta = json.load(f)
+    try:
+        return all(_signature(path) == signature for path, signature in meta["sources"].items())
+    except OSError:
+        return False
+
+
+def load_catalog(sources=None, source_dir=raw_dir, directory=catalog_dir, refresh=True):
+    """The persisted catalog, rebuilt first when its raw sources changed (refresh=True)"""
+    if refresh and not is_current(directory):
+        catalog = build_catalog(sources, source_dir)
+        catalog.save(directory)
+        return catalog
+    return NutrientCatalog.load(directory)
+
+
+def join_file(path, output_path, catalog=None, description_col="Item Description", code_col="Item Code",
+              quantity_col=None, chunksize=DEFAULT_CHUNKSIZE):
+    """Resolve a transaction file of any size chunk by chunk into output_path; returns match counts"""
+    catalog = catalog or load_catalog()
+    counts = {}
+    writer = storage_for_path(output_path).open_writer(output_path)
+    try:
+        for chunk in storage_for_path(path).iter_chunks(path, chunksize):
+            joined = catalog.join(chunk, description_col, code_col, quantity_col)
+            for match, count in joined["catalog_match"].value_counts().items():
+                counts[match] = counts.get(match, 0) + int(count)
+            writer.write(joined)
+    finally:
+        writer.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Item description → nutrient catalog")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the catalog even if the raw files are unchanged")
+    parser.add_argument("--lookup", nargs="+", default=None, help="Descriptions to resolve")
+    parser.add_argument("--join", default=None, help="Transaction file to resolve (CSV, Parquet or Feather)")
+    parser.add_argument("--output", default=None, help="Where --join writes (default: <file>_nutrients.csv)")
+    parser.add_argument("--quantity", default=None, help="Quantity column; adds per-line nutrient totals")
+    parser.add_argument("--min-similarity", type=float, default=MIN_SIMILARITY)
+    args = parser.parse_args()
+
+    if args.rebuild:
+        catalog = build_catalog()
+        catalog.save()
+    else:
+        catalog = load_catalog()
+    print(f"📚 Catalog: {len(catalog)} items")
+
+    if args.lookup:
+        resolved = catalog.resolve(np.array(args.lookup, dtype=object), min_similarity=args.min_similarity)
+        for description, (row, match, score) in zip(args.lookup, resolved.itertuples(index=False)):
+            found = catalog.items.iloc[row]["description"] if row >= 0 else "-"
+            print(f"{description!r} → {found} ({match}, {score:.2f})")
+
+    if args.join:
+        output = args.output or f"{os.path.splitext(args.join)[0]}_nutrients.csv"
+        counts = join_file(args.join, output, catalog, quantity_col=args.quantity)
+        print(f"✅ Joined {sum(counts.values())} lines → {output} ({counts})")
+
+
+if __name__ == "__main__":
+    main()
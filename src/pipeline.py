@@ -0,0 +1,391 @@
+import argparse
+import filecmp
+import hashlib
+import inspect
+import json
+import os
+import shutil
+from datetime import datetime
+
+from src.logging_utils import get_pipeline_logger
+
+nutrients = ["carbohydrates", "fiber", "protein", "fat"]
+NUTRIENT_COLUMNS = {"Carbohydrates": "carbohydrates", "Fiber": "fiber", "Protein": "protein", "Fat": "fat"}
+
+
+def _hash_file(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class Stage:
+    def __init__(self, name, func, deps=(), params=None, code=(), sources=(), publish=None, runtime=None):
+        """
+        One step of the pipeline DAG
+        name: Stage name
+        func: Callable(inputs, params, out_dir) writing its outputs into out_dir;
+              inputs maps each dependency name to {file name: absolute path}
+        deps: Names of upstream stages
+        params: Parameters that change the outputs (part of the cache key)
+        code: Extra source files the stage depends on (its own function source is always hashed)
+        sources: External input files (e.g. the raw item log), hashed by content
+        publish: Directory the outputs are copied to after a run or cache hit (e.g. models/),
+                 or {file name: directory} with '*' for every other file
+        runtime: Settings passed to func that don't change results (e.g. core budget), not hashed
+        """
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.params = dict(params or {})
+        self.code = list(code)
+        self.sources = list(sources)
+        self.publish = publish
+        self.runtime = dict(runtime or {})
+
+
+class PipelineRunner:
+    def __init__(self, stages, base_dir=None, cache_dir=None):
+        """
+        Run stages in dependency order, skipping any whose inputs, code and
+        params hash to an output set that is already cached
+        stages: List of Stage objects
+        cache_dir: Where stage outputs live, one directory per (stage, cache key)
+        """
+        self.base_dir = base_dir if base_dir else os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        self.cache_dir = cache_dir if cache_dir else os.path.join(self.base_dir, 'data', 'cache')
+        self.stages = {stage.name: stage for stage in stages}
+        self.logger = get_pipeline_logger('pipeline', self.base_dir)
+        self._source_hashes_path = os.path.join(self.cache_dir, 'source_hashes.json')
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def log_message(self, message, **fields):
+        self.logger.info(message, extra={'fields': fields})
+
+    def order(self, targets=None):
+        """Topological order of the targets and everything upstream of them"""
+        ordered, visiting, done = [], set(), set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Cycle in pipeline at stage '{name}'")
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage '{name}'")
+            visiting.add(name)
+            for dep in self.stages[name].deps:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+            ordered.append(name)
+
+        for name in targets or list(self.stages):
+            visit(name)
+        return ordered
+
+    def _source_hash(self, path, cache):
+        """Content hash of an external input, reused while size and mtime are unchanged"""
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        entry = cache.get(key)
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return entry['sha256']
+        digest = _hash_file(path)
+        cache[key] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest}
+        return digest
+
+    def _code_hash(self, stage):
+        digest = hashlib.sha256(inspect.getsource(stage.func).encode())
+        for path in stage.code:
+            digest.update(_hash_file(os.path.join(self.base_dir, path)).encode())
+        return digest.hexdigest()
+
+    def cache_key(self, stage, upstream, source_cache):
+        """sha256 over code, params, external inputs and the upstream cache keys"""
+        material = {
+            'stage': stage.name,
+            'code': self._code_hash(stage),
+            'params': stage.params,
+            'sources': {os.path.basename(p): self._source_hash(os.path.join(self.base_dir, p), source_cache)
+                        for p in stage.sources},
+            'upstream': {dep: upstream[dep]['key'] for dep in stage.deps}
+        }
+        return hashlib.sha256(json.dumps(material, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+    def run(self, targets=None, force=()):
+        """
+        Execute the pipeline up to targets (all stages by default)
+        force: Stage names to re-run even when cached
+        Returns {stage: {'key', 'dir', 'outputs', 'cached'}}
+        """
+        source_cache = {}
+        if os.path.exists(self._source_hashes_path):
+            with open(self._source_hashes_path) as f:
+                source_cache = json.load(f)
+
+        results = {}
+        for name in self.order(targets):
+            stage = self.stages[name]
+            key = self.cache_key(stage, results, source_cache)
+            out_dir = os.path.join(self.cache_dir, name, key)
+            manifest_path = os.path.join(out_dir, 'manifest.json')
+
+            if os.path.exists(manifest_path) and name not in force:
+                with open(manifest_path) as f:
+                    manifest = json.load(f)
+                outputs = {file_name: os.path.join(out_dir, file_name) for file_name in manifest['outputs']}
+                if all(os.path.exists(path) for path in outputs.values()):
+                    self.log_message(f"⏭️  {name}: cached ({key})", stage_name=name, cache='hit', key=key)
+                    results[name] = {'key': key, 'dir': out_dir, 'outputs': outputs, 'cached': True}
+                    self._publish(stage, outputs)
+                    continue
+
+            # Build into a temporary directory so a failed stage never looks cached
+            tmp_dir = out_dir + '.tmp'
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            os.makedirs(tmp_dir)
+            inputs = {dep: results[dep]['outputs'] for dep in stage.deps}
+            self.log_message(f"▶️  {name}: running ({key})", stage_name=name, cache='miss', key=key)
+            start = datetime.now()
+            stage.func(inputs, dict(stage.params, **stage.runtime), tmp_dir)
+            duration = (datetime.now() - start).total_seconds()
+
+            # Sub-directories (e.g. the lag stage's features/ store) move with the stage but aren't published
+            file_names = sorted(f for f in os.listdir(tmp_dir)
+                                if f != 'manifest.json' and os.path.isfile(os.path.join(tmp_dir, f)))
+            with open(os.path.join(tmp_dir, 'manifest.json'), 'w') as f:
+                json.dump({'stage': name, 'key': key, 'params': stage.params, 'deps': stage.deps,
+                           'created': start.isoformat(), 'duration_s': duration, 'outputs': file_names}, f, indent=2)
+            shutil.rmtree(out_dir, ignore_errors=True)
+            os.replace(tmp_dir, out_dir)
+
+            outputs = {file_name: os.path.join(out_dir, file_name) for file_name in file_names}
+            results[name] = {'key': key, 'dir': out_dir, 'outputs': outputs, 'cached': False}
+            from src.memory import memory_fields
+            memory = memory_fields()
+            self.log_message(f"✅ {name}: {len(outputs)} outputs in {duration:.2f}s, "
+                             f"peak RSS {memory['peak_rss_mb']} MB", stage_name=name, duration_s=duration, key=key, **memory)
+            self._publish(stage, outputs)
+
+        with open(self._source_hashes_path, 'w') as f:
+            json.dump(source_cache, f, indent=2)
+        return results
+
+    def _publish(self, stage, outputs):
+        """Copy outputs to their conventional location (models/, data/engineered/, ...)"""
+        if not stage.publish:
+            return
+        targets = stage.publish if isinstance(stage.publish, dict) else {'*': stage.publish}
+        for file_name, path in outputs.items():
+            publish_dir = targets.get(file_name, targets.get('*'))
+            if publish_dir is None:
+                continue
+            target_dir = os.path.join(self.base_dir, publish_dir)
+            os.makedirs(target_dir, exist_ok=True)
+            target = os.path.join(target_dir, file_name)
+            if not os.path.exists(target) or not filecmp.cmp(path, target, shallow=False):
+                shutil.copy2(path, target)
+
+
+# --- Stage implementations ------------------------------------------------------------
+
+def _single(inputs, dep):
+    """Path of the one data file produced by an upstream stage"""
+    return next(iter(inputs[dep].values()))
+
+
+def _stage_dir(inputs, dep):
+    """Output directory of an upstream stage"""
+    return os.path.dirname(_single(inputs, dep))
+
+
+def run_preprocessing(inputs, params, out_dir):
+    from src.data_preprocessing import DataPreprocessor
+    from src.storage import get_storage
+    preprocessor = DataPreprocessor(storage_format=params['storage_format'],
+                                    memory_mode=params.get('memory_mode', 'default'))
+    if not preprocessor.load_data(params['raw_file']):
+        raise RuntimeError(f"Failed to load {params['raw_file']}")
+    preprocessor.parse_dates()
+    storage = get_storage(params['storage_format'])
+    storage.write(preprocessor.df, os.path.join(out_dir, f"processed_data{storage.extension}"))
+
+
+def run_daily(inputs, params, out_dir):
+    from src.daily_food_waste import DailyFoodWasteCalculator
+    from src.storage import get_storage
+    calculator = DailyFoodWasteCalculator(storage_format=params['storage_format'],
+                                          memory_mode=params.get('memory_mode', 'default'))
+    if not calculator.calculate_daily_food_waste_lazy(_single(inputs, 'preprocessing'), backend=params.get('backend')):
+        raise RuntimeError("Daily food waste calculation failed")
+    storage = get_storage(params['storage_format'])
+    storage.write(calculator.daily_waste_df, os.path.join(out_dir, f"daily_food_waste{storage.extension}"))
+
+
+def run_weekly(inputs, params, out_dir):
+    from src.weekly_aggregation import WeeklyAggregator
+    from src.storage import get_storage
+    aggregator = WeeklyAggregator(storage_format=params['storage_format'],
+                                  memory_mode=params.get('memory_mode', 'default'))
+    if not aggregator.aggregate_weekly_lazy(_single(inputs, 'daily'), agg_method=params['agg_method'],
+                                            backend=params.get('backend')):
+        raise RuntimeError("Weekly aggregation failed")
+    storage = get_storage(params['storage_format'])
+    storage.write(aggregator.weekly_df, os.path.join(out_dir, f"weekly_food_waste{storage.extension}"))
+
+
+def run_features(inputs, params, out_dir):
+    from src.feature_engineering_full import FeatureEngineer
+    from src.storage import get_storage, read_frame
+    engineer = FeatureEngineer(storage_format=params['storage_format'],
+                               memory_mode=params.get('memory_mode', 'default'))
+    engineer.df = read_frame(_single(inputs, 'weekly'))
+    engineer.original_columns = engineer.df.columns.tolist()
+    if not engineer.engineer_features():
+        raise RuntimeError("Feature engineering failed")
+    engineer.save_transform(out_dir)
+    storage = get_storage(params['storage_format'])
+    storage.write(engineer.df, os.path.join(out_dir, f"engineered_features{storage.extension}"))
+
+
+def run_lags(inputs, params, out_dir):
+    from src.feature_engineering_lag import build_lag_features
+    from src.feature_store import build_store
+    from src.storage import get_storage, read_frame
+    weekly = read_frame(_single(inputs, 'weekly')).rename(columns=NUTRIENT_COLUMNS)
+    storage = get_storage(params['storage_format'])
+    for nutrient, lagged in build_lag_features(weekly, nutrients, lags=params['lags']).items():
+        storage.write(lagged, os.path.join(out_dir, f"{nutrient}_lagged{storage.extension}"))
+    # The memory-mapped matrices are part of the stage, so nothing writes into it once it is cached
+    build_store(nutrients, out_dir)
+
+
+def run_training(inputs, params, out_dir):
+    from src.training_orchestrator import train_all
+    lag_dir = _stage_dir(inputs, 'lags')
+    # Models go to the stage's cache dir; tuned parameters are read from where src.tuning saved them
+    train_all(nutrients, params['models'], core_budget=params.get('cores'),
+              output_path=os.path.join(out_dir, 'training_metrics.csv'), data_dir=lag_dir, models_dir=out_dir,
+              params_dir=params['params_dir'])
+
+
+def tuned_params(models, params_dir='models'):
+    """
+    Contents of every tuned-parameter file training would use, so re-tuning changes the
+    training stage's key (files that don't exist yet simply mean the defaults)
+    """
+    from src.tuning import best_params_path
+    tuned = {}
+    for nutrient in nutrients:
+        for model_type in models:
+            path = best_params_path(nutrient, model_type, params_dir)
+            if os.path.exists(path):
+                with open(path) as f:
+                    tuned[os.path.basename(path)] = json.load(f)['params']
+    return tuned
+
+
+def run_forecast(inputs, params, out_dir):
+    import pandas as pd
+    from src.feature_store import load_features
+    from src.forecasting import ForecastEngine
+    from src.model_registry import ModelRegistry
+    from src.storage import get_storage
+    lag_dir = _stage_dir(inputs, 'lags')
+    registry = ModelRegistry(models_dir=_stage_dir(inputs, 'training'))
+    storage = get_storage(params['storage_format'])
+    for nutrient in nutrients:
+        last_row = load_features(nutrient, lag_dir, refresh=False).last_lags()
+        for model_type in params['models']:
+            model = registry.get(nutrient, model_type)
+            engine = ForecastEngine(model, horizon=params['horizon'], n_lags=len(params['lags']))
+            predictions = engine.recursive(last_row)[0]
+            forecast_df = pd.DataFrame({"Week": range(1, params['horizon'] + 1), "Prediction": predictions})
+            storage.write(forecast_df, os.path.join(out_dir, f"{nutrient}_{model_type}_forecast{storage.extension}"))
+
+
+def build_pipeline(raw_file='Item_FullList.csv', storage_format='parquet', agg_method='sum',
+                   lags=(1, 2, 3, 4), models=("random_forest", "xgboost", "lstm"), horizon=8, cores=None,
+                   backend=None, memory_mode=None):
+    """
+    The standard preprocessing → daily → weekly → features → lags → training → forecast DAG
+    Only the parameters of a stage (and its upstream keys) decide whether it re-runs,
+    so e.g. changing the horizon only re-runs the forecast stage
+    memory_mode: 'compact' runs the data stages on float32/categorical frames
+    """
+    from src.memory import resolve_memory_mode
+    lags = sorted(set(int(k) for k in lags))
+    if lags != list(range(1, len(lags) + 1)):
+        # Recursive forecasts feed each prediction back in as lag_1 and shift the rest by one week
+        raise ValueError(f"Lags must be contiguous from 1 (e.g. 1, 2, 3, 4) to forecast recursively, got {lags}")
+    common = {'storage_format': storage_format}
+    # float32 changes results slightly, so compact mode is part of the data stages' keys
+    # (the default mode adds nothing, keeping existing cache entries valid)
+    memory = {'memory_mode': 'compact'} if resolve_memory_mode(memory_mode) == 'compact' else {}
+    models = list(models)
+    training_params = dict(common, models=models, params_dir='models', tuned=tuned_params(models))
+    stages = [
+        Stage('preprocessing', run_preprocessing, params=dict(common, raw_file=raw_file, **memory),
+              code=['src/data_preprocessing.py', 'src/storage.py', 'src/ingestion.py', 'src/memory.py'],
+              sources=[os.path.join('data', 'raw', raw_file)]),
+        # The dataframe backend changes how aggregation runs, not its results
+        Stage('daily', run_daily, deps=['preprocessing'], params=dict(common, **memory),
+              code=['src/daily_food_waste.py', 'src/execution_backends.py', 'src/ingestion.py', 'src/memory.py',
+                    'src/storage.py'],
+              runtime={'backend': backend}),
+        Stage('weekly', run_weekly, deps=['daily'], params=dict(common, agg_method=agg_method, **memory),
+              code=['src/weekly_aggregation.py', 'src/execution_backends.py', 'src/ingestion.py', 'src/memory.py',
+                    'src/storage.py'], runtime={'backend': backend}),
+        # The fitted transform is served with the models; the features themselves go to data/engineered
+        Stage('features', run_features, deps=['weekly'], params=dict(common, **memory),
+              code=['src/feature_engineering_full.py', 'src/transforms.py', 'src/feature_kernel.py', 'src/memory.py',
+                    'src/storage.py'],
+              publish={'*': os.path.join('data', 'engineered'), 'feature_transform.json': 'models'}),
+        Stage('lags', run_lags, deps=['weekly'], params=dict(common, lags=lags),
+              code=['src/feature_engineering_lag.py', 'src/feature_store.py', 'src/storage.py'],
+              publish=os.path.join('data', 'engineered')),
+        # The core budget changes speed, not results, so it stays out of the cache key
+        Stage('training', run_training, deps=['lags'], params=training_params,
+              code=['src/training_orchestrator.py', 'src/random_forest_training.py', 'src/xgboost_training.py',
+                    'src/lstm_training.py', 'src/tree_export.py', 'src/tuning.py'],
+              publish='models', runtime={'cores': cores}),
+        Stage('forecast', run_forecast, deps=['lags', 'training'],
+              params=dict(common, models=models, horizon=horizon, lags=lags),
+              code=['src/forecasting.py', 'src/feature_store.py', 'src/model_registry.py', 'src/storage.py']),
+    ]
+    return stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the NutriMatch pipeline with cached stages")
+    parser.add_argument('--until', default=None, help="Last stage to run (default: forecast)")
+    parser.add_argument('--force', nargs='*', default=[], help="Stages to re-run even if cached")
+    parser.add_argument('--raw-file', default='Item_FullList.csv')
+    parser.add_argument('--format', default='parquet', choices=['parquet', 'feather', 'csv'])
+    parser.add_argument('--horizon', type=int, default=8)
+    parser.add_argument('--models', nargs='+', default=["random_forest", "xgboost", "lstm"])
+    parser.add_argument('--cores', type=int, default=None)
+    parser.add_argument('--backend', default=None, choices=['pandas', 'polars', 'dask'],
+                        help="Dataframe backend for the daily/weekly aggregation")
+    parser.add_argument('--memory-mode', default=None, choices=['default', 'compact'],
+                        help="compact: float32 numerics, categorical descriptions/codes (~half the RSS)")
+    args = parser.parse_args()
+
+    stages = build_pipeline(args.raw_file, args.format, horizon=args.horizon, models=args.models, cores=args.cores,
+                            backend=args.backend, memory_mode=args.memory_mode)
+    runner = PipelineRunner(stages)
+    results = runner.run([args.until] if args.until else None, force=set(args.force))
+    for name, result in results.items():
+        print(f"{name:<14} {'cached' if result['cached'] else 'ran':<7} {result['dir']}")
+    if 'forecast' in results:
+        # The dashboard reads forecasts from the versioned cache, computed from the published lags/models
+        from src.forecast_cache import refresh
+        status = refresh(model_types=args.models, horizon=args.horizon)
+        print(f"{'dashboard':<14} {sum(s == 'updated' for s in status.values())} forecasts refreshed")
+
+
+if __name__ == "__main__":
+    main()
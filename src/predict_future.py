@@ -1,30 +1,19 @@
-import pandas as pd
-import numpy as np
-import joblib
 import os
-import matplotlib.pyplot as plt
+from src.forecasting import ForecastEngine
+from src.forecast_cache import forecast_dir, forecast_file, read_forecast, refresh
 # Directories
-engineered_dir = "data/engineered"
-models_dir = "models"
-forecast_dir = "data/forecast"
 os.makedirs(forecast_dir, exist_ok=True)
 # Nutrients and their matching files
 nutrients = ["carbohydrates", "fiber", "protein", "fat"]
 models = ["random_forest", "xgboost"]  # You can change this to just the best one if needed
-def forecast_next_8_weeks(df_last, model):
+def forecast_next_8_weeks(last_lags, model):
     """
-    Given a lagged dataframe (last row), forecast 8 weeks ahead
+    Given the last lag row (lag_1 .. lag_n), forecast 8 weeks ahead
+    Use ForecastEngine directly to forecast many rows in the same predict calls
     """
-    predictions = []
-    current_input = df_last.values.flatten().tolist()
-    for _ in range(8):
-        pred = model.predict([current_input])[0]
-        predictions.append(pred)
-        # Shift lag values and insert new prediction
-        current_input = current_input[0:-1]  # remove oldest lag
-        current_input.insert(0, pred)        # add new prediction at front
-    return predictions
+    return ForecastEngine(model, horizon=8).recursive(last_lags)[0].tolist()
 def plot_predictions(nutrient, model_name, predictions):
+    import matplotlib.pyplot as plt
     weeks = list(range(1, 9))
     plt.figure(figsize=(8, 5))
     plt.plot(weeks, predictions, marker='o', linestyle='-')
@@ -36,23 +25,19 @@ def plot_predictions(nutrient, model_name, predictions):
     plt.savefig(file_path)
     plt.close()
 def main():
+    # Forecasts are computed once by the cache refresh (skipped when data and models are unchanged)
+    status = refresh(nutrients, models)
     for nutrient in nutrients:
         print(f"\n:small_blue_diamond: Forecasting {nutrient} for next 8 weeks")
-        # Load lagged data
-        lagged_file = os.path.join(engineered_dir, f"{nutrient}_lagged.csv")
-        df = pd.read_csv(lagged_file)
-        last_row = df.iloc[-1:].drop("target", axis=1)
         for model_name in models:
-            model_file = os.path.join(models_dir, f"{nutrient}_{model_name}.pkl")
-            model = joblib.load(model_file)
-            predictions = forecast_next_8_weeks(last_row, model)
-            # Save predictions
-            pred_df = pd.DataFrame({"Week": list(range(1, 9)), "Prediction": predictions})
-            csv_path = os.path.join(forecast_dir, f"{nutrient}_{model_name}_forecast.csv")
-            pred_df.to_csv(csv_path, index=False)
-            print(f":white_check_mark: Saved forecast: {csv_path}")
+            pred_df, _ = read_forecast(nutrient, model_name)
+            if pred_df is None:
+                print(f":warning: No model for {nutrient} ({model_name})")
+                continue
+            print(f":white_check_mark: Forecast {status[f'{nutrient}/{model_name}']}: "
+                  f"{os.path.join(forecast_dir, forecast_file(nutrient, model_name))}")
             # Save plot
-            plot_predictions(nutrient, model_name, predictions)
+            plot_predictions(nutrient, model_name, pred_df["Prediction"].tolist())
             print(f":chart_with_upwards_trend: Saved graph: {nutrient}_{model_name}_forecast.png")
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
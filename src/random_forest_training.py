@@ -1,8 +1,11 @@
-import pandas as pd
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_squared_error
+import numpy as np
 import joblib
 import os
+from src.feature_store import load_features
+from src.tree_export import export_tree_model
+from src.tuning import load_best_params
 
 engineered_dir = "data/engineered"
 models_dir = "models"
@@ -10,25 +13,27 @@ os.makedirs(models_dir, exist_ok=True)
 
 nutrients = ["carbohydrates", "fiber", "protein", "fat"]
 
-def load_data(nutrient):
-    return pd.read_csv(os.path.join(engineered_dir, f"{nutrient}_lagged.csv"))
+def train_random_forest(nutrient, n_jobs=-1, data_dir=engineered_dir, output_dir=models_dir, params_dir=None):
+    # Memory-mapped float32 matrices: no DataFrame copy, shared with other training processes
+    X_train, X_test, y_train, y_test = load_features(nutrient, data_dir).holdout_split()
 
-def split_data(df):
-    X = df.drop("target", axis=1)
-    y = df["target"]
-    return X[:-8], X[-8:], y[:-8], y[-8:]
-
-for nutrient in nutrients:
-    df = load_data(nutrient)
-    X_train, X_test, y_train, y_test = split_data(df)
-
-    model = RandomForestRegressor(n_estimators=100, random_state=42)
+    # Tuned settings from <params_dir>/<nutrient>_random_forest_best_params.json when present
+    # (params_dir defaults to output_dir, i.e. models/)
+    params = load_best_params(nutrient, "random_forest", params_dir or output_dir)
+    model = RandomForestRegressor(random_state=42, n_jobs=n_jobs, **params)
     model.fit(X_train, y_train)
     preds = model.predict(X_test)
 
-    rmse = mean_squared_error(y_test, preds, squared=False)
+    rmse = np.sqrt(mean_squared_error(y_test, preds))
     print(f"{nutrient} Random Forest RMSE: {rmse:.2f}")
 
-    model_path = os.path.join(models_dir, f"{nutrient}_random_forest.pkl")
+    os.makedirs(output_dir, exist_ok=True)
+    model_path = os.path.join(output_dir, f"{nutrient}_random_forest.pkl")
     joblib.dump(model, model_path)
-    print(f"✅ Saved: {model_path}")
\ No newline at end of file
+    print(f"✅ Saved: {model_path}")
+    print(f"✅ Exported: {export_tree_model(model, model_path)}")
+    return rmse
+
+if __name__ == "__main__":
+    for nutrient in nutrients:
+        train_random_forest(nutrient)
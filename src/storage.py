@@ -0,0 +1,229 @@
+import os
+import tempfile
+
+import pandas as pd
+
+# Default on-disk format for intermediate pipeline outputs
+DEFAULT_FORMAT = os.environ.get('NUTRIMATCH_STORAGE_FORMAT', 'parquet')
+
+
+class CsvStorage:
+    """Plain CSV, kept for exports and for reading legacy stage outputs"""
+    name = 'csv'
+    extension = '.csv'
+
+    def write(self, df, path):
+        df.to_csv(path, index=False)
+        return path
+
+    def read(self, path, columns=None, parse_dates=None, dayfirst=False, dtype=None):
+        # dtype is applied by the parser itself, so no float64/object copy is ever built
+        return pd.read_csv(path, usecols=columns, parse_dates=parse_dates, dayfirst=dayfirst, dtype=dtype)
+
+    def iter_chunks(self, path, chunksize, columns=None):
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunksize)
+
+    def open_writer(self, path):
+        return _CsvChunkWriter(path)
+
+
+class ParquetStorage:
+    """Typed, compressed columnar files; dtypes (including datetimes) round-trip unchanged"""
+    name = 'parquet'
+    extension = '.parquet'
+
+    def __init__(self, compression='zstd'):
+        self.compression = compression
+
+    def write(self, df, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        pq.write_table(table, path, compression=self.compression)
+        return path
+
+    def read(self, path, columns=None, parse_dates=None, dayfirst=False, dtype=None):
+        import pyarrow.parquet as pq
+        # Only the requested columns are decoded; the file is memory-mapped rather than read into a buffer
+        df = pq.read_table(path, columns=columns, memory_map=True).to_pandas()
+        return df.astype(dtype) if dtype else df
+
+    def iter_chunks(self, path, chunksize, columns=None):
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(path, memory_map=True)
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+
+    def open_writer(self, path):
+        return _ArrowChunkWriter(path, 'parquet', self.compression)
+
+
+class FeatherStorage:
+    """Arrow IPC (Feather v2) files, memory-mapped on read"""
+    name = 'feather'
+    extension = '.feather'
+
+    def __init__(self, compression='zstd'):
+        self.compression = compression
+
+    def write(self, df, path):
+        import pyarrow as pa
+        import pyarrow.feather as feather
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        feather.write_feather(table, path, compression=self.compression)
+        return path
+
+    def read(self, path, columns=None, parse_dates=None, dayfirst=False, dtype=None):
+        import pyarrow.feather as feather
+        df = feather.read_table(path, columns=columns, memory_map=True).to_pandas()
+        return df.astype(dtype) if dtype else df
+
+    def iter_chunks(self, path, chunksize, columns=None):
+        import pyarrow.feather as feather
+        # Memory-mapped, so batches are paged in lazily
+        table = feather.read_table(path, columns=columns, memory_map=True)
+        for batch in table.to_batches(max_chunksize=chunksize):
+            yield batch.to_pandas()
+
+    def open_writer(self, path):
+        return _ArrowChunkWriter(path, 'feather', self.compression)
+
+
+class _CsvChunkWriter:
+    """Append chunks to one CSV, writing the header once"""
+
+    def __init__(self, path):
+        self.path = path
+        self.header_written = False
+
+    def write(self, df):
+        df.to_csv(self.path, index=False, mode='a' if self.header_written else 'w', header=not self.header_written)
+        self.header_written = True
+
+    def close(self):
+        pass
+
+
+class _ArrowChunkWriter:
+    """Stream chunks into one Parquet or Arrow IPC file; the first chunk fixes the schema"""
+
+    def __init__(self, path, kind, compression):
+        self.path = path
+        self.kind = kind
+        self.compression = compression
+        self.schema = None
+        self.writer = None
+
+    def write(self, df):
+        import pyarrow as pa
+        table = pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+        if self.writer is None:
+            self.schema = table.schema
+            if self.kind == 'parquet':
+                import pyarrow.parquet as pq
+                self.writer = pq.ParquetWriter(self.path, self.schema, compression=self.compression)
+            else:
+                options = pa.ipc.IpcWriteOptions(compression=self.compression)
+                self.writer = pa.ipc.new_file(self.path, self.schema, options=options)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+STORAGE_BACKENDS = {
+    'csv': CsvStorage,
+    'parquet': ParquetStorage,
+    'feather': FeatherStorage
+}
+
+
+def get_storage(storage_format=None):
+    """Return a storage backend instance by name ('parquet', 'feather' or 'csv')"""
+    storage_format = (storage_format or DEFAULT_FORMAT).lower()
+    if storage_format not in STORAGE_BACKENDS:
+        raise ValueError(f"Unknown storage format '{storage_format}'. Use one of {list(STORAGE_BACKENDS)}")
+    return STORAGE_BACKENDS[storage_format]()
+
+
+def storage_for_path(path):
+    """Pick the backend matching a file extension"""
+    extension = os.path.splitext(path)[1].lower()
+    for backend in STORAGE_BACKENDS.values():
+        if backend.extension == extension:
+            return backend()
+    raise ValueError(f"Unsupported file type '{extension}' for {path}")
+
+
+def with_extension(file_name, storage):
+    """Swap the extension of a file name for the backend's own"""
+    return f"{os.path.splitext(file_name)[0]}{storage.extension}"
+
+
+def read_frame(path, columns=None, parse_dates=None, dayfirst=False, dtype=None):
+    """
+    Read any supported stage output, dispatching on its extension
+    dtype: Optional {column: dtype} applied while reading (e.g. float32 in compact mode)
+    """
+    return storage_for_path(path).read(path, columns=columns, parse_dates=parse_dates, dayfirst=dayfirst, dtype=dtype)
+
+
+def sample_dtypes(path, n_rows=1000):
+    """{column: dtype} of a file, inferred from its first n_rows rows"""
+    return next(storage_for_path(path).iter_chunks(path, n_rows)).dtypes.to_dict()
+
+
+def write_frame(df, path, storage_format=None):
+    """Write a frame with the given backend, replacing the extension of path to match"""
+    storage = get_storage(storage_format)
+    return storage.write(df, with_extension(path, storage))
+
+
+def export_csv(df, path):
+    """Explicit CSV export alongside the columnar outputs"""
+    return CsvStorage().write(df, with_extension(path, CsvStorage))
+
+
+def find_frame(directory, stem):
+    """
+    Locate a stage output by name regardless of format
+    Columnar files are preferred over CSV when both exist
+    """
+    for storage_format in ['parquet', 'feather', 'csv']:
+        path = os.path.join(directory, stem + STORAGE_BACKENDS[storage_format].extension)
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"No stored data for '{stem}' in {directory}")
+
+
+def resolve_frame(path):
+    """Return path if it exists, otherwise the same stage output saved in another format"""
+    if os.path.exists(path):
+        return path
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return find_frame(os.path.dirname(path) or '.', stem)
+
+
+def load_lagged(nutrient, directory="data/engineered", columns=None):
+    """Load the lag feature table for a nutrient in whichever format it was saved"""
+    return read_frame(find_frame(directory, f"{nutrient}_lagged"), columns=columns)
+
+
+def atomic_write(path, write, mode="wb"):
+    """
+    Write a file through write(f) into a temporary file of its own in the same directory, then
+    atomically swap it in: readers never see a partial file and concurrent writers never share one
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".",
+                                    suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode) as f:
+            write(f)
+        # mkstemp creates owner-only files; outputs are read by other users' processes too
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
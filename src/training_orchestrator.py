@@ -0,0 +1,110 @@
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+nutrients = ["carbohydrates", "fiber", "protein", "fat"]
+model_families = ["random_forest", "xgboost", "lstm"]
+
+# Rough relative cost, used to start the slowest jobs first so the pool drains evenly
+JOB_COST = {"lstm": 3, "random_forest": 2, "xgboost": 1}
+
+metrics_path = os.path.join("models", "training_metrics.csv")
+
+
+def plan_core_split(n_tasks, core_budget):
+    """
+    Split the core budget between concurrent jobs and threads per job
+    Returns (workers, threads_per_job); workers * threads_per_job <= core_budget
+    """
+    core_budget = max(1, int(core_budget))
+    workers = max(1, min(n_tasks, core_budget))
+    threads = max(1, core_budget // workers)
+    return workers, threads
+
+
+def run_training_job(nutrient, family, n_threads, data_dir="data/engineered", output_dir="models", params_dir=None):
+    """Train and save one (nutrient, model family) pair inside a worker process"""
+    start = time.perf_counter()
+    dirs = {"data_dir": data_dir, "output_dir": output_dir, "params_dir": params_dir}
+    if family == "random_forest":
+        from src.random_forest_training import train_random_forest
+        rmse = train_random_forest(nutrient, n_jobs=n_threads, **dirs)
+    elif family == "xgboost":
+        from src.xgboost_training import train_xgboost
+        rmse = train_xgboost(nutrient, n_jobs=n_threads, **dirs)
+    elif family == "lstm":
+        from src.lstm_training import train_lstm
+        rmse = train_lstm(nutrient, n_threads=n_threads, verbose=0, **dirs)
+    else:
+        raise ValueError(f"Unknown model family '{family}'. Use one of {model_families}")
+    return {
+        "nutrient": nutrient,
+        "model": family,
+        "rmse": None if rmse is None else float(rmse),
+        "train_seconds": round(time.perf_counter() - start, 3),
+        "threads": n_threads,
+        "status": "ok" if rmse is not None else "skipped",
+        "error": ""
+    }
+
+
+def train_all(nutrient_list=None, families=None, core_budget=None, output_path=metrics_path,
+              data_dir="data/engineered", models_dir="models", params_dir=None):
+    """
+    Train every (nutrient, model family) job on a process pool
+    core_budget: Total cores to use (defaults to all available)
+    data_dir / models_dir: Where the lag tables are read from and the models written to
+    params_dir: Where tuned parameters are read from (default: models_dir)
+    Writes one consolidated metrics table and returns it as a DataFrame
+    """
+    nutrient_list = nutrient_list or nutrients
+    families = families or model_families
+    core_budget = core_budget or os.cpu_count() or 1
+
+    # Materialize the shared float32 feature matrices once; every worker memory-maps them
+    from src.feature_store import build_store
+    build_store(nutrient_list, data_dir)
+
+    jobs = [(n, f) for n in nutrient_list for f in families]
+    jobs.sort(key=lambda job: JOB_COST.get(job[1], 1), reverse=True)
+    workers, threads = plan_core_split(len(jobs), core_budget)
+    print(f"🔹 Training {len(jobs)} jobs on {workers} workers x {threads} threads (budget: {core_budget} cores)")
+
+    results = []
+    # spawn keeps TensorFlow/OpenMP state out of the children (fork after TF init is unsafe)
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = {pool.submit(run_training_job, n, f, threads, data_dir, models_dir, params_dir): (n, f) for n, f in jobs}
+        for future in as_completed(futures):
+            nutrient, family = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"nutrient": nutrient, "model": family, "rmse": None, "train_seconds": None,
+                          "threads": threads, "status": "failed", "error": str(e)}
+            print(f"✅ {family} | {nutrient} → {result['status']} (RMSE: {result['rmse']})")
+            results.append(result)
+
+    metrics = pd.DataFrame(results).sort_values(["nutrient", "model"]).reset_index(drop=True)
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    metrics.to_csv(output_path, index=False)
+    print(f"📄 Saved metrics: {output_path}")
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train all nutrient models in parallel")
+    parser.add_argument("--cores", type=int, default=None, help="Total core budget (default: all cores)")
+    parser.add_argument("--nutrients", nargs="+", default=nutrients, choices=nutrients)
+    parser.add_argument("--models", nargs="+", default=model_families, choices=model_families)
+    parser.add_argument("--output", default=metrics_path, help="Consolidated metrics CSV")
+    args = parser.parse_args()
+    train_all(args.nutrients, args.models, args.cores, args.output)
+
+
+if __name__ == "__main__":
+    main()
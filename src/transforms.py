@@ -0,0 +1,265 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.feature_kernel import feature_block, scale_block
+
+models_dir = "models"
+TRANSFORM_FILE = "feature_transform.json"
+
+# (output column, numerator, denominator) / (output column, left, right)
+RATIOS = [
+    ("Protein_Fat_Ratio", "Protein", "Fat"),
+    ("Carbs_Protein_Ratio", "Carbohydrates", "Protein"),
+    ("Fiber_Carbs_Ratio", "Fiber", "Carbohydrates"),
+]
+INTERACTIONS = [
+    ("Protein_Fat_Interaction", "Protein", "Fat"),
+    ("Protein_Carbs_Interaction", "Protein", "Carbohydrates"),
+    ("Fat_Carbs_Interaction", "Fat", "Carbohydrates"),
+]
+RATIO_EPSILON = 1e-6
+WEEKS_PER_YEAR = 52.0
+# Calendar columns are never scaled
+EXCLUDE_COLUMNS = ["Year", "Week", "Week_Start", "Week_End"]
+
+
+class RunningScaler:
+    def __init__(self):
+        """
+        Standard scaling whose statistics can be updated batch by batch (partial_fit)
+        Batches are merged with the parallel mean/variance update, so fitting in chunks gives
+        the same mean and (population) std as one fit over all rows; NaNs are ignored
+        """
+        self.n = None
+        self.mean = None
+        self.m2 = None
+
+    def partial_fit(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        valid = ~np.isnan(X)
+        n_batch = valid.sum(axis=0).astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_batch = np.where(n_batch > 0, np.nansum(X, axis=0) / np.maximum(n_batch, 1), 0.0)
+            m2_batch = np.nansum((X - mean_batch) ** 2, axis=0)
+        if self.n is None:
+            self.n, self.mean, self.m2 = n_batch, mean_batch, m2_batch
+            return self
+        total = self.n + n_batch
+        safe_total = np.maximum(total, 1)
+        delta = mean_batch - self.mean
+        self.mean = self.mean + delta * n_batch / safe_total
+        self.m2 = self.m2 + m2_batch + delta ** 2 * self.n * n_batch / safe_total
+        self.n = total
+        return self
+
+    @property
+    def scale(self):
+        """Per-column std; constant columns get 1 so they map to 0 instead of dividing by zero"""
+        std = np.sqrt(self.m2 / np.maximum(self.n, 1))
+        return np.where(std > 0, std, 1.0)
+
+    def transform(self, X):
+        if self.n is None:
+            raise ValueError("Scaler is not fitted")
+        return (np.asarray(X, dtype=np.float64) - self.mean) / self.scale
+
+    def to_dict(self):
+        return {"n": self.n.tolist(), "mean": self.mean.tolist(), "m2": self.m2.tolist()}
+
+    @classmethod
+    def from_dict(cls, state):
+        scaler = cls()
+        scaler.n, scaler.mean, scaler.m2 = (np.asarray(state[key], dtype=np.float64) for key in ["n", "mean", "m2"])
+        return scaler
+
+
+class FeatureTransform:
+    def __init__(self, ratios=RATIOS, interactions=INTERACTIONS, week_column="Week", exclude=EXCLUDE_COLUMNS):
+        """
+        The feature engineering applied to weekly data: nutrient ratios and interactions,
+        cyclical week features and standard scaling
+        Fitted once on training data and saved next to the models, so new rows can be scaled with
+        the training statistics instead of their own (no current model consumes these features yet)
+        """
+        self.ratios = [tuple(spec) for spec in ratios]
+        self.interactions = [tuple(spec) for spec in interactions]
+        self.week_column = week_column
+        self.exclude = list(exclude)
+        self.scaled_columns = None
+        self.scaler = RunningScaler()
+
+    @property
+    def is_fitted(self):
+        return self.scaler.n is not None
+
+    def derived_columns(self, df):
+        """Vectorized ratio, interaction and week sin/cos columns for the inputs present in df"""
+        new = {}
+        for name, numerator, denominator in self.ratios:
+            if numerator in df.columns and denominator in df.columns:
+                new[name] = df[numerator] / (df[denominator] + RATIO_EPSILON)
+        for name, left, right in self.interactions:
+            if left in df.columns and right in df.columns:
+                new[name] = df[left] * df[right]
+        if self.week_column in df.columns:
+            angle = 2 * np.pi * df[self.week_column] / WEEKS_PER_YEAR
+            new["Week_Sin"] = np.sin(angle)
+            new["Week_Cos"] = np.cos(angle)
+        return new
+
+    def derive(self, df):
+        """df plus every derived column, added in one step"""
+        return df.assign(**self.derived_columns(df))
+
+    def select_columns(self, df):
+        """Numeric, non-calendar columns: the ones scaled"""
+        return [col for col in df.columns
+                if col not in self.exclude and pd.api.types.is_numeric_dtype(df[col])
+                and not pd.api.types.is_bool_dtype(df[col])]
+
+    def kernel_plan(self, df):
+        """
+        Column layout of the fused kernel for df: numeric non-calendar columns pass through
+        (they are the ones scaled), followed by the ratios, interactions and week sin/cos
+        """
+        derived = {spec[0] for spec in self.ratios + self.interactions} | {"Week_Sin", "Week_Cos"}
+        passthrough = [col for col in self.select_columns(df) if col not in derived]
+        position = {col: i for i, col in enumerate(passthrough)}
+        ratios = [(name, position[a], position[b]) for name, a, b in self.ratios if a in position and b in position]
+        interactions = [(name, position[a], position[b]) for name, a, b in self.interactions
+                        if a in position and b in position]
+        inputs = list(passthrough)
+        week_idx = -1
+        if self.week_column in df.columns:
+            week_idx = len(inputs)
+            inputs.append(self.week_column)
+        outputs = (passthrough + [spec[0] for spec in ratios] + [spec[0] for spec in interactions]
+                   + (["Week_Sin", "Week_Cos"] if week_idx >= 0 else []))
+        return {"inputs": inputs, "n_pass": len(passthrough), "outputs": outputs, "week_idx": week_idx,
+                "ratio_idx": [spec[1:] for spec in ratios], "inter_idx": [spec[1:] for spec in interactions]}
+
+    def compute(self, df, scale=True, dtype=np.float64, kernel=None):
+        """
+        Every derived column (scaled with the fitted statistics when scale=True) in one fused pass
+        over a single numeric block; returns (output column names, (n_rows, n_outputs) array)
+        """
+        plan = self.kernel_plan(df)
+        X = df[plan["inputs"]].to_numpy(dtype=dtype)
+        scale_idx, mean, std = [], None, None
+        if scale:
+            scale_idx, mean, std = self._scaling_for(plan["outputs"])
+        out = feature_block(X, plan["n_pass"], plan["ratio_idx"], plan["inter_idx"], plan["week_idx"],
+                            scale_idx, mean, std, RATIO_EPSILON, WEEKS_PER_YEAR, dtype=dtype, kernel=kernel)
+        return plan["outputs"], out
+
+    def _positions(self, outputs):
+        """Positions of the scaled columns in the kernel's output"""
+        missing = [col for col in self.scaled_columns if col not in outputs]
+        if missing:
+            raise ValueError(f"Missing columns for the fitted transform: {missing}")
+        return [outputs.index(col) for col in self.scaled_columns]
+
+    def _scaling_for(self, outputs):
+        if not self.is_fitted:
+            raise ValueError("FeatureTransform is not fitted")
+        return self._positions(outputs), self.scaler.mean, self.scaler.scale
+
+    @staticmethod
+    def _to_frame(df, outputs, out):
+        """Non-numeric and calendar columns of df followed by the kernel's output block"""
+        keep = [col for col in df.columns if col not in outputs]
+        return pd.concat([df[keep], pd.DataFrame(out, columns=outputs, index=df.index, copy=False)], axis=1)
+
+    def partial_fit(self, df, derived=False):
+        """
+        Update the scaling statistics with a batch of rows (e.g. each new week or chunk)
+        derived: df already holds the derived columns
+        """
+        if derived:
+            if self.scaled_columns is None:
+                self.scaled_columns = self.select_columns(df)
+            self.scaler.partial_fit(df[self.scaled_columns].to_numpy(dtype=np.float64))
+            return self
+        outputs, out = self.compute(df, scale=False)
+        if self.scaled_columns is None:
+            self.scaled_columns = outputs
+        self.scaler.partial_fit(out[:, self._positions(outputs)])
+        return self
+
+    def fit(self, df, derived=False):
+        self.scaled_columns = None
+        self.scaler = RunningScaler()
+        return self.partial_fit(df, derived)
+
+    def scale(self, df):
+        """Scale the fitted columns of a frame that already holds the derived columns"""
+        if not self.is_fitted:
+            raise ValueError("FeatureTransform is not fitted")
+        missing = [col for col in self.scaled_columns if col not in df.columns]
+        if missing:
+            raise ValueError(f"Missing columns for the fitted transform: {missing}")
+        out = df.copy()
+        out[self.scaled_columns] = self.scaler.transform(df[self.scaled_columns].to_numpy(dtype=np.float64))
+        return out
+
+    def transform(self, df, dtype=np.float64, kernel=None):
+        """Derive and scale new rows with the fitted statistics (nothing is refitted)"""
+        outputs, out = self.compute(df, scale=True, dtype=dtype, kernel=kernel)
+        return self._to_frame(df, outputs, out)
+
+    def fit_transform(self, df, partial=False, dtype=np.float64, kernel=None):
+        """
+        Fit (or with partial=True, update the fitted statistics) and transform in one kernel pass:
+        the unscaled block is computed once, the statistics taken from it and then applied in place
+        """
+        outputs, out = self.compute(df, scale=False, dtype=dtype, kernel=kernel)
+        if not (partial and self.is_fitted):
+            self.scaled_columns = None
+            self.scaler = RunningScaler()
+        if self.scaled_columns is None:
+            self.scaled_columns = outputs
+        scale_idx = self._positions(outputs)
+        self.scaler.partial_fit(out[:, scale_idx])
+        scale_block(out, scale_idx, self.scaler.mean, self.scaler.scale)
+        return self._to_frame(df, outputs, out)
+
+    def to_dict(self):
+        return {"ratios": self.ratios, "interactions": self.interactions, "week_column": self.week_column,
+                "exclude": self.exclude, "scaled_columns": self.scaled_columns,
+                "scaler": self.scaler.to_dict() if self.is_fitted else None}
+
+    @classmethod
+    def from_dict(cls, state):
+        transform = cls(state["ratios"], state["interactions"], state["week_column"], state["exclude"])
+        transform.scaled_columns = state["scaled_columns"]
+        if state["scaler"] is not None:
+            transform.scaler = RunningScaler.from_dict(state["scaler"])
+        return transform
+
+    def save(self, path):
+        """Write as JSON (no pickle: loading it can't execute code), replacing any previous file atomically"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(path + ".tmp", path)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+def transform_path(directory=models_dir):
+    return os.path.join(directory, TRANSFORM_FILE)
+
+
+def load_transform(directory=models_dir):
+    """The fitted transform saved with the models"""
+    path = transform_path(directory)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No fitted feature transform at {path}; run feature engineering first")
+    return FeatureTransform.load(path)
@@ -0,0 +1,211 @@
+import json
+import os
+
+import numpy as np
+
+# Rows x trees node indices held at once while traversing (bounds predict memory)
+_BLOCK_CELLS = 1 << 22
+
+
+class FlatTreeEnsemble:
+    """
+    NumPy-only predictor for exported Random Forest / XGBoost ensembles
+
+    All trees are stored as flat node arrays; leaves point to themselves, so every
+    row walks every tree for a fixed max_depth steps with pure array indexing
+    """
+
+    def __init__(self, arrays):
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.default_left = arrays['default_left']
+        self.value = arrays['value']
+        self.roots = arrays['roots']
+        self.max_depth = int(arrays['max_depth'])
+        self.n_features = int(arrays['n_features'])
+        self.scale = float(arrays['scale'])
+        self.base_score = float(arrays['base_score'])
+        # 'le': go left when x <= threshold (sklearn); 'lt': when x < threshold (XGBoost)
+        self.compare = str(arrays['compare'])
+        self.kind = str(arrays['kind'])
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls({key: data[key] for key in data.files})
+
+    def predict(self, X):
+        # Both libraries evaluate splits on float32 features
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}")
+
+        n_trees = len(self.roots)
+        block = max(1, _BLOCK_CELLS // n_trees)
+        out = np.empty(len(X), dtype=np.float64)
+        for start in range(0, len(X), block):
+            out[start:start + block] = self._predict_block(X[start:start + block])
+        return out
+
+    def _predict_block(self, X):
+        rows = np.arange(len(X))[:, np.newaxis]
+        nodes = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[nodes]].astype(self.threshold.dtype)
+            threshold = self.threshold[nodes]
+            go_left = x <= threshold if self.compare == 'le' else x < threshold
+            go_left = np.where(np.isnan(x), self.default_left[nodes], go_left)
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return self.value[nodes].sum(axis=1) * self.scale + self.base_score
+
+
+def _finish(trees, n_features, kind, compare, scale, base_score, threshold_dtype):
+    """Concatenate per-tree node lists into flat arrays, pointing leaves at themselves"""
+    feature, threshold, left, right, default_left, value, roots = [], [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for tree in trees:
+        n = len(tree['value'])
+        is_leaf = tree['left'] < 0
+        idx = np.arange(n)
+        roots.append(offset)
+        feature.append(np.where(is_leaf, 0, tree['feature']))
+        threshold.append(np.where(is_leaf, 0, tree['threshold']))
+        left.append(np.where(is_leaf, idx, tree['left']) + offset)
+        right.append(np.where(is_leaf, idx, tree['right']) + offset)
+        default_left.append(tree['default_left'])
+        value.append(tree['value'])
+        max_depth = max(max_depth, _depth(tree['left'], tree['right']))
+        offset += n
+    return {
+        'feature': np.concatenate(feature).astype(np.int32),
+        'threshold': np.concatenate(threshold).astype(threshold_dtype),
+        'left': np.concatenate(left).astype(np.int32),
+        'right': np.concatenate(right).astype(np.int32),
+        'default_left': np.concatenate(default_left).astype(bool),
+        'value': np.concatenate(value).astype(np.float64),
+        'roots': np.asarray(roots, dtype=np.int32),
+        'max_depth': np.int32(max_depth),
+        'n_features': np.int32(n_features),
+        'scale': np.float64(scale),
+        'base_score': np.float64(base_score),
+        'compare': np.str_(compare),
+        'kind': np.str_(kind)
+    }
+
+
+def _depth(left, right):
+    """Depth of a tree given child arrays (-1 for leaves), root at index 0"""
+    depth = 0
+    level = [0]
+    while level:
+        children = [c for node in level for c in (left[node], right[node]) if c >= 0]
+        if children:
+            depth += 1
+        level = children
+    return depth
+
+
+def flatten_random_forest(model):
+    """Flat arrays for a fitted sklearn RandomForestRegressor (single output)"""
+    trees = []
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        missing_left = getattr(tree, 'missing_go_to_left', None)
+        trees.append({
+            'feature': tree.feature,
+            'threshold': tree.threshold,
+            'left': tree.children_left,
+            'right': tree.children_right,
+            'default_left': missing_left if missing_left is not None else np.zeros(tree.node_count, dtype=bool),
+            'value': tree.value[:, 0, 0]
+        })
+    return _finish(trees, model.n_features_in_, 'random_forest', 'le',
+                   scale=1.0 / len(trees), base_score=0.0, threshold_dtype=np.float64)
+
+
+def _xgb_base_score(booster):
+    config = json.loads(booster.save_config())
+    raw = str(config['learner']['learner_model_param']['base_score'])
+    return float(raw.strip('[]').split(',')[0])
+
+
+def flatten_xgboost(model):
+    """Flat arrays for a fitted XGBRegressor (squared-error objective)"""
+    booster = model.get_booster()
+    names = booster.feature_names or [f'f{i}' for i in range(model.n_features_in_)]
+    index = {name: i for i, name in enumerate(names)}
+
+    dumps = booster.get_dump(dump_format='json')
+    # Honour early stopping: only the trees up to the best iteration are used by predict
+    best_iteration = getattr(model, 'best_iteration', None)
+    if best_iteration is not None:
+        dumps = dumps[:best_iteration + 1]
+
+    trees = []
+    for dump in dumps:
+        nodes = {}
+        stack = [json.loads(dump)]
+        while stack:
+            node = stack.pop()
+            nodes[node['nodeid']] = node
+            stack.extend(node.get('children', []))
+        n = max(nodes) + 1
+        tree = {
+            'feature': np.zeros(n, dtype=np.int32),
+            'threshold': np.zeros(n, dtype=np.float32),
+            'left': np.full(n, -1, dtype=np.int32),
+            'right': np.full(n, -1, dtype=np.int32),
+            'default_left': np.zeros(n, dtype=bool),
+            'value': np.zeros(n, dtype=np.float64)
+        }
+        for node_id, node in nodes.items():
+            if 'leaf' in node:
+                tree['value'][node_id] = node['leaf']
+                continue
+            tree['feature'][node_id] = index[node['split']]
+            tree['threshold'][node_id] = node['split_condition']
+            tree['left'][node_id] = node['yes']
+            tree['right'][node_id] = node['no']
+            tree['default_left'][node_id] = node['missing'] == node['yes']
+        trees.append(tree)
+    return _finish(trees, model.n_features_in_, 'xgboost', 'lt',
+                   scale=1.0, base_score=_xgb_base_score(booster), threshold_dtype=np.float32)
+
+
+def export_tree_model(model, path):
+    """
+    Export a fitted Random Forest or XGBoost regressor to a compact .npz artifact
+    Returns the written path
+    """
+    if hasattr(model, 'get_booster'):
+        arrays = flatten_xgboost(model)
+    elif hasattr(model, 'estimators_'):
+        arrays = flatten_random_forest(model)
+    else:
+        raise ValueError(f"Cannot export model of type {type(model).__name__}")
+    path = os.path.splitext(path)[0] + '.npz'
+    np.savez(path, **arrays)
+    return path
+
+
+def load_tree_model(path):
+    return FlatTreeEnsemble.load(path)
+
+
+def main():
+    """Export every saved tree model under models/ (for pickles trained before the export step)"""
+    import joblib
+    models_dir = "models"
+    for file_name in sorted(os.listdir(models_dir)):
+        if file_name.endswith(('_random_forest.pkl', '_xgboost.pkl')):
+            path = os.path.join(models_dir, file_name)
+            print(f"✅ Exported: {export_tree_model(joblib.load(path), path)}")
+
+
+if __name__ == "__main__":
+    main()
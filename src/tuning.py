@@ -0,0 +1,295 @@
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.training_orchestrator import model_families, nutrients
+
+engineered_dir = "data/engineered"
+models_dir = "models"
+
+# Weeks held out at the end of each lag table for the training scripts' final test;
+# tuning never sees them
+TEST_WEEKS = 8
+
+# Search space per family: every parameter is drawn uniformly from its list
+SEARCH_SPACES = {
+    "random_forest": {
+        "max_depth": [None, 4, 6, 8, 12, 16],
+        "min_samples_leaf": [1, 2, 4, 8],
+        "max_features": [1.0, 0.75, 0.5, "sqrt"],
+        "bootstrap": [True, False],
+    },
+    "xgboost": {
+        "learning_rate": [0.01, 0.03, 0.05, 0.1, 0.2, 0.3],
+        "max_depth": [2, 3, 4, 6, 8],
+        "min_child_weight": [1, 3, 5, 10],
+        "subsample": [0.6, 0.8, 1.0],
+        "colsample_bytree": [0.5, 0.75, 1.0],
+        "reg_lambda": [0.0, 1.0, 5.0, 10.0],
+    },
+    "lstm": {
+        "units": [16, 32, 64, 128],
+        "learning_rate": [0.0003, 0.001, 0.003, 0.01],
+        "batch_size": [8, 16, 32],
+    },
+}
+
+# Budget each family's rungs grow along: trees for the forests/boosting, epochs for the LSTM.
+# Successive halving starts at min and multiplies by eta per rung, up to max
+RESOURCES = {
+    "random_forest": {"name": "n_estimators", "min": 25, "max": 400},
+    "xgboost": {"name": "n_estimators", "min": 50, "max": 1600},
+    "lstm": {"name": "epochs", "min": 5, "max": 80},
+}
+
+# Settings used when no tuned config exists (the original hard-coded values)
+DEFAULT_PARAMS = {
+    "random_forest": {"n_estimators": 100},
+    "xgboost": {"n_estimators": 100, "learning_rate": 0.1},
+    "lstm": {"units": 64, "learning_rate": 0.001, "batch_size": 32, "epochs": 50},
+}
+
+XGB_EARLY_STOPPING_ROUNDS = 20
+
+# Memory-mapped lag matrices of the current worker process, set once by _init_worker
+_SHARED = {}
+
+
+def best_params_path(nutrient, family, directory=models_dir):
+    return os.path.join(directory, f"{nutrient}_{family}_best_params.json")
+
+
+def load_best_params(nutrient, family, directory=models_dir):
+    """Tuned parameters saved next to the models, or the defaults when the family hasn't been tuned"""
+    params = dict(DEFAULT_PARAMS[family])
+    path = best_params_path(nutrient, family, directory)
+    if os.path.exists(path):
+        with open(path) as f:
+            params.update(json.load(f)["params"])
+    return params
+
+
+def sample_configs(family, n_configs, rng):
+    """Random configurations from a family's search space"""
+    space = SEARCH_SPACES[family]
+    return [{name: values[rng.integers(len(values))] for name, values in space.items()} for _ in range(n_configs)]
+
+
+def validation_split(X, y, val_weeks):
+    """Chronological split of the non-test rows: train on the past, validate on the next val_weeks"""
+    end = len(y) - TEST_WEEKS
+    split = end - val_weeks
+    if split <= X.shape[1]:
+        raise ValueError(f"Not enough rows to tune: {len(y)} rows for {val_weeks} validation weeks")
+    return X[:split], y[:split], X[split:end], y[split:end]
+
+
+def _init_worker(nutrient_list, data_dir, val_weeks):
+    """Runs once per worker: maps the feature store read-only; the splits are views, not copies"""
+    from src.feature_store import load_features
+    for nutrient in nutrient_list:
+        features = load_features(nutrient, data_dir, refresh=False)
+        _SHARED[nutrient] = validation_split(features.X, features.y, val_weeks)
+
+
+def evaluate_config(nutrient, family, params, resource, n_threads=1):
+    """
+    Fit one configuration with the given resource and score it on the validation weeks
+    XGBoost stops early on the validation fold, so its resource is an upper bound on trees
+    Returns {'val_rmse', 'used_resource', 'seconds'}
+    """
+    X_train, y_train, X_val, y_val = _SHARED[nutrient]
+    start = time.perf_counter()
+    used = resource
+    if family == "random_forest":
+        from sklearn.ensemble import RandomForestRegressor
+        model = RandomForestRegressor(n_estimators=resource, random_state=42, n_jobs=n_threads, **params)
+        model.fit(X_train, y_train)
+        preds = model.predict(X_val)
+    elif family == "xgboost":
+        from xgboost import XGBRegressor
+        model = XGBRegressor(n_estimators=resource, early_stopping_rounds=XGB_EARLY_STOPPING_ROUNDS,
+                             random_state=42, n_jobs=n_threads, **params)
+        model.fit(X_train, y_train, eval_set=[(X_val, y_val)], verbose=False)
+        used = int(model.best_iteration) + 1
+        preds = model.predict(X_val, iteration_range=(0, used))
+    elif family == "lstm":
+        from src.lstm_training import build_lstm_model, set_tf_threads
+        set_tf_threads(n_threads)
+        model = build_lstm_model(X_train.shape[1], units=params["units"], learning_rate=params["learning_rate"])
+        model.fit(X_train[..., np.newaxis].astype(np.float32), y_train, epochs=resource,
+                  batch_size=params["batch_size"], verbose=0)
+        preds = model.predict_on_batch(X_val[..., np.newaxis].astype(np.float32))
+    else:
+        raise ValueError(f"Unknown model family '{family}'. Use one of {model_families}")
+    rmse = float(np.sqrt(np.mean((np.asarray(y_val, dtype=np.float64) - np.asarray(preds).ravel()) ** 2)))
+    return {"val_rmse": rmse, "used_resource": used, "seconds": round(time.perf_counter() - start, 3)}
+
+
+def hyperband_brackets(family, eta=3):
+    """
+    Hyperband schedule: (n_configs, min resource) per bracket, from many cheap trials
+    to a few full-budget ones
+    """
+    r_min, r_max = RESOURCES[family]["min"], RESOURCES[family]["max"]
+    s_max = max(0, int(math.log(r_max / r_min, eta) + 1e-9))
+    brackets = []
+    for s in range(s_max, -1, -1):
+        n_configs = int(math.ceil((s_max + 1) / (s + 1) * eta ** s))
+        brackets.append((n_configs, int(r_max / eta ** s)))
+    return brackets
+
+
+def successive_halving(pool, nutrient, family, configs, r_start, deadline, n_threads, eta=3, trials=None):
+    """
+    Evaluate every config at r_start, keep the best 1/eta, multiply the resource by eta, repeat
+    Rungs run their trials in parallel on the pool; a rung cut short by the deadline keeps
+    whatever finished. Returns the (config, result) pairs of the last completed rung
+    """
+    r_max = RESOURCES[family]["max"]
+    trials = trials if trials is not None else []
+    resource, survivors, scored = r_start, list(configs), []
+    rung = 0
+    while survivors and time.monotonic() < deadline:
+        futures = {pool.submit(evaluate_config, nutrient, family, config, resource, n_threads): config
+                   for config in survivors}
+        scored = []
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                # Out of time: drop the queued trials; running ones are stopped by stop_pool at the end
+                for future in pending:
+                    future.cancel()
+                break
+            for future in done:
+                config = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {"val_rmse": float("inf"), "used_resource": resource, "seconds": None, "error": str(e)}
+                scored.append((config, result))
+                trials.append(dict(nutrient=nutrient, model=family, rung=rung, resource=resource,
+                                   params=json.dumps(config), **result))
+        if not scored or resource >= r_max:
+            break
+        scored.sort(key=lambda pair: pair[1]["val_rmse"])
+        survivors = [config for config, _ in scored[:max(1, len(scored) // eta)]]
+        resource = min(r_max, resource * eta)
+        rung += 1
+    return scored
+
+
+def tune_family(pool, nutrient, family, budget_s, n_threads, eta=3, seed=42, trials=None):
+    """Hyperband over one (nutrient, family) within budget_s seconds; returns the best (config, result)"""
+    rng = np.random.default_rng(seed)
+    deadline = time.monotonic() + budget_s
+    best = None
+    # Brackets are cycled until the budget runs out
+    while time.monotonic() < deadline:
+        for n_configs, r_start in hyperband_brackets(family, eta):
+            if time.monotonic() >= deadline:
+                break
+            configs = sample_configs(family, n_configs, rng)
+            for config, result in successive_halving(pool, nutrient, family, configs, r_start, deadline,
+                                                     n_threads, eta, trials):
+                if best is None or result["val_rmse"] < best[1]["val_rmse"]:
+                    best = (config, result)
+    return best
+
+
+def save_best_params(nutrient, family, config, result, directory=models_dir):
+    """Write the winning configuration next to the models; the resource becomes a regular parameter"""
+    params = {key: (value.item() if hasattr(value, "item") else value) for key, value in config.items()}
+    params[RESOURCES[family]["name"]] = int(result["used_resource"])
+    record = {"nutrient": nutrient, "model": family, "params": params, "val_rmse": result["val_rmse"],
+              "tuned_at": datetime.now().isoformat(timespec="seconds")}
+    os.makedirs(directory, exist_ok=True)
+    path = best_params_path(nutrient, family, directory)
+    with open(path, "w") as f:
+        json.dump(record, f, indent=2)
+    return path
+
+
+def stop_pool(pool):
+    """
+    Shut a pool down without waiting for its running trials: cancelling a future can't stop a
+    trial that already started, and leaving the pool normally would wait for it (e.g. a long LSTM fit)
+    """
+    processes = list((pool._processes or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    for process in processes:
+        process.join()
+
+
+def tune_all(nutrient_list=None, families=None, budget_minutes=30, core_budget=None, val_weeks=16, eta=3,
+             data_dir=engineered_dir, output_dir=models_dir):
+    """
+    Tune every (nutrient, family) within a fixed wall-clock budget on a process pool
+    The budget is split evenly; time a search doesn't use is passed on to the next ones
+    Returns a DataFrame of every trial (also written to models/tuning_trials.csv)
+    """
+    from src.feature_store import build_store
+
+    nutrient_list = nutrient_list or nutrients
+    families = families or model_families
+    core_budget = core_budget or os.cpu_count() or 1
+    searches = [(n, f) for f in families for n in nutrient_list]
+    build_store(nutrient_list, data_dir)
+
+    # Trials are small single-series fits: many one-thread workers beat a few wide ones
+    workers, threads = core_budget, 1
+    deadline = time.monotonic() + budget_minutes * 60
+    print(f"🔹 Tuning {len(searches)} searches on {workers} workers within {budget_minutes} min")
+
+    trials = []
+    context = multiprocessing.get_context("spawn")
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                               initializer=_init_worker, initargs=(nutrient_list, data_dir, val_weeks))
+    try:
+        for i, (nutrient, family) in enumerate(searches):
+            budget_s = (deadline - time.monotonic()) / (len(searches) - i)
+            if budget_s <= 0:
+                print(f"⚠️  Budget exhausted before {family} | {nutrient}")
+                continue
+            best = tune_family(pool, nutrient, family, budget_s, threads, eta, trials=trials)
+            if best is None or not np.isfinite(best[1]["val_rmse"]):
+                print(f"⚠️  {family} | {nutrient}: no completed trials")
+                continue
+            path = save_best_params(nutrient, family, best[0], best[1], output_dir)
+            print(f"✅ {family} | {nutrient} → val RMSE {best[1]['val_rmse']:.2f}, saved {path}")
+    finally:
+        # Keep the wall-clock budget: trials still running at the deadline are killed, not awaited
+        stop_pool(pool)
+
+    trials_df = pd.DataFrame(trials)
+    os.makedirs(output_dir, exist_ok=True)
+    trials_df.to_csv(os.path.join(output_dir, "tuning_trials.csv"), index=False)
+    return trials_df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hyperband tuning for every nutrient model")
+    parser.add_argument("--nutrients", nargs="+", default=nutrients, choices=nutrients)
+    parser.add_argument("--models", nargs="+", default=model_families, choices=model_families)
+    parser.add_argument("--minutes", type=float, default=30, help="Wall-clock budget for the whole search")
+    parser.add_argument("--cores", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--val-weeks", type=int, default=16, help="Validation weeks before the test weeks")
+    parser.add_argument("--eta", type=int, default=3, help="Halving rate: keep 1/eta configs per rung")
+    args = parser.parse_args()
+    tune_all(args.nutrients, args.models, args.minutes, args.cores, args.val_weeks, args.eta)
+
+
+if __name__ == "__main__":
+    main()
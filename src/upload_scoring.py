@@ -0,0 +1,104 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.forecasting import DEFAULT_LAGS, predict_rows
+
+# Rows parsed from the upload at a time; memory stays flat whatever the file size
+UPLOAD_CHUNKSIZE = 50_000
+# Rows per predict call: bounds the model's own working memory (LSTM activations, tree traversal)
+PREDICT_BATCH_ROWS = 8_192
+PREVIEW_PAGE_ROWS = 50
+
+
+def lag_columns(n_lags=DEFAULT_LAGS):
+    return [f'lag_{i + 1}' for i in range(n_lags)]
+
+
+def _rewind(source):
+    # Uploaded files are file-like objects read several times (header, chunks, preview pages)
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    return source
+
+
+def check_header(source, n_lags=DEFAULT_LAGS):
+    """Read only the header row and fail fast when lag columns are missing"""
+    header = pd.read_csv(_rewind(source), nrows=0).columns
+    missing = [col for col in lag_columns(n_lags) if col not in header]
+    if missing:
+        raise ValueError(f"Uploaded file is missing required lag columns: {', '.join(missing)}")
+    return list(header)
+
+
+def iter_lag_chunks(source, chunksize=UPLOAD_CHUNKSIZE, n_lags=DEFAULT_LAGS):
+    """
+    Yield (first_row, X) blocks of the lag columns as float64 arrays
+    Only lag_1..lag_n are parsed, straight to float by the C parser; a non-numeric or
+    empty cell raises ValueError naming the rows it was found in, as does a file with no data rows
+    """
+    columns = lag_columns(n_lags)
+    check_header(source, n_lags)
+    reader = pd.read_csv(_rewind(source), usecols=columns, dtype={col: np.float64 for col in columns},
+                         chunksize=chunksize)
+    first_row = 0
+    while True:
+        try:
+            chunk = next(reader)
+        except StopIteration:
+            if first_row == 0:
+                raise ValueError("The file has no data rows")
+            return
+        except ValueError as e:
+            raise ValueError(f"Non-numeric lag value in rows {first_row + 1}-{first_row + chunksize}: {e}")
+        if chunk.empty:
+            continue
+        X = np.ascontiguousarray(chunk[columns].to_numpy())
+        missing = np.isnan(X).any(axis=1)
+        if missing.any():
+            bad_row = first_row + int(np.argmax(missing)) + 1
+            raise ValueError(f"Missing lag value in row {bad_row} ({int(missing.sum())} incomplete rows in this chunk)")
+        yield first_row, X
+        first_row += len(X)
+
+
+def score_upload(source, model, output_path, prediction_column='Prediction', chunksize=UPLOAD_CHUNKSIZE,
+                 batch_rows=PREDICT_BATCH_ROWS, n_lags=DEFAULT_LAGS, progress=None):
+    """
+    Predict every row of an uploaded lag CSV, appending results to output_path chunk by chunk
+    The output (Index, prediction_column) is written under a temporary name and swapped in
+    when complete, so a failed upload never leaves a truncated result behind
+    progress: Optional callback(rows_done, bytes_read, bytes_total) after every chunk
+    Returns {'rows', 'chunks', 'seconds'}
+    """
+    total_bytes = getattr(source, 'size', None) or (os.path.getsize(source) if isinstance(source, str) else None)
+    tmp_path = output_path + '.tmp'
+    start = time.perf_counter()
+    rows = chunks = 0
+    try:
+        with open(tmp_path, 'w', newline='') as out:
+            out.write(f"Index,{prediction_column}\n")
+            for first_row, X in iter_lag_chunks(source, chunksize, n_lags):
+                predictions = np.concatenate([predict_rows(model, X[i:i + batch_rows])[:, 0]
+                                              for i in range(0, len(X), batch_rows)])
+                block = pd.DataFrame({'Index': np.arange(first_row + 1, first_row + len(X) + 1),
+                                      prediction_column: predictions})
+                block.to_csv(out, header=False, index=False)
+                rows += len(X)
+                chunks += 1
+                if progress is not None:
+                    position = source.tell() if hasattr(source, 'tell') else None
+                    progress(rows, position, total_bytes)
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return {'rows': rows, 'chunks': chunks, 'seconds': round(time.perf_counter() - start, 3)}
+
+
+def read_page(source, page, page_rows=PREVIEW_PAGE_ROWS, columns=None):
+    """One page (0-based) of a CSV without reading the rows after it"""
+    skip = range(1, page * page_rows + 1) if page else None
+    return pd.read_csv(_rewind(source), usecols=columns, skiprows=skip, nrows=page_rows)
@@ -1,22 +1,26 @@
 import pandas as pd
 import os
 from datetime import datetime
+from src.storage import get_storage, read_frame
+from src.execution_backends import finish_weekly, get_backend, weekly_value_columns
+from src.ingestion import week_start
+from src.logging_utils import get_pipeline_logger, log_path, timed
+from src.memory import compact_frame, is_compact, resolve_memory_mode
 
 class WeeklyAggregator:
-    def __init__(self, base_dir=None):
+    def __init__(self, base_dir=None, storage_format=None, memory_mode=None):
         """
         Initialize the WeeklyAggregator class
         base_dir: Base directory for all data operations (should be your project root)
+        storage_format: Output format for the weekly data ('parquet', 'feather' or 'csv')
+        memory_mode: 'compact' keeps the daily data as float32 (defaults to NUTRIMATCH_MEMORY_MODE)
         """
         # Set project root directory
         self.base_dir = base_dir if base_dir else os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 
-        # Set up log file
-        self.log_file = os.path.join(self.base_dir, 'logs',
-                                   f'weekly_aggregation_log_{datetime.now().strftime("%Y%m%d_%H%M%S")}.txt')
-
-        # Create logs directory if it doesn't exist
-        os.makedirs(os.path.join(self.base_dir, 'logs'), exist_ok=True)
+        # Shared, buffered JSON log (logs/pipeline.jsonl, rotated by size or time)
+        self.logger = get_pipeline_logger('weekly_aggregation', self.base_dir)
+        self.log_file = log_path(self.base_dir)
 
         # Directory structure
         self.data_dirs = {
@@ -29,9 +33,12 @@ class WeeklyAggregator:
         }
 
         self.create_directories()
+        self.storage = get_storage(storage_format)
+        self.memory_mode = resolve_memory_mode(memory_mode)
         self.df = None
         self.weekly_df = None
         self.agg_method = None
+        self.source_description = None
 
     def create_directories(self):
         """Create necessary directories if they don't exist"""
@@ -39,14 +46,11 @@ class WeeklyAggregator:
             os.makedirs(dir_path, exist_ok=True)
             self.log_message(f"Directory exists: {dir_path}")
 
-    def log_message(self, message):
-        """Log messages with timestamp"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_message = f"[{timestamp}] {message}\n"
-        print(message)
-        with open(self.log_file, 'a') as f:
-            f.write(log_message)
+    def log_message(self, message, **fields):
+        """Log a message (plus optional structured fields) to the console and the pipeline log"""
+        self.logger.info(message, extra={'fields': fields})
 
+    @timed('load_daily_data', rows='df')
     def load_daily_data(self, file_name='daily.csv'):
         """
         Load the daily dataset
@@ -70,8 +74,8 @@ class WeeklyAggregator:
 
             self.log_message(f"Loading daily data from: {source_path}")
 
-            # Read CSV with proper date parsing
-            self.df = pd.read_csv(source_path, parse_dates=['Date'])
+            # Read with proper date parsing (columnar files keep the datetime type)
+            self.df = read_frame(source_path, parse_dates=['Date'])
             
             # Validate required columns
             if 'Date' not in self.df.columns:
@@ -79,6 +83,8 @@ class WeeklyAggregator:
                 
             # Ensure Date column is in datetime format
             self.df['Date'] = pd.to_datetime(self.df['Date'])
+            if is_compact(self.memory_mode):
+                self.df = compact_frame(self.df)
             
             self.log_message(f"Daily data loaded successfully. Shape: {self.df.shape}")
             return True
@@ -86,6 +92,7 @@ class WeeklyAggregator:
             self.log_message(f"Error loading daily data: {str(e)}")
             return False
 
+    @timed('aggregate_weekly', rows='weekly_df')
     def aggregate_weekly(self, agg_method='sum', exclude_cols=None):
         """
         Aggregate daily data to weekly data
@@ -100,10 +107,6 @@ class WeeklyAggregator:
             if agg_method not in ['sum', 'mean']:
                 raise ValueError("Invalid aggregation method. Use 'sum' or 'mean'")
 
-            # Extract ISO calendar week components
-            self.df['Year'] = self.df['Date'].dt.isocalendar().year
-            self.df['Week'] = self.df['Date'].dt.isocalendar().week
-
             # Identify columns for aggregation
             numeric_cols = self.df.select_dtypes(include=['number']).columns.tolist()
             default_exclusions = ['Year', 'Week']
@@ -111,23 +114,44 @@ class WeeklyAggregator:
             cols_to_agg = [col for col in numeric_cols 
                           if col not in default_exclusions + exclude_cols]
 
-            # Group by week and aggregate
-            agg_func = {'sum': sum, 'mean': 'mean'}[agg_method]
-            self.weekly_df = self.df.groupby(['Year', 'Week'])[cols_to_agg].agg(agg_func).reset_index()
+            # Group by ISO week start (cheap date arithmetic); the named aggregations keep
+            # pandas on its vectorized groupby path, and isocalendar only runs once per week.
+            # min_count=1: a week whose days are all missing stays NaN instead of summing to 0
+            weeks = week_start(self.df['Date']).rename('Week_Start')
+            grouped = self.df.groupby(weeks)[cols_to_agg]
+            weekly = grouped.sum(min_count=1) if agg_method == 'sum' else grouped.mean()
+            self.weekly_df = finish_weekly(weekly.reset_index())
+            self.source_description = f"{len(self.df)} daily records"
+
+            self.log_message(f"Weekly aggregation completed. Shape: {self.weekly_df.shape}")
+            return True
+        except Exception as e:
+            self.log_message(f"Error in weekly aggregation: {str(e)}")
+            return False
+
+    @timed('aggregate_weekly_lazy', rows='weekly_df')
+    def aggregate_weekly_lazy(self, file_name='daily.csv', agg_method='sum', exclude_cols=None, backend=None):
+        """
+        Aggregate a daily file to weekly data without loading it into memory
+        Only Date and the aggregated columns are read from the file
+        file_name: Daily data file in the processed directory (or an absolute path)
+        backend: 'pandas' (chunked), 'polars' (lazy, multi-core) or 'dask';
+            defaults to NUTRIMATCH_DATAFRAME_BACKEND
+        """
+        try:
+            if agg_method not in ['sum', 'mean']:
+                raise ValueError("Invalid aggregation method. Use 'sum' or 'mean'")
+            self.agg_method = agg_method
 
-            # Calculate week start/end dates using ISO week definition
-            self.weekly_df['Week_Start'] = pd.to_datetime(
-                self.weekly_df['Year'].astype(str) + '-' +
-                self.weekly_df['Week'].astype(str) + '-1', 
-                format='%Y-%W-%w'
-            )
-            self.weekly_df['Week_End'] = self.weekly_df['Week_Start'] + pd.Timedelta(days=6)
+            source_path = os.path.join(self.data_dirs['processed'], file_name)
+            if not os.path.exists(source_path):
+                raise FileNotFoundError(f"File not found at: {source_path}")
 
-            # Reorder columns for better readability
-            column_order = ['Year', 'Week', 'Week_Start', 'Week_End'] + \
-                         [col for col in self.weekly_df.columns 
-                          if col not in ['Year', 'Week', 'Week_Start', 'Week_End']]
-            self.weekly_df = self.weekly_df[column_order]
+            engine = get_backend(backend, self.memory_mode)
+            cols_to_agg = weekly_value_columns(engine, source_path, exclude_cols or [])
+            self.log_message(f"Starting weekly aggregation of {source_path} with the {engine.name} backend...")
+            self.weekly_df = engine.weekly(source_path, cols_to_agg, agg_method)
+            self.source_description = f"{source_path} (streamed)"
 
             self.log_message(f"Weekly aggregation completed. Shape: {self.weekly_df.shape}")
             return True
@@ -135,6 +159,7 @@ class WeeklyAggregator:
             self.log_message(f"Error in weekly aggregation: {str(e)}")
             return False
 
+    @timed('save_weekly_data', rows='weekly_df')
     def save_weekly_data(self, file_name='weekly_food_waste.csv'):
         """Save the weekly aggregated dataset"""
         try:
@@ -146,11 +171,11 @@ class WeeklyAggregator:
 
             # Create timestamped filename
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            file_name_with_ts = f"{os.path.splitext(file_name)[0]}_{timestamp}.csv"
+            file_name_with_ts = f"{os.path.splitext(file_name)[0]}_{timestamp}{self.storage.extension}"
             save_path = os.path.join(self.data_dirs['processed'], file_name_with_ts)
 
             # Save main data file
-            self.weekly_df.to_csv(save_path, index=False)
+            self.storage.write(self.weekly_df, save_path)
             self.log_message(f"Weekly data saved to {save_path}")
 
             # Generate comprehensive statistics
@@ -161,7 +186,7 @@ class WeeklyAggregator:
             return save_path
         except Exception as e:
             self.log_message(f"Error saving weekly data: {str(e)}")
-            return None
+            return False
 
     def _generate_statistics_file(self, stats_path):
         """Generate detailed statistics report"""
@@ -169,7 +194,7 @@ class WeeklyAggregator:
             f.write("Weekly Food Waste Statistics Report\n")
             f.write("==================================\n\n")
             f.write(f"Report generated at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"Data source: {self.df.shape[0]} daily records\n")
+            f.write(f"Data source: {self.source_description}\n")
             f.write(f"Aggregation method: {self.agg_method}\n\n")
             
             f.write("Temporal Coverage:\n")
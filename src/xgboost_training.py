@@ -1,37 +1,38 @@
-import pandas as pd
 from xgboost import XGBRegressor
-from sklearn.metrics import mean_squared_error
+import numpy as np
 import joblib
 import os
+from src.feature_store import load_features
+from src.tree_export import export_tree_model
+from src.tuning import load_best_params
 
-def load_lagged_data(nutrient, directory="data/engineered"):
-    path = os.path.join(directory, f"{nutrient}_lagged.csv")
-    return pd.read_csv(path)
-
-def split_data(df):
-    X = df.drop("target", axis=1)
-    y = df["target"]
-    return X[:-8], X[-8:], y[:-8], y[-8:]
-
-def train_and_save_model(X_train, X_test, y_train, y_test, nutrient, output_dir="models"):
-    model = XGBRegressor(n_estimators=100, learning_rate=0.1, random_state=42)
+def train_and_save_model(X_train, X_test, y_train, y_test, nutrient, output_dir="models", n_jobs=None,
+                         params_dir=None):
+    # Tuned settings (tree count chosen by early stopping during tuning) when present
+    params = load_best_params(nutrient, "xgboost", params_dir or output_dir)
+    model = XGBRegressor(random_state=42, n_jobs=n_jobs, **params)
     model.fit(X_train, y_train)
     preds = model.predict(X_test)
-    rmse = mean_squared_error(y_test, preds, squared=False)
+    rmse = np.sqrt(np.mean((np.asarray(y_test, dtype=np.float64) - preds) ** 2))
     print(f"XGBoost | {nutrient} → RMSE: {rmse:.2f}")
 
     os.makedirs(output_dir, exist_ok=True)
     model_path = os.path.join(output_dir, f"{nutrient}_xgboost.pkl")
     joblib.dump(model, model_path)
-    print(f":white_check_mark: Saved model: {model_path}\n")
+    print(f":white_check_mark: Saved model: {model_path}")
+    print(f":white_check_mark: Exported: {export_tree_model(model, model_path)}\n")
+    return rmse
+
+def train_xgboost(nutrient, n_jobs=None, data_dir="data/engineered", output_dir="models", params_dir=None):
+    X_train, X_test, y_train, y_test = load_features(nutrient, data_dir).holdout_split()
+    return train_and_save_model(X_train, X_test, y_train, y_test, nutrient, output_dir=output_dir, n_jobs=n_jobs,
+                                params_dir=params_dir)
 
 def main():
     nutrients = ["carbohydrates", "fiber", "protein", "fat"]
     for nutrient in nutrients:
         print(f"\n:small_blue_diamond: Training XGBoost for: {nutrient}")
-        df = load_lagged_data(nutrient)
-        X_train, X_test, y_train, y_test = split_data(df)
-        train_and_save_model(X_train, X_test, y_train, y_test, nutrient)
+        train_xgboost(nutrient)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the project as `src.<module>`, like the scripts run from the project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
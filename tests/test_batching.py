@@ -0,0 +1,36 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from src.batching import MicroBatcher
+
+
+def test_concurrent_requests_share_one_predict_call():
+    calls = []
+
+    def predict(X):
+        calls.append(len(X))
+        return X.sum(axis=1, keepdims=True)
+
+    async def run():
+        batcher = MicroBatcher(predict, max_wait_ms=50)
+        return await asyncio.gather(*(batcher.submit([[i, i]]) for i in range(5)))
+
+    results = asyncio.run(run())
+    assert [r.tolist() for r in results] == [[[2.0 * i]] for i in range(5)]
+    assert calls == [5]
+
+
+def test_mismatched_rows_fail_every_request_in_the_batch():
+    async def run():
+        batcher = MicroBatcher(lambda X: X, max_wait_ms=50)
+        results = await asyncio.wait_for(
+            asyncio.gather(batcher.submit([[1.0, 2.0]]), batcher.submit([[1.0, 2.0, 3.0]]), return_exceptions=True),
+            timeout=5)
+        # The worker keeps serving later requests
+        return results, await asyncio.wait_for(batcher.submit([[4.0, 5.0]]), timeout=5)
+
+    results, after = asyncio.run(run())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert after.tolist() == [[4.0, 5.0]]
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+
+from src.incremental_aggregation import IncrementalAggregator
+
+VALUE_COLUMNS = ["Carbohydrates", "Protein"]
+
+
+def make_items(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp("2023-01-02") + pd.to_timedelta(rng.integers(0, 60, n_rows), unit="D")
+    protein = rng.normal(20, 5, n_rows).round(2)
+    protein[rng.random(n_rows) < 0.1] = np.nan
+    return pd.DataFrame({
+        "Date": dates.strftime("%d/%m/%Y"),
+        "Carbohydrates": rng.normal(100, 20, n_rows).round(2),
+        "Protein": protein,
+        "Item Description": [f"ITEM {i % 7}" for i in range(n_rows)],
+        "Quantity": rng.integers(1, 5, n_rows),
+        "Unit Price": [f" RM{p:.2f} " for p in rng.uniform(1, 20, n_rows)],
+    })
+
+
+def full_weekly(items):
+    """Weekly table computed from scratch: daily means, then ISO-week sums"""
+    df = items.copy()
+    df["Date"] = pd.to_datetime(df["Date"], format="%d/%m/%Y")
+    daily = df.groupby("Date")[VALUE_COLUMNS].mean()
+    daily["Total_Quantity"] = df.groupby("Date")["Quantity"].sum()
+    iso = daily.index.isocalendar()
+    keys = [iso["year"].astype("int64").rename("Year"), iso["week"].astype("int64").rename("Week")]
+    return daily.groupby(keys).sum(min_count=1)
+
+
+def ingest(tmp_path, items, header=True):
+    with open(tmp_path / "items.csv", "a") as f:
+        items.to_csv(f, index=False, header=header)
+    aggregator = IncrementalAggregator(base_dir=str(tmp_path), storage_format="csv")
+    outputs = aggregator.ingest_log("items.csv", source_dir=str(tmp_path))
+    return aggregator, outputs
+
+
+def assert_matches_full(aggregator, items):
+    expected = full_weekly(items)
+    actual = aggregator.weekly_df[expected.columns]
+    actual.index = actual.index.set_names(["Year", "Week"])
+    pd.testing.assert_frame_equal(actual, expected, check_exact=False, rtol=1e-9, check_dtype=False)
+
+
+def test_incremental_ingest_matches_full_aggregation(tmp_path):
+    items = make_items(3000)
+    # Later batches include late arrivals for days already aggregated
+    batches = [items.iloc[:1000], items.iloc[1000:1800], items.iloc[1800:]]
+    aggregator, _ = ingest(tmp_path, batches[0])
+    assert_matches_full(aggregator, batches[0])
+    for i, batch in enumerate(batches[1:], start=2):
+        # A new instance each run, so the persisted state and watermark are exercised too
+        aggregator, outputs = ingest(tmp_path, batch, header=False)
+        assert outputs
+        assert_matches_full(aggregator, items.iloc[:sum(len(b) for b in batches[:i])])
+
+
+def test_no_new_rows_is_a_no_op(tmp_path):
+    items = make_items(200)
+    ingest(tmp_path, items)
+    aggregator = IncrementalAggregator(base_dir=str(tmp_path), storage_format="csv")
+    assert aggregator.ingest_log("items.csv", source_dir=str(tmp_path)) is None
+
+
+def test_trailing_partial_line_waits_for_the_next_run(tmp_path):
+    items = make_items(300)
+    ingest(tmp_path, items.iloc[:200])
+    lines = items.iloc[200:].to_csv(index=False, header=False)
+    cut = len(lines) - 10
+    with open(tmp_path / "items.csv", "a") as f:
+        f.write(lines[:cut])
+    aggregator, _ = ingest(tmp_path, items.iloc[:0], header=False)
+    assert_matches_full(aggregator, items.iloc[:299])
+    with open(tmp_path / "items.csv", "a") as f:
+        f.write(lines[cut:])
+    aggregator, _ = ingest(tmp_path, items.iloc[:0], header=False)
+    assert_matches_full(aggregator, items)
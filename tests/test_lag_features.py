@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.feature_engineering_lag import build_lag_features, create_lag_features
+
+
+def make_weekly(n_sites=3, n_weeks=20, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = [{"Site": site, "Year": 2024 + week // 52, "Week": week % 52 + 1,
+             "protein": rng.normal(10, 2), "fat": rng.normal(5, 1)}
+            for site in range(n_sites) for week in range(n_weeks)]
+    # Shuffled, so the function has to restore (series, time) order itself
+    return pd.DataFrame(rows).sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def reference(df, col, lags, windows, stats, series_cols):
+    """Row-by-row groupby/shift version of the same features"""
+    ordered = df.sort_values(series_cols + ["Year", "Week"]).reset_index(drop=True)
+    grouped = ordered.groupby(series_cols)[col]
+    features = {f"lag_{k}": grouped.shift(k) for k in lags}
+    for size in windows:
+        for stat in stats:
+            features[f"roll_{stat}_{size}"] = grouped.transform(
+                lambda s: getattr(s.shift(1).rolling(size), stat)())
+    features["target"] = ordered[col]
+    return pd.DataFrame(features).dropna().reset_index(drop=True)
+
+
+def test_matches_groupby_shift_reference():
+    df = make_weekly()
+    lags, windows, stats = (1, 2, 4), (3,), ("mean", "std", "min", "max", "sum")
+    tables = build_lag_features(df, ["protein", "fat"], series_cols=["Site"], lags=lags,
+                                rolling_windows=windows, rolling_stats=stats)
+    for col in ["protein", "fat"]:
+        expected = reference(df, col, lags, windows, stats, ["Site"])
+        pd.testing.assert_frame_equal(tables[col], expected[tables[col].columns], check_exact=False)
+
+
+def test_windows_never_cross_series():
+    df = make_weekly(n_sites=3, n_weeks=10)
+    table = build_lag_features(df, ["protein"], series_cols=["Site"], lags=(1, 2), keep_keys=True)["protein"]
+    # Each series loses its first two weeks to missing history
+    assert len(table) == 3 * (10 - 2)
+    assert table.groupby("Site").size().tolist() == [8, 8, 8]
+
+
+def test_rows_with_missing_values_are_dropped():
+    df = make_weekly(n_sites=1, n_weeks=12)
+    df.loc[df["Week"] == 6, "protein"] = np.nan
+    table = build_lag_features(df, ["protein"], lags=(1, 2))["protein"]
+    assert not table.isna().any().any()
+    # Week 6 is missing as a target and as lag 1 / lag 2 of weeks 7 and 8
+    assert len(table) == 12 - 2 - 3
+
+
+def test_short_history_returns_empty_tables():
+    df = make_weekly(n_sites=1, n_weeks=3)
+    tables = build_lag_features(df, ["protein", "fat"], lags=(1, 2, 3, 4))
+    assert all(table.empty for table in tables.values())
+    assert list(tables["fat"].columns) == ["lag_1", "lag_2", "lag_3", "lag_4", "target"]
+
+
+def test_unknown_rolling_stat_raises():
+    with pytest.raises(ValueError):
+        build_lag_features(make_weekly(), ["protein"], rolling_windows=(2,), rolling_stats=("median",))
+
+
+def test_create_lag_features_keeps_its_contract():
+    values = np.arange(10, dtype=float)
+    table = create_lag_features(pd.DataFrame({"protein": values}), "protein", window=4)
+    assert list(table.columns) == ["lag_1", "lag_2", "lag_3", "lag_4", "target"]
+    assert table["target"].tolist() == values[4:].tolist()
+    assert table["lag_4"].tolist() == values[:6].tolist()
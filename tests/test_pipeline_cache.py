@@ -0,0 +1,83 @@
+import os
+
+from src.pipeline import PipelineRunner, Stage
+
+
+def write_source(inputs, params, out_dir):
+    with open(os.path.join(out_dir, 'source.txt'), 'w') as f:
+        f.write(f"{params['scale']}")
+
+
+def write_double(inputs, params, out_dir):
+    with open(inputs['source']['source.txt']) as f:
+        value = float(f.read())
+    with open(os.path.join(out_dir, 'double.txt'), 'w') as f:
+        f.write(f"{value * 2}")
+
+
+def make_stages(scale=1, cores=1, backend='pandas'):
+    return [
+        Stage('source', write_source, params={'scale': scale}, code=['helper.py'], sources=['raw.csv'],
+              runtime={'backend': backend}),
+        Stage('double', write_double, deps=['source'], params={'format': 'csv'}, runtime={'cores': cores}),
+    ]
+
+
+def run(tmp_path, **kwargs):
+    runner = PipelineRunner(make_stages(**kwargs), base_dir=str(tmp_path))
+    return {name: result['cached'] for name, result in runner.run().items()}
+
+
+def setup_project(tmp_path):
+    (tmp_path / 'raw.csv').write_text("a,b\n1,2\n")
+    (tmp_path / 'helper.py').write_text("VERSION = 1\n")
+
+
+def test_unchanged_pipeline_is_cached(tmp_path):
+    setup_project(tmp_path)
+    assert run(tmp_path) == {'source': False, 'double': False}
+    assert run(tmp_path) == {'source': True, 'double': True}
+
+
+def test_changed_source_file_invalidates_stage_and_downstream(tmp_path):
+    setup_project(tmp_path)
+    run(tmp_path)
+    (tmp_path / 'raw.csv').write_text("a,b\n1,3\n")
+    assert run(tmp_path) == {'source': False, 'double': False}
+
+
+def test_changed_param_invalidates_stage_and_downstream(tmp_path):
+    setup_project(tmp_path)
+    run(tmp_path)
+    assert run(tmp_path, scale=2) == {'source': False, 'double': False}
+    # Going back to the old value hits the old cache entries again
+    assert run(tmp_path) == {'source': True, 'double': True}
+
+
+def test_changed_code_file_invalidates_stage_and_downstream(tmp_path):
+    setup_project(tmp_path)
+    run(tmp_path)
+    (tmp_path / 'helper.py').write_text("VERSION = 2\n")
+    assert run(tmp_path) == {'source': False, 'double': False}
+
+
+def test_runtime_settings_do_not_invalidate(tmp_path):
+    setup_project(tmp_path)
+    run(tmp_path)
+    assert run(tmp_path, cores=8, backend='polars') == {'source': True, 'double': True}
+
+
+def test_downstream_reads_upstream_outputs(tmp_path):
+    setup_project(tmp_path)
+    runner = PipelineRunner(make_stages(scale=3), base_dir=str(tmp_path))
+    results = runner.run()
+    with open(results['double']['outputs']['double.txt']) as f:
+        assert float(f.read()) == 6.0
+
+
+def test_missing_cached_output_reruns_stage(tmp_path):
+    setup_project(tmp_path)
+    runner = PipelineRunner(make_stages(), base_dir=str(tmp_path))
+    results = runner.run()
+    os.remove(results['double']['outputs']['double.txt'])
+    assert run(tmp_path) == {'source': True, 'double': False}
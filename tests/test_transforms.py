@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.transforms import FeatureTransform, RunningScaler
+
+
+def make_weekly(n_rows=200, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Year": 2023 + np.arange(n_rows) // 52,
+        "Week": np.arange(n_rows) % 52 + 1,
+        "Carbohydrates": rng.normal(500, 80, n_rows),
+        "Fiber": rng.normal(20, 4, n_rows),
+        "Protein": rng.normal(60, 10, n_rows),
+        "Fat": rng.normal(30, 6, n_rows),
+    })
+
+
+def test_chunked_partial_fit_matches_one_fit():
+    rng = np.random.default_rng(0)
+    X = rng.normal(50, 10, (1000, 4))
+    X[rng.random(X.shape) < 0.1] = np.nan
+    # Uneven chunks, one of them all-NaN in a column
+    X[100:130, 2] = np.nan
+    chunked = RunningScaler()
+    for start, end in [(0, 100), (100, 130), (130, 131), (131, 600), (600, 1000)]:
+        chunked.partial_fit(X[start:end])
+    np.testing.assert_allclose(chunked.mean, np.nanmean(X, axis=0), rtol=1e-12)
+    np.testing.assert_allclose(chunked.scale, np.nanstd(X, axis=0), rtol=1e-10)
+    np.testing.assert_allclose(chunked.transform(X), RunningScaler().partial_fit(X).transform(X), rtol=1e-10)
+
+
+def test_constant_column_is_not_divided_by_zero():
+    X = np.column_stack([np.full(10, 3.0), np.arange(10.0)])
+    scaled = RunningScaler().partial_fit(X).transform(X)
+    assert np.all(scaled[:, 0] == 0)
+    assert np.isfinite(scaled).all()
+
+
+def test_unfitted_scaler_raises():
+    with pytest.raises(ValueError):
+        RunningScaler().transform(np.zeros((2, 2)))
+
+
+def test_feature_transform_chunked_fit_matches_full_fit():
+    df = make_weekly()
+    full = FeatureTransform().fit(df)
+    chunked = FeatureTransform()
+    for start in range(0, len(df), 37):
+        chunked.partial_fit(df.iloc[start:start + 37])
+    assert chunked.scaled_columns == full.scaled_columns
+    np.testing.assert_allclose(chunked.scaler.mean, full.scaler.mean, rtol=1e-12)
+    np.testing.assert_allclose(chunked.scaler.scale, full.scaler.scale, rtol=1e-10)
+    pd.testing.assert_frame_equal(chunked.transform(df), full.transform(df), rtol=1e-10)
+
+
+def test_partial_fit_transform_updates_the_fitted_statistics():
+    df = make_weekly()
+    transform = FeatureTransform()
+    transform.fit_transform(df.iloc[:120])
+    transform.fit_transform(df.iloc[120:], partial=True)
+    full = FeatureTransform().fit(df)
+    np.testing.assert_allclose(transform.scaler.mean, full.scaler.mean, rtol=1e-12)
+    np.testing.assert_allclose(transform.scaler.scale, full.scaler.scale, rtol=1e-10)
+
+
+def test_saved_transform_scales_like_the_original(tmp_path):
+    df = make_weekly()
+    transform = FeatureTransform().fit(df.iloc[:150])
+    loaded = FeatureTransform.load(transform.save(str(tmp_path / "feature_transform.json")))
+    pd.testing.assert_frame_equal(loaded.transform(df.iloc[150:]), transform.transform(df.iloc[150:]))
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from src.tree_export import FlatTreeEnsemble, export_tree_model, flatten_random_forest, flatten_xgboost
+
+
+def make_data(n_rows=400, n_features=4, seed=0, nan_fraction=0.0):
+    rng = np.random.default_rng(seed)
+    # Rounded values put many rows exactly on split thresholds, where <= and < differ
+    X = np.round(rng.normal(size=(n_rows, n_features)), 1).astype(np.float32)
+    y = X[:, 0] * 3 + np.sin(X[:, 1]) + X[:, 2] * X[:, 3] + rng.normal(scale=0.1, size=n_rows)
+    if nan_fraction:
+        X[rng.random(X.shape) < nan_fraction] = np.nan
+    return X, y
+
+
+def test_random_forest_matches_predict():
+    sklearn = pytest.importorskip("sklearn.ensemble")
+    X, y = make_data()
+    model = sklearn.RandomForestRegressor(n_estimators=20, max_depth=6, random_state=0).fit(X, y)
+    flat = FlatTreeEnsemble(flatten_random_forest(model))
+    assert np.allclose(flat.predict(X), model.predict(X))
+
+
+def test_random_forest_routes_missing_values_like_sklearn():
+    sklearn = pytest.importorskip("sklearn.ensemble")
+    X, y = make_data(nan_fraction=0.1)
+    try:
+        model = sklearn.RandomForestRegressor(n_estimators=20, max_depth=6, random_state=0).fit(X, y)
+    except ValueError:
+        pytest.skip("this scikit-learn version can't fit forests on NaN inputs")
+    flat = FlatTreeEnsemble(flatten_random_forest(model))
+    assert np.allclose(flat.predict(X), model.predict(X))
+
+
+def test_xgboost_matches_predict_with_missing_values():
+    xgboost = pytest.importorskip("xgboost")
+    X, y = make_data(nan_fraction=0.1)
+    model = xgboost.XGBRegressor(n_estimators=30, max_depth=4, learning_rate=0.3, base_score=0.7,
+                                 random_state=0).fit(X, y)
+    flat = FlatTreeEnsemble(flatten_xgboost(model))
+    assert flat.base_score == pytest.approx(0.7)
+    assert np.allclose(flat.predict(X), model.predict(X), atol=1e-5)
+
+
+def test_xgboost_early_stopping_uses_best_iteration():
+    xgboost = pytest.importorskip("xgboost")
+    X, y = make_data(seed=1)
+    X_val, y_val = make_data(n_rows=100, seed=2)
+    model = xgboost.XGBRegressor(n_estimators=500, learning_rate=0.5, max_depth=6, early_stopping_rounds=5,
+                                 random_state=0)
+    model.fit(X, y, eval_set=[(X_val, y_val)], verbose=False)
+    assert model.best_iteration + 1 < 500
+    flat = FlatTreeEnsemble(flatten_xgboost(model))
+    assert len(flat.roots) == model.best_iteration + 1
+    assert np.allclose(flat.predict(X_val), model.predict(X_val), atol=1e-5)
+
+
+def test_exported_artifact_round_trips(tmp_path):
+    sklearn = pytest.importorskip("sklearn.ensemble")
+    X, y = make_data()
+    model = sklearn.RandomForestRegressor(n_estimators=5, random_state=0).fit(X, y)
+    path = export_tree_model(model, str(tmp_path / "fat_random_forest.pkl"))
+    assert np.allclose(FlatTreeEnsemble.load(path).predict(X[:10]), model.predict(X[:10]))
@@ -0,0 +1,23 @@
+import io
+
+import pytest
+
+from src.upload_scoring import iter_lag_chunks, score_upload
+
+
+def test_header_only_upload_is_rejected(tmp_path):
+    source = io.StringIO("lag_1,lag_2,lag_3,lag_4,target\n")
+    output = tmp_path / "scores.csv"
+    with pytest.raises(ValueError, match="no data rows"):
+        score_upload(source, model=None, output_path=str(output))
+    assert not output.exists()
+    assert not (tmp_path / "scores.csv.tmp").exists()
+
+
+def test_chunks_cover_every_row():
+    rows = "\n".join(f"{i},{i + 1},{i + 2},{i + 3}" for i in range(10))
+    source = io.StringIO("lag_1,lag_2,lag_3,lag_4\n" + rows + "\n")
+    chunks = list(iter_lag_chunks(source, chunksize=4))
+    assert [first_row for first_row, _ in chunks] == [0, 4, 8]
+    assert sum(len(X) for _, X in chunks) == 10
+    assert chunks[-1][1][-1].tolist() == [9.0, 10.0, 11.0, 12.0]